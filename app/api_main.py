@@ -1,5 +1,6 @@
 # app/api_main.py
 from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from typing import Annotated, Generator
 import sys
 import os
@@ -11,12 +12,14 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 # Importa a infraestrutura do back-end
 from src.utils.database_manager import DatabaseManager
 from src.utils.dependencies import DBDependency
+from src.utils.metricas import METRICAS_SQL, exportar_valores
+from src.modules.idempotencia import IdempotenciaService
 from src.modules.usuario import UsuarioService
 from src.utils.models import Usuario
 from src.utils.security import hash_password
 
 # Importa os routers
-from app.routers import estoque, vendas, relatorios, agendamentos, auth, catalogo, caixas, eventos, usuarios
+from app.routers import estoque, vendas, relatorios, agendamentos, auth, catalogo, caixas, eventos, usuarios, pdv, exportacao
 
 # Cria a instância da API
 app = FastAPI(
@@ -38,7 +41,28 @@ def read_root():
 def get_db_status(db: DBDependency):
     """Teste para garantir que a conexão está ativa."""
     # Se a conexão foi bem-sucedida pelo get_db, a API retorna OK
-    return {"status": "connected", "database": db.DB_NAME}
+    return {"status": "connected", "database": db.DB_NAME, "pool": DatabaseManager.pool_stats()}
+
+
+@app.get("/db-status/pool")
+def get_pool_status():
+    """Estatísticas do pool de conexões, sem ocupar uma conexão."""
+    return DatabaseManager.pool_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """
+    Métricas do processo no formato texto do Prometheus: histograma de latência, linhas e erros
+    por comando SQL (rótulo = método do service) e estatísticas do pool de conexões.
+    """
+    linhas = METRICAS_SQL.exportar_prometheus()
+    linhas += exportar_valores(
+        "unython_db_pool",
+        DatabaseManager.pool_stats(),
+        contadores=("checkouts", "devolucoes", "descartadas", "timeouts", "espera_total_ms"),
+    )
+    return PlainTextResponse("\n".join(linhas) + "\n", media_type="text/plain; version=0.0.4")
 
 # ----------------------------------------------------
 # 2. INCLUSÃO DE ROUTERS
@@ -53,6 +77,8 @@ app.include_router(caixas.router)
 app.include_router(eventos.router)
 app.include_router(usuarios.router)
 app.include_router(estoque.router)
+app.include_router(pdv.router)
+app.include_router(exportacao.router)
 
 # ----------------------------------------------------
 
@@ -62,7 +88,7 @@ def ensure_superuser():
     """Garante um superusuário padrão para bootstrap."""
     dbm = DatabaseManager()
     dbm.connect()
-    dbm.create_tables()
+    dbm.create_tables()  # só confere schema_migrations; aplica migrações pendentes uma vez (advisory lock)
     usuario_service = UsuarioService(dbm)
 
     email = "admin@unython.local"
@@ -79,9 +105,18 @@ def ensure_superuser():
         )
         usuario_service.registrar_usuario(usuario, password, require_password_change=True)
         print(f"[bootstrap] Superusuário criado com email {email}")
+    removidas = IdempotenciaService(dbm).limpar_expiradas()
+    if removidas:
+        print(f"[bootstrap] {removidas} Idempotency-Key(s) expirada(s) removida(s)")
     dbm.disconnect()
 
 
+@app.on_event("shutdown")
+def close_db_pool():
+    """Fecha as conexões do pool ao desligar a API."""
+    DatabaseManager.close_pool()
+
+
 if __name__ == "__main__":
     # Comando para rodar o servidor Uvicorn localmente
     uvicorn.run(app, host="127.0.0.1", port=8000)
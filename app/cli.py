@@ -0,0 +1,188 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+"""
+Comandos administrativos do Unython (executar a partir da raiz do projeto).
+
+Exemplos:
+  python -m app.cli saldos --verificar
+  python -m app.cli saldos --reconstruir
+  python -m app.cli idempotencia --limpar
+  python -m app.cli vendas-diarias --reconstruir
+  python -m app.cli catalogo --importar itens.csv [--simular]
+  python -m app.cli migracoes [--status]
+  python -m app.cli massa-dados [--semente 42] [--escala 0.1] [--limpar]
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+from src.modules.estoque import EstoqueService
+from src.modules.caixas import CaixaService
+from src.modules.idempotencia import IdempotenciaService
+from src.modules.importacao import ImportacaoCatalogoService
+from src.modules.massa_dados import MassaDadosService, ParametrosMassa
+from src.modules.venda import VendaService
+from src.utils.database_manager import DatabaseManager
+from src.utils.migracoes import MIGRACOES, migracoes_aplicadas
+
+
+def cmd_saldos(args: argparse.Namespace, db: DatabaseManager) -> int:
+    """Verifica ou reconstrói a projeção saldo_estoque a partir do ledger."""
+    service = EstoqueService(db)
+    if args.reconstruir:
+        total = service.reconstruir_saldos()
+        if total is None:
+            print("Falha ao reconstruir saldo_estoque.")
+            return 1
+        print(f"saldo_estoque reconstruído: {total} item(ns).")
+        return 0
+
+    divergencias = service.verificar_saldos()
+    if not divergencias:
+        print("saldo_estoque consistente com o ledger.")
+        return 0
+    print(f"{len(divergencias)} item(ns) divergente(s):")
+    for d in divergencias:
+        print(f"  item {d['id_item']}: ledger={d['saldo_ledger']} projecao={d['saldo_projecao']}")
+    return 2
+
+
+def cmd_idempotencia(args: argparse.Namespace, db: DatabaseManager) -> int:
+    """Remove Idempotency-Keys expiradas de POST /vendas."""
+    service = IdempotenciaService(db)
+    total = 0
+    while True:
+        removidas = service.limpar_expiradas()
+        total += removidas
+        if not removidas:
+            break
+    print(f"{total} Idempotency-Key(s) expirada(s) removida(s).")
+    return 0
+
+
+def cmd_vendas_diarias(args: argparse.Namespace, db: DatabaseManager) -> int:
+    """Reconstrói o rollup vendas_diarias a partir das vendas ativas."""
+    service = VendaService(db, EstoqueService(db), CaixaService(db))
+    total = service.reconstruir_vendas_diarias()
+    if total is None:
+        print("Falha ao reconstruir vendas_diarias.")
+        return 1
+    print(f"vendas_diarias reconstruído: {total} linha(s).")
+    return 0
+
+
+def cmd_catalogo(args: argparse.Namespace, db: DatabaseManager) -> int:
+    """Importa categorias/itens de um CSV ou XLSX."""
+    service = ImportacaoCatalogoService(db)
+    try:
+        with open(args.importar, "rb") as arquivo:
+            resultado = service.importar(arquivo, args.importar, simular=args.simular)
+    except (OSError, ValueError) as e:
+        print(f"Falha na importação: {e}")
+        return 1
+
+    prefixo = "[simulação] " if resultado["simulado"] else ""
+    print(
+        f"{prefixo}{resultado['total_linhas']} linha(s): {resultado['inseridos']} item(ns) novo(s), "
+        f"{resultado['atualizados']} atualizado(s), {resultado['categorias_criadas']} categoria(s) criada(s), "
+        f"{resultado['erros_total']} erro(s)."
+    )
+    for erro in resultado["erros"]:
+        print(f"  linha {erro['linha']} ({erro['nome'] or '-'}): {erro['erro']}")
+    return 2 if resultado["erros_total"] else 0
+
+
+def cmd_migracoes(args: argparse.Namespace, db: DatabaseManager) -> int:
+    """Aplica as migrações pendentes do esquema ou, com --status, só lista a situação de cada uma."""
+    if not args.status:
+        aplicadas = db.create_tables()
+        print(f"{len(aplicadas)} migração(ões) aplicada(s).")
+        return 0
+
+    aplicadas = migracoes_aplicadas(db)
+    pendentes = 0
+    for migracao in MIGRACOES:
+        registro = aplicadas.get(migracao.versao)
+        situacao = f"aplicada em {registro['aplicada_em']:%Y-%m-%d %H:%M}" if registro else "PENDENTE"
+        pendentes += registro is None
+        print(f"  v{migracao.versao:03d} {migracao.descricao}: {situacao}")
+    desconhecidas = sorted(set(aplicadas) - {m.versao for m in MIGRACOES})
+    if desconhecidas:
+        print(f"Aviso: versões registradas no banco e ausentes no código: {desconhecidas}")
+    return 2 if pendentes else 0
+
+
+def cmd_massa_dados(args: argparse.Namespace, db: DatabaseManager) -> int:
+    """Gera massa de dados determinística (COPY) para medir os services em volume."""
+    ajustes = {
+        campo: getattr(args, campo)
+        for campo in ("eventos", "itens", "pessoas", "vendas_por_evento", "zipf")
+        if getattr(args, campo) is not None
+    }
+    parametros = ParametrosMassa(semente=args.semente, escala=args.escala, **ajustes)
+    try:
+        totais = MassaDadosService(db).gerar(parametros, limpar=args.limpar)
+    except ValueError as e:
+        print(f"Massa de dados não gerada: {e}")
+        return 1
+    for tabela, total in totais.items():
+        print(f"  {tabela}: {total} linha(s)")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Comandos administrativos do Unython.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    saldos = sub.add_parser("saldos", help="Verifica/reconstrói a projeção saldo_estoque.")
+    acao = saldos.add_mutually_exclusive_group(required=True)
+    acao.add_argument("--verificar", action="store_true", help="Compara a projeção com o ledger (exit 2 se divergir).")
+    acao.add_argument("--reconstruir", action="store_true", help="Recalcula a projeção inteira a partir do ledger.")
+    saldos.set_defaults(func=cmd_saldos)
+
+    idempotencia = sub.add_parser("idempotencia", help="Manutenção das Idempotency-Keys de vendas.")
+    idempotencia.add_argument("--limpar", action="store_true", required=True, help="Remove as chaves expiradas.")
+    idempotencia.set_defaults(func=cmd_idempotencia)
+
+    vendas_diarias = sub.add_parser("vendas-diarias", help="Manutenção do rollup de vendas por dia/evento/caixa/item.")
+    vendas_diarias.add_argument("--reconstruir", action="store_true", required=True, help="Recalcula o rollup inteiro.")
+    vendas_diarias.set_defaults(func=cmd_vendas_diarias)
+
+    catalogo = sub.add_parser("catalogo", help="Importação em massa de categorias/itens.")
+    catalogo.add_argument("--importar", metavar="ARQUIVO", required=True, help="Arquivo .csv ou .xlsx com cabeçalho.")
+    catalogo.add_argument("--simular", action="store_true", help="Valida e mostra o relatório sem gravar nada.")
+    catalogo.set_defaults(func=cmd_catalogo)
+
+    migracoes = sub.add_parser("migracoes", help="Migrações versionadas do esquema.")
+    migracoes.add_argument("--status", action="store_true", help="Lista aplicadas/pendentes (exit 2 se houver pendente).")
+    migracoes.set_defaults(func=cmd_migracoes)
+
+    massa = sub.add_parser("massa-dados", help="Gera massa de dados realista (via COPY) para testes de volume.")
+    massa.add_argument("--semente", type=int, default=42, help="Semente do gerador (mesma semente = mesmos dados).")
+    massa.add_argument("--escala", type=float, default=1.0, help="Multiplica eventos, itens, pessoas e vendas por evento.")
+    massa.add_argument("--eventos", type=int, help="Feiras semanais (padrão 200).")
+    massa.add_argument("--itens", type=int, help="Itens do catálogo (padrão 2000).")
+    massa.add_argument("--pessoas", type=int, help="Pessoas cadastradas (padrão 3000).")
+    massa.add_argument("--vendas-por-evento", type=int, help="Média de vendas por feira (padrão 2000, ±30%%).")
+    massa.add_argument("--zipf", type=float, help="Concentração das vendas nos itens populares (padrão 1.1; 0 = uniforme).")
+    massa.add_argument("--limpar", action="store_true", help="Esvazia as tabelas de negócio antes (APAGA os dados).")
+    massa.set_defaults(func=cmd_massa_dados)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    db = DatabaseManager()
+    db.connect()
+    try:
+        return args.func(args, db)
+    finally:
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
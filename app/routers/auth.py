@@ -1,6 +1,7 @@
 ﻿# app/routers/auth.py
 
 from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Annotated
 import sys
@@ -10,8 +11,9 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 # Importa Services e Schemas
-from src.utils.dependencies import DBDependency
+from src.utils.dependencies import executar_com_conexao
 from src.modules.usuario import UsuarioService
+from src.utils.security import criar_token_acesso, hash_password_async, verify_password_async
 from src.utils.schemas import Token, LoginRequest, ChangePasswordRequest
 from src.utils.models import Usuario
 
@@ -27,13 +29,17 @@ router = APIRouter(
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: DBDependency
 ):
     """
-    Verifica as credenciais (email/senha) e retorna um token JWT (simulado).
+    Verifica as credenciais (email/senha) e retorna um token JWT assinado (HS256) com id, nome e role.
+    Nada bloqueia o event loop: a consulta vai para o threadpool e o bcrypt para o pool de hashing.
+    A conexão do pool é usada só na consulta, não durante a verificação da senha.
     """
-    usuario_service = UsuarioService(db)
-    usuario = usuario_service.verificar_credenciais(form_data.username, form_data.password)
+    usuario = await run_in_threadpool(
+        executar_com_conexao, lambda db: UsuarioService(db).buscar_usuario_por_email(form_data.username)
+    )
+    if usuario and not await verify_password_async(form_data.password, usuario.hashed_password):
+        usuario = None
 
     if not usuario:
         raise HTTPException(
@@ -43,7 +49,7 @@ async def login_for_access_token(
         )
 
     return {
-        "access_token": f"access-token-para-usuario-{usuario.id}",
+        "access_token": criar_token_acesso(usuario.id, usuario.role, usuario.nome, versao=usuario.token_version),
         "token_type": "bearer",
         "user_id": usuario.id,
         "role": usuario.role,
@@ -52,10 +58,17 @@ async def login_for_access_token(
 
 
 @router.post("/change-password")
-async def change_password(payload: ChangePasswordRequest, db: DBDependency):
+async def change_password(payload: ChangePasswordRequest):
     """Altera a senha do usuario e limpa o flag de troca obrigatoria."""
-    usuario_service = UsuarioService(db)
-    ok = usuario_service.alterar_senha(payload.email, payload.old_password, payload.new_password)
+    usuario = await run_in_threadpool(
+        executar_com_conexao, lambda db: UsuarioService(db).buscar_usuario_por_email(payload.email)
+    )
+    ok = False
+    if usuario and await verify_password_async(payload.old_password, usuario.hashed_password):
+        new_hash = await hash_password_async(payload.new_password)
+        ok = await run_in_threadpool(
+            executar_com_conexao, lambda db: UsuarioService(db).gravar_nova_senha(usuario, new_hash)
+        )
     if not ok:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1,33 +1,50 @@
 # app/routers/catalogo.py
 
-from fastapi import APIRouter, Depends, status, HTTPException
-from typing import Dict, List, Any
+from fastapi import APIRouter, Depends, File, Header, Query, Response, UploadFile, status, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from typing import Annotated, Dict, List, Any, Optional
 import sys
 import os
 
 # Adiciona o diretório 'src'
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from src.utils.dependencies import DBDependency
+from src.utils.dependencies import DBDependency, require_role
 from src.modules.categoria import CategoriaService
+from src.modules.importacao import ImportacaoCatalogoService
 from src.modules.item import ItemService
-from src.utils.models import Categoria, Item
+from src.utils.models import Categoria, Item, UsuarioToken
+
+ADMIN_ONLY = require_role({'Administrador'})
 
 router = APIRouter(
     prefix="/catalogo",
     tags=["Catálogo (Grupos de Venda)"]
 )
 
+def _etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara If-None-Match (lista, '*' ou validadores fracos W/) com o ETag atual."""
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or any(c.removeprefix("W/") == etag for c in candidatos)
+
+
 @router.get("/grupos", status_code=status.HTTP_200_OK)
-def get_itens_agrupados_por_categoria(db: DBDependency):
-    """Retorna o catálogo de itens agrupados por categoria para o PDV."""
+def get_itens_agrupados_por_categoria(db: DBDependency, if_none_match: Optional[str] = Header(None)):
+    """
+    Retorna o catálogo de itens agrupados por categoria para o PDV.
+    O ETag é a versão do catálogo: com If-None-Match igual, responde 304 sem corpo.
+    """
     categoria_service = CategoriaService(db)
-    
-    # Chama o novo serviço para obter os dados agrupados
-    data = categoria_service.buscar_itens_por_categoria()
-    
+    versao, data = categoria_service.buscar_itens_por_categoria_versionado()
+    headers = {"ETag": f'"catalogo-{versao}"', "Cache-Control": "no-cache"}
+
+    if _etag_confere(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     # Se não houver dados, retorna dict vazio (evita 404 no PDV)
-    return data or {}
+    return JSONResponse(content=jsonable_encoder(data or {}), headers=headers)
 
 
 # --- Categorias ---
@@ -61,3 +78,22 @@ def criar_item(item: Item, db: DBDependency):
     item_service = ItemService(db)
     iid = item_service.registrar_item(item)
     return {"id": iid}
+
+
+# --- Importação em massa ---
+@router.post("/importar")
+def importar_catalogo(
+    db: DBDependency,
+    current_user: Annotated[UsuarioToken, Depends(ADMIN_ONLY)],
+    arquivo: UploadFile = File(..., description="CSV (separador , ou ;) ou XLSX com cabeçalho: categoria, nome, valor_compra, valor_venda, status"),
+    simular: bool = Query(False, description="Valida e devolve o relatório sem gravar nada."),
+):
+    """
+    Importa categorias/itens em massa (COPY para tabela temporária + merge set-based).
+    Itens existentes (mesmo nome) são atualizados; linhas inválidas voltam em `erros` sem impedir as demais.
+    """
+    service = ImportacaoCatalogoService(db)
+    try:
+        return service.importar(arquivo.file, arquivo.filename or "", simular=simular)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional
 
-from src.utils.dependencies import DBDependency
+from src.utils.dependencies import DBDependency, transmitir_com_conexao
 from src.modules.estoque import EstoqueService
+from src.utils.streaming import json_array_em_fluxo
 
 router = APIRouter(prefix="/estoque", tags=["Estoque"])
 
@@ -55,6 +57,13 @@ def saldo_item(item_id: int, db: DBDependency):
     return {"item_id": item_id, "saldo": saldo}
 
 
+@router.get("/movimentos")
+def listar_movimentos():
+    """Todos os movimentos do ledger, transmitidos linha a linha (cursor nomeado)."""
+    movimentos = transmitir_com_conexao(lambda db: (m.__dict__ for m in EstoqueService(db).iterar_movimentos()))
+    return StreamingResponse(json_array_em_fluxo(movimentos), media_type="application/json")
+
+
 @router.get("/movimentos/{item_id}")
 def movimentos_item(item_id: int, db: DBDependency):
     service = EstoqueService(db)
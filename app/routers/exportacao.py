@@ -0,0 +1,57 @@
+from datetime import date
+from typing import Annotated, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from src.modules.exportacao import ExportacaoService
+from src.utils.dependencies import require_role, transmitir_com_conexao
+from src.utils.models import UsuarioToken
+from src.utils.streaming import csv_em_fluxo, ndjson_em_fluxo, parquet_em_fluxo
+
+ADMIN_ONLY = require_role({'Administrador'})
+
+router = APIRouter(prefix="/exportar", tags=["Exportação"])
+
+TIPOS_MIDIA = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+@router.get("/{conjunto}")
+def exportar(
+    conjunto: Literal["vendas", "estoque", "financeiro"],
+    current_user: Annotated[UsuarioToken, Depends(ADMIN_ONLY)],
+    formato: Literal["csv", "ndjson", "parquet"] = "csv",
+    id_evento: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+):
+    """
+    Exporta vendas (uma linha por item vendido), movimentos de estoque ou lançamentos financeiros.
+    O arquivo é gerado enquanto as linhas chegam do Postgres (cursor nomeado): memória constante
+    qualquer que seja o tamanho da tabela. Apenas administradores.
+    """
+    if data_inicio and data_fim and data_inicio > data_fim:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="data_inicio posterior a data_fim.")
+
+    colunas = ExportacaoService.colunas(conjunto)
+    linhas = transmitir_com_conexao(lambda db: ExportacaoService(db).iterar(conjunto, id_evento, data_inicio, data_fim))
+    if formato == "parquet":
+        try:
+            corpo = parquet_em_fluxo(colunas, linhas)
+        except ValueError as e:  # pyarrow ausente
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    elif formato == "ndjson":
+        corpo = ndjson_em_fluxo(linhas)
+    else:
+        corpo = csv_em_fluxo([nome for nome, _ in colunas], linhas)
+
+    nome_arquivo = f"{conjunto}_{date.today():%Y%m%d}.{formato}"
+    return StreamingResponse(
+        corpo,
+        media_type=TIPOS_MIDIA[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'},
+    )
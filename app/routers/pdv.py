@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Annotated, Optional
+
+from src.utils.dependencies import DBDependency, get_token_principal
+from src.modules.pdv import PdvService
+from src.utils.models import UsuarioToken
+
+router = APIRouter(prefix="/pdv", tags=["PDV"])
+
+
+@router.get("/estado")
+def estado_pdv(
+    db: DBDependency,
+    current_user: Annotated[UsuarioToken, Depends(get_token_principal)],
+    caixa_id: Optional[int] = Query(None, description="Caixa selecionado; sem ele, o primeiro caixa ativo."),
+    versao_catalogo: Optional[int] = Query(None, description="Versão do catálogo que o cliente já tem."),
+):
+    """
+    Estado completo da tela de vendas em uma chamada: evento aberto, caixas, movimento ativo
+    do caixa, saldos de estoque e catálogo agrupado (omitido se `versao_catalogo` ainda for a atual).
+    """
+    estado = PdvService(db).buscar_estado(caixa_id, versao_catalogo)
+    if estado is None:
+        raise HTTPException(status_code=500, detail="Falha ao carregar o estado do PDV.")
+    return estado
@@ -1,7 +1,8 @@
 # app/routers/relatorios.py
 
-from fastapi import APIRouter, Depends, status, HTTPException
-from typing import List, Annotated, Dict, Any
+from fastapi import APIRouter, Depends, Query, status, HTTPException
+from typing import List, Annotated, Dict, Any, Optional
+from datetime import date
 import sys
 import os
 from decimal import Decimal # Necessário para o cálculo de soma do Inventário
@@ -10,14 +11,19 @@ from decimal import Decimal # Necessário para o cálculo de soma do Inventário
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 # Importa Services e Infraestrutura
-from src.utils.dependencies import DBDependency, require_role
-from src.modules.relatorio import RelatorioService
-from src.modules.estoque import EstoqueService
-from src.utils.models import Usuario
+from src.utils.dependencies import executar_com_conexao, require_role
+from src.modules.relatorio import RELATORIOS_CACHE, RelatorioCacheado
+from src.utils.models import UsuarioToken
 from src.utils.schemas import InventarioResponse # Reutilizaremos este Schema para o Inventário
 
 ADMIN_ONLY = require_role({'Administrador'})
 
+
+def _relatorios() -> RelatorioCacheado:
+    """Relatórios pelo cache; só uma falta de cache empresta conexão do pool."""
+    return RelatorioCacheado(executar=executar_com_conexao)
+
+
 # Cria o Router para as rotas de relatórios
 router = APIRouter(
     prefix="/relatorios",
@@ -29,9 +35,9 @@ router = APIRouter(
 # ------------------------------------------------------------------
 
 @router.get("/caixa/saldo", status_code=status.HTTP_200_OK)
-def get_saldo_caixa(db: DBDependency):
+def get_saldo_caixa():
     """Calcula e retorna o saldo total do caixa (Receitas - Despesas)."""
-    relatorio_service = RelatorioService(db)
+    relatorio_service = _relatorios()
     
     saldo = relatorio_service.calcular_saldo_fluxo_caixa()
     
@@ -45,9 +51,9 @@ def get_saldo_caixa(db: DBDependency):
 # ------------------------------------------------------------------
 
 @router.get("/despesas/categoria", response_model=List[Dict[str, Any]], status_code=status.HTTP_200_OK)
-def get_despesas_por_categoria(db: DBDependency):
+def get_despesas_por_categoria():
     """Gera um relatório de soma total gasta por cada categoria (Ex: Material, Aluguel)."""
-    relatorio_service = RelatorioService(db)
+    relatorio_service = _relatorios()
     
     despesas = relatorio_service.gerar_despesas_por_categoria()
     
@@ -63,11 +69,10 @@ def get_despesas_por_categoria(db: DBDependency):
 
 @router.get("/relatorio-gerencial")
 def get_relatorio_gerencial(
-    db: DBDependency,
     # A MÁGICA DO RBAC: Adicionamos a dependência aqui!
     # O FastAPI executa esta função ANTES de entrar na rota.
     # Se o current_user.role não for 'Administrador', ele lança HTTPException 403.
-    current_user: Annotated[Usuario, Depends(ADMIN_ONLY)] 
+    current_user: Annotated[UsuarioToken, Depends(ADMIN_ONLY)] 
 ):
     """
     Gera um relatório gerencial. Apenas usuários com a role 'Administrador' têm acesso.
@@ -78,4 +83,43 @@ def get_relatorio_gerencial(
     print(f"Relatório acessado por: {current_user.nome} ({current_user.role})")
     
     # ... Lógica de geração do relatório
-    return {"status": "ok", "dados": "Relatório Confidencial Gerencial"}
\ No newline at end of file
+    return {"status": "ok", "dados": "Relatório Confidencial Gerencial"}
+
+
+# ------------------------------------------------------------------
+# 4. ENDPOINTS: VENDAS (rollup vendas_diarias, com cache)
+# ------------------------------------------------------------------
+
+@router.get("/vendas/faturamento-mensal", response_model=List[Dict[str, Any]], status_code=status.HTTP_200_OK)
+def get_faturamento_mensal(current_user: Annotated[UsuarioToken, Depends(ADMIN_ONLY)]):
+    """Faturamento por mês (YYYY-MM)."""
+    return _relatorios().gerar_faturamento_mensal()
+
+
+@router.get("/vendas/lucro-mensal", response_model=List[Dict[str, Any]], status_code=status.HTTP_200_OK)
+def get_lucro_bruto_mensal(current_user: Annotated[UsuarioToken, Depends(ADMIN_ONLY)]):
+    """Lucro bruto (venda - custo no momento da venda) por mês."""
+    return _relatorios().gerar_lucro_bruto_mensal()
+
+
+@router.get("/vendas/top-itens", response_model=List[Dict[str, Any]], status_code=status.HTTP_200_OK)
+def get_top_itens(
+    current_user: Annotated[UsuarioToken, Depends(ADMIN_ONLY)],
+    limite: int = Query(10, ge=1, le=100),
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+):
+    """Itens mais vendidos no período."""
+    return _relatorios().gerar_top_itens(limite, data_inicio, data_fim)
+
+
+@router.get("/inventario", response_model=List[Dict[str, Any]], status_code=status.HTTP_200_OK)
+def get_inventario(current_user: Annotated[UsuarioToken, Depends(ADMIN_ONLY)]):
+    """Inventário dos itens ativos com saldo e custo em estoque."""
+    return _relatorios().gerar_inventario_total()
+
+
+@router.get("/cache", status_code=status.HTTP_200_OK)
+def get_cache_stats(current_user: Annotated[UsuarioToken, Depends(ADMIN_ONLY)]):
+    """Hits/misses/evictions do cache de relatórios deste processo."""
+    return RELATORIOS_CACHE.stats()
@@ -1,19 +1,21 @@
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
 from typing import List
 from pydantic import BaseModel
 
-from src.utils.dependencies import DBDependency
+from src.utils.dependencies import DBDependency, transmitir_com_conexao
 from src.modules.usuario import UsuarioService
 from src.utils.models import Usuario
+from src.utils.streaming import json_array_em_fluxo
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
 
 
 @router.get("/", response_model=List[dict])
-def listar_usuarios(db: DBDependency):
-    service = UsuarioService(db)
-    usuarios = service.buscar_usuarios()
-    return [u.__dict__ for u in usuarios]
+def listar_usuarios():
+    """Lista JSON transmitida linha a linha a partir de um cursor nomeado (sem montar a lista em memória)."""
+    usuarios = transmitir_com_conexao(lambda db: (u.__dict__ for u in UsuarioService(db).iterar_usuarios()))
+    return StreamingResponse(json_array_em_fluxo(usuarios), media_type="application/json")
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
@@ -1,14 +1,20 @@
-﻿from fastapi import APIRouter, Depends, status, HTTPException
-from typing import List, Optional
+﻿from fastapi import APIRouter, Depends, Header, Query, Response, status, HTTPException
+from typing import Annotated, Any, Dict, List, Optional
+from datetime import date
 from decimal import Decimal
+import hashlib
+import json
 
-from src.utils.dependencies import DBDependency
-from src.utils.schemas import VendaCreate, VendaResponse
-from src.modules.venda import VendaService
+from src.utils.dependencies import DBDependency, get_token_principal, require_role
+from src.utils.schemas import VendaCreate, VendaLoteRequest, VendaPaginaResponse, VendaResponse
+from src.modules.venda import LoteVendasIndisponivelError, VendaLote, VendaService
 from src.modules.caixas import CaixaService
 from src.modules.estoque import EstoqueService
+from src.modules.idempotencia import IdempotenciaService
 from src.modules.usuario import UsuarioService
-from src.utils.models import Venda, ItemVenda, Caixa
+from src.utils.models import Venda, ItemVenda, Caixa, UsuarioToken
+
+ADMIN_ONLY = require_role({'Administrador'})
 
 router = APIRouter(
     prefix="/vendas",
@@ -32,26 +38,22 @@ def _obter_movimento_caixa(db, responsavel_id: int, caixa_id: Optional[int], id_
     return caixa_service.abrir_movimento(cid, responsavel_id, valor_abertura, id_evento)
 
 
-@router.post("/", status_code=status.HTTP_201_CREATED)
-def registrar_venda_completa(venda_data: VendaCreate, db: DBDependency):
-    estoque_service = EstoqueService(db)
-    caixa_service = CaixaService(db)
-    venda_service = VendaService(db, estoque_service, caixa_service)
+def _hash_requisicao(venda_data: VendaCreate) -> str:
+    """Impressão digital do payload, para detectar reuso da mesma chave com outra venda."""
+    # Só os campos de VendaCreate: a mesma venda gera o mesmo hash em POST / e em POST /lote
+    dados = venda_data.model_dump(mode="json", include=set(VendaCreate.model_fields))
+    canonico = json.dumps(dados, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
 
-    if not venda_data.id_evento:
-        raise HTTPException(status_code=400, detail="id_evento é obrigatório.")
-
-    movimento_id = venda_data.id_movimento_caixa
-    if not movimento_id:
-        movimento_id = _obter_movimento_caixa(db, venda_data.responsavel_id, venda_data.id_caixa, venda_data.id_evento)
 
+def _montar_venda(venda_data: VendaCreate, movimento_id: int):
+    """Converte o payload da API no cabeçalho e nas linhas do domínio."""
     cabecalho = Venda(
         id_pessoa=venda_data.id_pessoa,
         responsavel=str(venda_data.responsavel_id),
         id_evento=venda_data.id_evento,
         id_movimento_caixa=movimento_id,
     )
-
     detalhes = [
         ItemVenda(
             id_item=item.item_id,
@@ -61,36 +63,184 @@ def registrar_venda_completa(venda_data: VendaCreate, db: DBDependency):
         )
         for item in venda_data.itens
     ]
+    return cabecalho, detalhes
+
+
+def _resposta_venda(id_venda: int) -> Dict[str, Any]:
+    return {"message": "Venda registrada com sucesso.", "id_venda": id_venda}
+
+
+def _replay_idempotente(registro: Dict[str, Any], hash_requisicao: str, response: Response) -> Dict[str, Any]:
+    """Devolve a resposta original de uma venda já registrada com a mesma Idempotency-Key."""
+    if registro["hash_requisicao"] != hash_requisicao:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Idempotency-Key já utilizada com um payload diferente.",
+        )
+    response.headers["Idempotent-Replayed"] = "true"
+    return _resposta_venda(registro["id_venda"])
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+def registrar_venda_completa(
+    venda_data: VendaCreate,
+    db: DBDependency,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+):
+    estoque_service = EstoqueService(db)
+    caixa_service = CaixaService(db)
+    venda_service = VendaService(db, estoque_service, caixa_service)
+    idempotencia_service = IdempotenciaService(db)
 
-    # Checagem de estoque explícita antes de prosseguir
-    for det in detalhes:
-        saldo = estoque_service.calcular_saldo_item(det.id_item)
-        if saldo < det.quantidade:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Estoque insuficiente para o item {det.id_item}. Necessário: {det.quantidade}, Saldo: {saldo}",
-            )
+    # Replay barato: a venda já foi registrada por uma tentativa anterior
+    hash_requisicao = None
+    if idempotency_key:
+        hash_requisicao = _hash_requisicao(venda_data)
+        registro = idempotencia_service.buscar(idempotency_key)
+        if registro:
+            return _replay_idempotente(registro, hash_requisicao, response)
 
-    id_venda = venda_service.registrar_venda_completa(cabecalho, detalhes)
+    if not venda_data.id_evento:
+        raise HTTPException(status_code=400, detail="id_evento é obrigatório.")
+
+    movimento_id = venda_data.id_movimento_caixa
+    if not movimento_id:
+        movimento_id = _obter_movimento_caixa(db, venda_data.responsavel_id, venda_data.id_caixa, venda_data.id_evento)
+
+    cabecalho, detalhes = _montar_venda(venda_data, movimento_id)
+
+    # A checagem de estoque acontece dentro da transação, com os saldos travados
+    id_venda = venda_service.registrar_venda_completa(
+        cabecalho, detalhes, chave_idempotencia=idempotency_key, hash_requisicao=hash_requisicao
+    )
 
     if id_venda is None:
+        # Um retry concorrente com a mesma chave pode ter vencido a corrida
+        if idempotency_key:
+            registro = idempotencia_service.buscar(idempotency_key)
+            if registro:
+                return _replay_idempotente(registro, hash_requisicao, response)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A transação falhou. Estoque insuficiente ou dados inválidos.",
+            detail=venda_service.ultimo_erro or "A transação falhou. Estoque insuficiente ou dados inválidos.",
         )
 
-    return {"message": "Venda registrada com sucesso.", "id_venda": id_venda}
+    return _resposta_venda(id_venda)
 
 
-@router.get("/", response_model=List[VendaResponse], status_code=status.HTTP_200_OK)
-def listar_vendas(db: DBDependency):
+@router.post("/lote", status_code=status.HTTP_200_OK)
+def registrar_vendas_lote(
+    lote: VendaLoteRequest,
+    db: DBDependency,
+    current_user: Annotated[UsuarioToken, Depends(get_token_principal)],
+):
+    """
+    Sincroniza vendas feitas offline no PDV. Cada venda traz sua Idempotency-Key:
+    reenviar o lote inteiro é seguro (as já gravadas voltam como 'duplicada').
+    Exige token válido; o responsável das vendas (e de movimentos de caixa abertos aqui) é o
+    usuário do token, não o responsavelId do payload.
+    Uma venda inválida não impede as demais; o status vem por venda em `resultados`
+    ('erro' é definitivo; 'reenviar' é falha transitória e a venda deve voltar em outro lote).
+    Se o lote inteiro for desfeito (nada gravado), responde 503 com Retry-After.
+    """
     estoque_service = EstoqueService(db)
     caixa_service = CaixaService(db)
     venda_service = VendaService(db, estoque_service, caixa_service)
-    vendas = venda_service.buscar_vendas()
-    if not vendas:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nenhuma venda registrada.")
-    return vendas
+
+    # Movimentos de caixa são resolvidos antes: abrir um movimento faz commit próprio
+    movimentos: Dict[tuple, int] = {}
+    vendas: List[VendaLote] = []
+    for venda_data in lote.vendas:
+        # Hash do payload como enviado: o replay de uma venda já gravada continua reconhecido
+        hash_requisicao = _hash_requisicao(venda_data)
+        venda_data = venda_data.model_copy(update={"responsavel_id": current_user.id})
+        movimento_id = venda_data.id_movimento_caixa
+        if not movimento_id:
+            chave_mov = (venda_data.id_caixa, venda_data.id_evento)
+            if chave_mov not in movimentos:
+                movimentos[chave_mov] = _obter_movimento_caixa(
+                    db, venda_data.responsavel_id, venda_data.id_caixa, venda_data.id_evento
+                )
+            movimento_id = movimentos[chave_mov]
+        cabecalho, detalhes = _montar_venda(venda_data, movimento_id)
+        vendas.append(VendaLote(
+            cabecalho=cabecalho,
+            itens=detalhes,
+            chave=venda_data.idempotency_key,
+            hash_requisicao=hash_requisicao,
+        ))
+
+    try:
+        resultados = venda_service.registrar_vendas_lote(vendas)
+    except LoteVendasIndisponivelError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "30"}
+        )
+    contagem = {s: sum(1 for r in resultados if r["status"] == s) for s in ("registrada", "duplicada", "reenviar", "erro")}
+    return {
+        "resultados": [
+            {
+                "indice": r["indice"],
+                "idempotency_key": r["chave"],
+                "status": r["status"],
+                "id_venda": r["id_venda"],
+                "detalhe": r["detalhe"],
+            }
+            for r in resultados
+        ],
+        "registradas": contagem["registrada"],
+        "duplicadas": contagem["duplicada"],
+        "reenviar": contagem["reenviar"],
+        "erros": contagem["erro"],
+    }
+
+
+@router.post("/{id_venda}/cancelar", status_code=status.HTTP_200_OK)
+def cancelar_venda(
+    id_venda: int,
+    db: DBDependency,
+    current_user: Annotated[UsuarioToken, Depends(ADMIN_ONLY)],
+):
+    """Cancela a venda: devolve os itens ao estoque e a retira dos relatórios. Apenas administradores."""
+    estoque_service = EstoqueService(db)
+    caixa_service = CaixaService(db)
+    venda_service = VendaService(db, estoque_service, caixa_service)
+    if not venda_service.cancelar_venda(id_venda, current_user.id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=venda_service.ultimo_erro)
+    return {"message": "Venda cancelada com sucesso.", "id_venda": id_venda}
+
+
+@router.get("/", response_model=VendaPaginaResponse, status_code=status.HTTP_200_OK)
+def listar_vendas(
+    db: DBDependency,
+    limite: int = Query(50, ge=1, le=500),
+    cursor: Optional[int] = Query(None, ge=1, description="proximo_cursor da página anterior"),
+    id_evento: Optional[int] = None,
+    id_movimento_caixa: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    responsavel: Optional[str] = None,
+):
+    """Página de vendas, mais recentes primeiro (por id; com data_inicio/data_fim, por data da venda e id)."""
+    estoque_service = EstoqueService(db)
+    caixa_service = CaixaService(db)
+    venda_service = VendaService(db, estoque_service, caixa_service)
+    # Um registro a mais indica se existe próxima página
+    vendas = venda_service.buscar_vendas(
+        limite=limite + 1,
+        cursor=cursor,
+        id_evento=id_evento,
+        id_movimento_caixa=id_movimento_caixa,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        responsavel=responsavel,
+    )
+    proximo_cursor = None
+    if len(vendas) > limite:
+        vendas = vendas[:limite]
+        proximo_cursor = vendas[-1].id
+    return {"itens": vendas, "proximo_cursor": proximo_cursor}
 
 
 @router.get("/ultimas", response_model=List[VendaResponse], status_code=status.HTTP_200_OK)
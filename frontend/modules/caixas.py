@@ -1,7 +1,6 @@
 ﻿import streamlit as st
-import requests
 
-from utils.components import API_BASE_URL
+from utils.api_client import get_api_client
 
 def caixas_page(api_base_url: str):
     st.title("Gestão de Caixas")
@@ -9,7 +8,7 @@ def caixas_page(api_base_url: str):
     if not auth_token:
         st.error("Sessão inválida. Faça login.")
         return
-    headers = {"Authorization": f"Bearer {auth_token}"}
+    api = get_api_client(api_base_url)
 
     st.subheader("Criar novo caixa")
     with st.form("criar_caixa_form"):
@@ -17,9 +16,8 @@ def caixas_page(api_base_url: str):
         descricao = st.text_input("Descrição")
         submitted = st.form_submit_button("Criar")
         if submitted:
-            resp = requests.post(
-                f"{api_base_url}/caixas/",
-                headers=headers,
+            resp = api.post(
+                "/caixas/",
                 json={"nome": nome, "descricao": descricao, "status": "Ativo"},
             )
             if resp.status_code == 201:
@@ -29,7 +27,7 @@ def caixas_page(api_base_url: str):
 
     st.markdown("---")
     st.subheader("Caixas existentes")
-    resp_list = requests.get(f"{api_base_url}/caixas/", headers=headers)
+    resp_list = api.get("/caixas/")
     if resp_list.status_code == 200:
         for c in resp_list.json():
             st.write(f"ID {c.get('id')}: {c.get('nome')} - {c.get('status')}")
@@ -1,6 +1,5 @@
 ﻿import streamlit as st
-import requests
-from utils.components import API_BASE_URL
+from utils.api_client import get_api_client
 
 
 def estoque_page(api_base_url: str):
@@ -14,10 +13,10 @@ def estoque_page(api_base_url: str):
     if not auth_token:
         st.error("Sessão inválida. Faça login.")
         return
-    headers = {"Authorization": f"Bearer {auth_token}"}
+    api = get_api_client(api_base_url)
 
     # Evento aberto
-    evento_resp = requests.get(f"{api_base_url}/eventos/aberto", headers=headers)
+    evento_resp = api.get("/eventos/aberto")
     evento = evento_resp.json() if evento_resp.status_code == 200 else None
     if not evento:
         st.warning("Nenhum evento/dia aberto. Abra em Movimentos antes de registrar estoque.")
@@ -25,7 +24,7 @@ def estoque_page(api_base_url: str):
     evento_id = evento.get("id")
     st.info(f"Evento ativo: {evento.get('nome')} (ID {evento_id})")
 
-    itens_resp = requests.get(f"{api_base_url}/catalogo/itens", headers=headers)
+    itens_resp = api.get("/catalogo/itens")
     itens = itens_resp.json() if itens_resp.status_code == 200 else []
     item_options = {f"{i.get('id')} - {i.get('nome')}": i.get("id") for i in itens}
     if itens:
@@ -50,10 +49,8 @@ def estoque_page(api_base_url: str):
                 "usuarioId": user_id,
                 "eventoId": evento_id,
             }
-            url = f"{api_base_url}/estoque/entrada" if tipo_mov == "Entrada" else f"{api_base_url}/estoque/saida"
-            resp = requests.post(
-                url, headers={**headers, "Content-Type": "application/json"}, json=payload
-            )
+            url = "/estoque/entrada" if tipo_mov == "Entrada" else "/estoque/saida"
+            resp = api.post(url, json=payload)
             if resp.status_code in (200, 201):
                 st.success("Movimento registrado.")
             else:
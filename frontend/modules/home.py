@@ -1,6 +1,7 @@
 ﻿import streamlit as st
 import requests
 
+from utils.api_client import get_api_client
 from utils.components import API_BASE_URL, set_page
 
 
@@ -23,8 +24,8 @@ def _password_change_form(api_base_url: str, email: str, old_password: str):
             if new_password != confirm_password or not new_password:
                 st.error("As senhas não conferem ou estão vazias.")
                 return
-            resp = requests.post(
-                f"{api_base_url}/change-password",
+            resp = get_api_client(api_base_url).post(
+                "/change-password",
                 json={
                     "email": email,
                     "old_password": old_password,
@@ -65,7 +66,7 @@ def login_form(api_base_url):
         if submitted:
             login_data = {"username": email, "password": password}
             try:
-                response = requests.post(f"{api_base_url}/token", data=login_data)
+                response = get_api_client(api_base_url).post("/token", data=login_data, autenticar=False)
                 if response.status_code == 200:
                     token_data = response.json()
                     if token_data.get("require_password_change"):
@@ -83,7 +84,7 @@ def login_form(api_base_url):
                     st.rerun()
                 else:
                     st.error("Falha no login: Credenciais inválidas.")
-            except requests.exceptions.ConnectionError:
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
                 st.error("Erro de conexão com a API. Certifique-se de que o uvicorn esteja rodando.")
 
 
@@ -125,8 +126,8 @@ def change_password_page(api_base_url: str):
             if new_password != confirm_password or not new_password:
                 st.error("As senhas não conferem ou estão vazias.")
                 return
-            resp = requests.post(
-                f"{api_base_url}/change-password",
+            resp = get_api_client(api_base_url).post(
+                "/change-password",
                 json={"email": email, "old_password": old_password, "new_password": new_password},
             )
             if resp.status_code == 200:
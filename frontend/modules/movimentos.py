@@ -1,7 +1,6 @@
 ﻿import streamlit as st
-import requests
 from datetime import date
-from utils.components import API_BASE_URL
+from utils.api_client import get_api_client
 
 
 def movimentos_page(api_base_url: str):
@@ -11,16 +10,16 @@ def movimentos_page(api_base_url: str):
     if not auth_token:
         st.error("Sessão inválida. Faça login.")
         return
-    headers = {"Authorization": f"Bearer {auth_token}"}
+    api = get_api_client(api_base_url)
 
     # Bloco 1: Evento/dia
     st.subheader("Evento / Dia de Trabalho")
-    evento_resp = requests.get(f"{api_base_url}/eventos/aberto", headers=headers)
+    evento_resp = api.get("/eventos/aberto")
     evento = evento_resp.json() if evento_resp.status_code == 200 else None
     if evento:
         st.success(f"Evento aberto: {evento.get('nome')} (ID {evento.get('id')}) em {evento.get('data_evento')}")
         if st.button("Fechar evento", use_container_width=True):
-            close_ev = requests.post(f"{api_base_url}/eventos/{evento.get('id')}/fechar", headers=headers)
+            close_ev = api.post(f"/eventos/{evento.get('id')}/fechar")
             if close_ev.status_code == 200:
                 st.success("Evento fechado. Recarregue para abrir outro.")
                 st.rerun()
@@ -31,7 +30,7 @@ def movimentos_page(api_base_url: str):
         nome = st.text_input("Nome do evento (opcional)", value=f"Operacao {date.today()}")
         tipo = st.text_input("Tipo (ex.: Operacao)", value="Operacao")
         if st.button("Abrir evento", use_container_width=True):
-            open_ev = requests.post(f"{api_base_url}/eventos/abrir", headers=headers, params={"nome": nome, "tipo": tipo})
+            open_ev = api.post("/eventos/abrir", params={"nome": nome, "tipo": tipo})
             if open_ev.status_code in (200, 201):
                 st.success("Evento aberto.")
                 st.rerun()
@@ -45,9 +44,8 @@ def movimentos_page(api_base_url: str):
     data_ini = col1.date_input("Data início", value=date.today().replace(day=1))
     data_fim = col2.date_input("Data fim", value=date.today())
     if st.button("Carregar eventos", use_container_width=True):
-        resp_list = requests.get(
-            f"{api_base_url}/eventos/",
-            headers=headers,
+        resp_list = api.get(
+            "/eventos/",
             params={"data_inicio": data_ini.isoformat(), "data_fim": data_fim.isoformat()},
         )
         if resp_list.status_code == 200:
@@ -59,13 +57,13 @@ def movimentos_page(api_base_url: str):
     # Bloco 2: Movimentos de caixa
     st.markdown("---")
     st.subheader("Movimentos de Caixa")
-    evento_resp = requests.get(f"{api_base_url}/eventos/aberto", headers=headers)
+    evento_resp = api.get("/eventos/aberto")
     evento = evento_resp.json() if evento_resp.status_code == 200 else None
     if not evento:
         st.info("Abra um evento para gerenciar movimentos de caixa.")
         return
 
-    caixas_resp = requests.get(f"{api_base_url}/caixas/", headers=headers)
+    caixas_resp = api.get("/caixas/")
     caixas = caixas_resp.json() if caixas_resp.status_code == 200 else []
     caixa_options = {f"{c.get('id')} - {c.get('nome')}": c.get('id') for c in caixas}
     selected_label = st.selectbox("Selecione um caixa", list(caixa_options.keys())) if caixa_options else None
@@ -75,12 +73,12 @@ def movimentos_page(api_base_url: str):
         st.info("Crie um caixa na aba Gestão de Caixas.")
         return
 
-    mov_resp = requests.get(f"{api_base_url}/caixas/{selected_caixa}/movimento-ativo", headers=headers)
+    mov_resp = api.get(f"/caixas/{selected_caixa}/movimento-ativo")
     if mov_resp.status_code == 200:
         mov = mov_resp.json()
         st.success(f"Movimento ABERTO ID {mov.get('id')} - Valor abertura: {mov.get('valor_abertura')} - Evento {mov.get('id_evento')}")
         if st.button("Fechar movimento", use_container_width=True):
-            close_resp = requests.post(f"{api_base_url}/caixas/{mov.get('id')}/fechar", headers=headers)
+            close_resp = api.post(f"/caixas/{mov.get('id')}/fechar")
             if close_resp.status_code == 200:
                 st.success("Movimento fechado.")
                 st.rerun()
@@ -91,9 +89,8 @@ def movimentos_page(api_base_url: str):
         valor = st.number_input("Valor de abertura", min_value=0.0, value=0.0, step=10.0)
         if st.button("Abrir movimento", use_container_width=True):
             params = {"usuario_id": user_id, "valor_abertura": valor, "id_evento": evento.get('id')}
-            open_resp = requests.post(
-                f"{api_base_url}/caixas/{selected_caixa}/abrir",
-                headers=headers,
+            open_resp = api.post(
+                f"/caixas/{selected_caixa}/abrir",
                 params=params,
             )
             if open_resp.status_code in (200, 201):
@@ -1,6 +1,5 @@
 ﻿import streamlit as st
-import requests
-from utils.components import API_BASE_URL
+from utils.api_client import get_api_client
 
 
 def produtos_page(api_base_url: str):
@@ -9,7 +8,7 @@ def produtos_page(api_base_url: str):
     if not auth_token:
         st.error("Sessão inválida. Faça login.")
         return
-    headers = {"Authorization": f"Bearer {auth_token}"}
+    api = get_api_client(api_base_url)
 
     st.subheader("Criar Categoria")
     with st.form("form_categoria_produtos"):
@@ -17,7 +16,7 @@ def produtos_page(api_base_url: str):
         desc_cat = st.text_input("Descrição")
         submitted = st.form_submit_button("Salvar categoria")
         if submitted:
-            resp = requests.post(f"{api_base_url}/catalogo/categorias", headers=headers, json={"nome": nome_cat, "descricao": desc_cat, "status": "Ativo"})
+            resp = api.post("/catalogo/categorias", json={"nome": nome_cat, "descricao": desc_cat, "status": "Ativo"})
             if resp.status_code in (200, 201):
                 st.success("Categoria salva.")
             else:
@@ -25,7 +24,7 @@ def produtos_page(api_base_url: str):
 
     st.markdown("---")
     st.subheader("Criar Produto")
-    cats_resp = requests.get(f"{api_base_url}/catalogo/categorias", headers=headers)
+    cats_resp = api.get("/catalogo/categorias")
     cats = cats_resp.json() if cats_resp.status_code == 200 else []
     cat_options = {f"{c.get('id')} - {c.get('nome')}": c.get('id') for c in cats}
     selected_cat_label = st.selectbox("Categoria", list(cat_options.keys())) if cat_options else None
@@ -46,7 +45,7 @@ def produtos_page(api_base_url: str):
                     "id_categoria": selected_cat,
                     "status": "Ativo",
                 }
-                resp = requests.post(f"{api_base_url}/catalogo/itens", headers=headers, json=payload)
+                resp = api.post("/catalogo/itens", json=payload)
                 if resp.status_code in (200, 201):
                     st.success("Produto salvo.")
                 else:
@@ -54,7 +53,7 @@ def produtos_page(api_base_url: str):
 
     st.markdown("---")
     st.subheader("Produtos cadastrados")
-    itens_resp = requests.get(f"{api_base_url}/catalogo/itens", headers=headers)
+    itens_resp = api.get("/catalogo/itens")
     if itens_resp.status_code == 200:
         for i in itens_resp.json():
             st.write(f"- {i.get('nome')} (ID {i.get('id')}) - Categoria: {i.get('id_categoria')} - R$ {i.get('valor_venda')}")
@@ -1,7 +1,6 @@
 ﻿import streamlit as st
-import requests
 
-from utils.components import API_BASE_URL
+from utils.api_client import get_api_client
 
 ROLE_OPTIONS = ["Administrador", "Operador", "Recepcionista"]
 
@@ -13,7 +12,7 @@ def usuarios_page(api_base_url: str):
     if not auth_token:
         st.error("Sessão inválida. Faça login.")
         return
-    headers = {"Authorization": f"Bearer {auth_token}"}
+    api = get_api_client(api_base_url)
 
     # Form de criação/edição rápida (reaproveita endpoint de criação)
     st.subheader("Criar usuário")
@@ -33,9 +32,8 @@ def usuarios_page(api_base_url: str):
                 "role": cargo,
                 "status": "Ativo",
             }
-            resp = requests.post(
-                f"{api_base_url}/usuarios/",
-                headers={**headers, "Content-Type": "application/json"},
+            resp = api.post(
+                "/usuarios/",
                 params={"senha": senha, "require_password_change": require_change},
                 json=payload,
             )
@@ -46,7 +44,7 @@ def usuarios_page(api_base_url: str):
 
     st.markdown("---")
     st.subheader("Usuários cadastrados")
-    list_resp = requests.get(f"{api_base_url}/usuarios/", headers=headers)
+    list_resp = api.get("/usuarios/")
     if list_resp.status_code == 200:
         for u in list_resp.json():
             with st.expander(f"{u.get('nome')} | {u.get('email')}"):
@@ -62,9 +60,8 @@ def usuarios_page(api_base_url: str):
                         "Status", ["Ativo", "Inativo"], index=0 if u.get('status') == "Ativo" else 1, key=f"status_{u.get('id')}"
                     )
                     if st.button("Salvar alterações", key=f"save_{u.get('id')}", use_container_width=True):
-                        upd = requests.put(
-                            f"{api_base_url}/usuarios/{u.get('id')}/role",
-                            headers={**headers, "Content-Type": "application/json"},
+                        upd = api.put(
+                            f"/usuarios/{u.get('id')}/role",
                             json={"role": novo_cargo, "status": novo_status, "funcao": nova_funcao},
                         )
                         if upd.status_code in (200, 201):
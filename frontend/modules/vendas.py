@@ -1,23 +1,38 @@
 ﻿import streamlit as st
 import requests
+import uuid
 from decimal import Decimal
-from typing import Dict, Any, List
-from utils.components import API_BASE_URL
+from typing import Dict, Any, List, Optional, Tuple
+from utils.api_client import get_api_client
+from utils import fila_offline
 
+# Tamanho de cada POST /vendas/lote na sincronização da fila offline
+LOTE_SINCRONIZACAO = 100
 
-@st.cache_data(ttl=300)
-def get_grouped_catalog(auth_token: str) -> Dict[str, List[Dict[str, Any]]]:
-    url = f"{API_BASE_URL}/catalogo/grupos"
-    headers = {"Authorization": f"Bearer {auth_token}"}
-    try:
-        resp = requests.get(url, headers=headers)
-        if resp.status_code == 200:
-            return resp.json()
-        st.error(f"Falha ao carregar catálogo. Código: {resp.status_code}.")
-        return {}
-    except requests.exceptions.ConnectionError:
-        st.error("Erro de conexão com a API.")
-        return {}
+
+def carregar_estado_pdv(auth_token: str, caixa_id: Optional[int]) -> Dict[str, Any]:
+    """
+    Uma chamada por rerun: evento, caixas, movimento ativo, saldos e catálogo (GET /pdv/estado).
+    O catálogo só vem quando a versão que temos na sessão ficou velha.
+    Levanta RequestException se a API estiver inacessível e RuntimeError para respostas de erro.
+    """
+    params: Dict[str, Any] = {}
+    if caixa_id:
+        params["caixa_id"] = caixa_id
+    if 'pdv_catalogo_offline' in st.session_state and 'pdv_catalogo_versao' in st.session_state:
+        params["versao_catalogo"] = st.session_state['pdv_catalogo_versao']
+
+    resp = get_api_client().get(
+        "/pdv/estado", headers={"Authorization": f"Bearer {auth_token}"}, params=params, timeout=5
+    )
+    if resp.status_code != 200:
+        raise RuntimeError(f"Falha ao carregar o PDV. Código: {resp.status_code}.")
+    estado = resp.json()
+    catalogo = estado["catalogo"]
+    if catalogo["grupos"] is not None:
+        st.session_state['pdv_catalogo_offline'] = catalogo["grupos"]
+        st.session_state['pdv_catalogo_versao'] = catalogo["versao"]
+    return estado
 
 
 def get_item_data_map(grouped_catalog: Dict[str, List[Dict[str, Any]]]) -> Dict[int, Dict[str, Any]]:
@@ -28,6 +43,14 @@ def get_item_data_map(grouped_catalog: Dict[str, List[Dict[str, Any]]]) -> Dict[
     return item_map
 
 
+# Carrinho: as funções abaixo são callbacks (on_click) dos botões dentro dos fragments do PDV.
+# Callbacks rodam antes do rerun, então o fragment já redesenha com o carrinho atualizado
+# sem st.rerun() e sem reexecutar vendas_page (chamadas à API).
+
+def _chave_qtde(item_id: int) -> str:
+    return f"pdv_qtde_{item_id}"
+
+
 def update_cart(item_id: int, item_name: str, item_price: float, delta_quantity: int):
     if 'cart' not in st.session_state:
         st.session_state['cart'] = {}
@@ -37,19 +60,31 @@ def update_cart(item_id: int, item_name: str, item_price: float, delta_quantity:
         st.session_state['cart'][item_id] = {'name': item_name, 'price': item_price, 'quantity': new_quantity}
     elif item_id in st.session_state['cart']:
         del st.session_state['cart'][item_id]
-    st.rerun()
+    # Campo "Qtde" do editor volta a refletir o carrinho
+    st.session_state.pop(_chave_qtde(item_id), None)
+    # Carrinho mudou: a próxima finalização é outra venda (nova Idempotency-Key)
+    st.session_state.pop('checkout_key', None)
+
+
+def _salvar_quantidade(item_id: int):
+    item = st.session_state.get('cart', {}).get(item_id)
+    if item:
+        nova_qtde = st.session_state.get(_chave_qtde(item_id), item['quantity'])
+        update_cart(item_id, item['name'], item['price'], nova_qtde - item['quantity'])
 
 
 def clear_cart():
+    for item_id in st.session_state.get('cart', {}):
+        st.session_state.pop(_chave_qtde(item_id), None)
     st.session_state['cart'] = {}
-    st.rerun()
+    st.session_state.pop('checkout_key', None)
 
 
-def post_sale(auth_token: str, user_id: int, movimento_id: int, evento_id: int):
+def post_sale(auth_token: str, user_id: int, movimento_id: int, evento_id: int) -> Tuple[str, str]:
+    """Envia o carrinho (ou o guarda na fila offline). Retorna (tipo do aviso do st, mensagem)."""
     cart = st.session_state.get('cart', {})
     if not cart:
-        st.error("O carrinho está vazio.")
-        return False
+        return "error", "O carrinho está vazio."
 
     venda_payload = {
         "eventoId": evento_id,
@@ -65,25 +100,125 @@ def post_sale(auth_token: str, user_id: int, movimento_id: int, evento_id: int):
             "valor_unitario": float(item_data['price'])
         })
 
-    headers = {"Authorization": f"Bearer {auth_token}", "Content-Type": "application/json"}
+    # Mesma chave em todos os retries deste carrinho: a API nunca registra a venda duas vezes
+    if 'checkout_key' not in st.session_state:
+        st.session_state['checkout_key'] = str(uuid.uuid4())
+    headers = {
+        "Authorization": f"Bearer {auth_token}",
+        "Content-Type": "application/json",
+        "Idempotency-Key": st.session_state['checkout_key'],
+    }
     try:
-        resp = requests.post(f"{API_BASE_URL}/vendas", headers=headers, json=venda_payload)
+        resp = get_api_client().post("/vendas", headers=headers, json=venda_payload, timeout=15)
         if resp.status_code in (200, 201):
-            st.success("Venda registrada com sucesso!")
             clear_cart()
-            return True
+            return "success", "Venda registrada com sucesso!"
         try:
             error_detail = resp.json().get('detail', "")
         except Exception:
             error_detail = resp.text or f"Falha desconhecida. Código: {resp.status_code}"
-        st.error(f"Falha ao finalizar venda: {error_detail}")
-        return False
-    except requests.exceptions.ConnectionError:
-        st.error("Erro de conexão com a API.")
-        return False
+        return "error", f"Falha ao finalizar venda: {error_detail}"
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        # Sem resposta da API: a venda fica na fila local com a mesma chave e é sincronizada depois
+        fila_offline.enfileirar_venda(st.session_state['checkout_key'], venda_payload)
+        clear_cart()
+        return "warning", "API inacessível. Venda guardada neste dispositivo e será enviada quando a conexão voltar."
+
+
+def _finalizar_venda(movimento_id: int, evento_id: int):
+    """Callback do botão FINALIZAR VENDA; o aviso é mostrado no redesenho do fragment do carrinho."""
+    auth_token = st.session_state.get('auth_token')
+    user_id = st.session_state.get('user_id')
+    if auth_token and user_id and movimento_id:
+        st.session_state['pdv_aviso'] = post_sale(auth_token, user_id, movimento_id, evento_id)
+    else:
+        st.session_state['pdv_aviso'] = ("error", "Sessão inválida ou movimento não encontrado.")
+
+
+def _indices_invalidos(resp: requests.Response) -> Dict[int, str]:
+    """Índices das vendas apontadas por um 422 do POST /vendas/lote (loc = body, vendas, índice, ...)."""
+    try:
+        erros = resp.json().get("detail") or []
+    except ValueError:
+        return {}
+    invalidos: Dict[int, str] = {}
+    for erro in erros if isinstance(erros, list) else []:
+        loc = erro.get("loc") or []
+        if len(loc) > 2 and loc[:2] == ["body", "vendas"] and isinstance(loc[2], int):
+            campo = ".".join(str(parte) for parte in loc[3:]) or "venda"
+            invalidos.setdefault(loc[2], f"{campo}: {erro.get('msg', 'inválido')}")
+    return invalidos
+
+
+def sincronizar_fila_offline(auth_token: str) -> bool:
+    """
+    Envia a fila local para POST /vendas/lote em blocos, percorrendo-a uma vez. Vendas aceitas ou já
+    registradas saem da fila; recusas definitivas ('erro', ou venda malformada em um 422) ficam
+    marcadas para conferência; falhas transitórias ('reenviar', 503/5xx) continuam pendentes.
+    Retorna False se a API estiver inacessível ou a sincronização tiver de parar (ex.: sessão expirada).
+    """
+    headers = {"Authorization": f"Bearer {auth_token}", "Content-Type": "application/json"}
+    registradas = erros = adiadas = 0
+    posicao = 0
+    concluida = True
+    while True:
+        pendentes = fila_offline.listar_pendentes(LOTE_SINCRONIZACAO, apos=posicao)
+        if not pendentes:
+            break
+        lote = {"vendas": [{**p["payload"], "idempotencyKey": p["chave"]} for p in pendentes]}
+        try:
+            resp = get_api_client().post("/vendas/lote", headers=headers, json=lote, timeout=30)
+        except requests.exceptions.RequestException:
+            return False
+
+        if resp.status_code == 401:
+            st.warning("Sessão expirada: faça login novamente para enviar as vendas offline (elas continuam guardadas).")
+            concluida = False
+            break
+        if resp.status_code == 422:
+            # A validação recusa o lote inteiro por causa de uma venda: marca só as apontadas e reenvia o resto
+            invalidos = {i: d for i, d in _indices_invalidos(resp).items() if i < len(pendentes)}
+            if not invalidos:
+                st.error(f"Falha ao sincronizar vendas offline: {resp.text}")
+                concluida = False
+                break
+            for indice, detalhe in invalidos.items():
+                fila_offline.marcar_erro(pendentes[indice]["chave"], f"Venda inválida ({detalhe})")
+                erros += 1
+            continue
+        if resp.status_code >= 500:
+            # Nada foi gravado (503 = lote desfeito): tudo segue pendente para o próximo rerun
+            adiadas += len(pendentes)
+            concluida = False
+            break
+        if resp.status_code != 200:
+            st.error(f"Falha ao sincronizar vendas offline: {resp.text}")
+            concluida = False
+            break
+
+        posicao = pendentes[-1]["posicao"]
+        enviadas = []
+        for r in resp.json().get("resultados", []):
+            if r["status"] in ("registrada", "duplicada"):
+                enviadas.append(r["idempotency_key"])
+                registradas += 1
+            elif r["status"] == "erro":
+                fila_offline.marcar_erro(r["idempotency_key"], r.get("detalhe") or "Erro desconhecido")
+                erros += 1
+            else:
+                fila_offline.adiar_venda(r["idempotency_key"], r.get("detalhe") or "Falha transitória")
+                adiadas += 1
+        fila_offline.remover_vendas(enviadas)
+    if registradas:
+        st.success(f"{registradas} venda(s) offline sincronizada(s).")
+    if adiadas:
+        st.warning(f"{adiadas} venda(s) offline não puderam ser gravadas agora; serão reenviadas automaticamente.")
+    if erros:
+        st.error(f"{erros} venda(s) offline recusada(s) pela API. Confira o estoque e registre-as manualmente.")
+    return concluida
 
 
-def render_item_buttons_by_category(grouped_catalog: Dict[str, List[Dict[str, Any]]]):
+def render_item_buttons_by_category(grouped_catalog: Dict[str, List[Dict[str, Any]]], estoque: Dict[str, int]):
     st.subheader("1. Seleção Rápida de Produtos por Categoria")
     category_names = list(grouped_catalog.keys())
     tabs = st.tabs(category_names)
@@ -93,11 +228,17 @@ def render_item_buttons_by_category(grouped_catalog: Dict[str, List[Dict[str, An
             cols = st.columns(2)
             for index, item in enumerate(items_in_category):
                 col = cols[index % 2]
-                if col.button(f"{item['nome']}\n(R$ {item['valor_venda']:.2f})", key=f"item_btn_{item['id']}", use_container_width=True):
-                    update_cart(item['id'], item['nome'], item['valor_venda'], 1)
+                saldo = estoque.get(str(item['id']), 0)
+                col.button(
+                    f"{item['nome']}\n(R$ {item['valor_venda']:.2f} · {saldo} un.)",
+                    key=f"item_btn_{item['id']}",
+                    use_container_width=True,
+                    on_click=update_cart,
+                    args=(item['id'], item['nome'], item['valor_venda'], 1),
+                )
 
 
-def render_quantity_controls(item_data_map: Dict[int, Dict[str, Any]]):
+def render_quantity_controls():
     st.subheader("2. Ajuste de Quantidade")
     cart = st.session_state.get('cart', {})
     if not cart:
@@ -107,30 +248,58 @@ def render_quantity_controls(item_data_map: Dict[int, Dict[str, Any]]):
     cart_item = cart[last_item_id]
     st.markdown(f"**Ajustando (rápido):** **{cart_item['name']}** (Qtde atual: {cart_item['quantity']})")
     q_cols = st.columns(4)
-    if q_cols[0].button("+1", key="q_plus_1", use_container_width=True):
-        update_cart(last_item_id, cart_item['name'], cart_item['price'], 1)
-    if q_cols[1].button("+5", key="q_plus_5", use_container_width=True):
-        update_cart(last_item_id, cart_item['name'], cart_item['price'], 5)
-    if q_cols[2].button("-1", key="q_minus_1", use_container_width=True):
-        update_cart(last_item_id, cart_item['name'], cart_item['price'], -1)
-    if q_cols[3].button("Zerar", key="q_zero", use_container_width=True):
-        update_cart(last_item_id, cart_item['name'], cart_item['price'], -cart_item['quantity'])
+    ajustes = [("+1", "q_plus_1", 1), ("+5", "q_plus_5", 5), ("-1", "q_minus_1", -1), ("Zerar", "q_zero", -cart_item['quantity'])]
+    for col, (rotulo, chave, delta) in zip(q_cols, ajustes):
+        col.button(
+            rotulo, key=chave, use_container_width=True,
+            on_click=update_cart, args=(last_item_id, cart_item['name'], cart_item['price'], delta),
+        )
 
     st.markdown("---")
     st.markdown("**Editar itens do carrinho**")
     for item_id, item in cart.items():
         with st.expander(f"{item['name']} (Qtde: {item['quantity']})", expanded=False):
             cols = st.columns([2, 1, 1])
-            nova_qtde = cols[0].number_input(f"Qtde_{item_id}", min_value=0, value=item['quantity'], step=1)
-            if cols[1].button("Salvar", key=f"save_{item_id}", use_container_width=True):
-                delta = nova_qtde - item['quantity']
-                update_cart(item_id, item['name'], item['price'], delta)
-            if cols[2].button("Remover", key=f"rm_{item_id}", use_container_width=True):
-                update_cart(item_id, item['name'], item['price'], -item['quantity'])
+            cols[0].number_input(f"Qtde_{item_id}", min_value=0, value=item['quantity'], step=1, key=_chave_qtde(item_id))
+            cols[1].button("Salvar", key=f"save_{item_id}", use_container_width=True, on_click=_salvar_quantidade, args=(item_id,))
+            cols[2].button(
+                "Remover", key=f"rm_{item_id}", use_container_width=True,
+                on_click=update_cart, args=(item_id, item['name'], item['price'], -item['quantity']),
+            )
+
+
+@st.fragment
+def render_painel_produtos(
+    grouped_catalog: Dict[str, List[Dict[str, Any]]], estoque: Dict[str, int], movimento_id: int, evento_id: int
+):
+    """
+    Abas de produtos (estáticas entre cliques) com o painel do carrinho aninhado.
+    Um clique de produto reexecuta este fragment, e com ele o carrinho; os ajustes do
+    carrinho reexecutam só o fragment aninhado, sem reconstruir as abas.
+    Tudo com o catálogo/saldos recebidos no último rerun completo (sem novas chamadas à API).
+    """
+    render_item_buttons_by_category(grouped_catalog, estoque)
+    st.markdown("---")
+    render_carrinho(movimento_id, evento_id)
+
+
+@st.fragment
+def render_carrinho(movimento_id: int, evento_id: int):
+    """
+    Ajuste de quantidade e resumo do carrinho no mesmo fragment: todo controle que altera o
+    carrinho redesenha também a lista e o total (fragments irmãos não se atualizam entre si).
+    """
+    render_quantity_controls()
+    st.markdown("---")
+    render_cart_summary(movimento_id, evento_id)
 
 
 def render_cart_summary(movimento_id: int, evento_id: int):
     st.subheader("3. Carrinho de Compras")
+    aviso = st.session_state.pop('pdv_aviso', None)
+    if aviso:
+        tipo, mensagem = aviso
+        getattr(st, tipo)(mensagem)
     cart = st.session_state.get('cart', {})
     if not cart:
         st.info("Nenhum item no carrinho.")
@@ -143,13 +312,10 @@ def render_cart_summary(movimento_id: int, evento_id: int):
         st.markdown(f"**{item_data['quantity']}x {item_data['name']}** *(R$ {subtotal:.2f})*")
     st.markdown("---")
     st.metric(label="Total a Pagar", value=f"R$ {total_value:.2f}")
-    if st.button("FINALIZAR VENDA", key="btn_checkout", use_container_width=True, type="primary"):
-        auth_token = st.session_state.get('auth_token')
-        user_id = st.session_state.get('user_id')
-        if auth_token and user_id and movimento_id:
-            post_sale(auth_token, user_id, movimento_id, evento_id)
-        else:
-            st.error("Sessão inválida ou movimento não encontrado.")
+    st.button(
+        "FINALIZAR VENDA", key="btn_checkout", use_container_width=True, type="primary",
+        on_click=_finalizar_venda, args=(movimento_id, evento_id),
+    )
 
 
 def vendas_page():
@@ -160,46 +326,81 @@ def vendas_page():
         st.error("Erro de sessão: Token não encontrado. Faça login novamente.")
         return
 
-    headers = {"Authorization": f"Bearer {auth_token}"}
+    api = get_api_client()
+
+    # Estado da tela em uma chamada. Sem API, o PDV segue com o último evento/caixa/movimento conhecidos
+    try:
+        estado = carregar_estado_pdv(auth_token, st.session_state.get('pdv_caixa'))
+        api_online = True
+    except requests.exceptions.RequestException:
+        estado = None
+        api_online = False
+    except RuntimeError as e:
+        st.error(str(e))
+        return
+
+    if api_online:
+        evento, caixas, estoque = estado['evento'], estado['caixas'], estado['estoque']
+        st.session_state['pdv_caixas_offline'] = caixas
+        st.session_state['pdv_estoque_offline'] = estoque
+    else:
+        evento = st.session_state.get('pdv_evento_offline')
+        caixas = st.session_state.get('pdv_caixas_offline', [])
+        estoque = st.session_state.get('pdv_estoque_offline', {})
+
+    pendentes = fila_offline.contar_vendas()
+    if api_online and pendentes:
+        sincronizar_fila_offline(auth_token)
+        pendentes = fila_offline.contar_vendas()
+    if not api_online:
+        st.warning("Modo offline: as vendas serão guardadas neste dispositivo.")
+    if pendentes:
+        st.info(f"{pendentes} venda(s) aguardando sincronização.")
 
-    # Evento/Dia
-    evento_resp = requests.get(f"{API_BASE_URL}/eventos/aberto", headers=headers)
-    evento = evento_resp.json() if evento_resp.status_code == 200 else None
     if not evento:
         st.warning("Nenhum evento/dia aberto. Abra um em Movimentos.")
         if st.button("Abrir evento agora", use_container_width=True):
-            create_ev = requests.post(f"{API_BASE_URL}/eventos/abrir", headers=headers)
+            create_ev = api.post("/eventos/abrir")
             if create_ev.status_code in (200, 201):
                 st.success("Evento aberto. Recarregando...")
                 st.rerun()
             else:
                 st.error("Falha ao abrir evento.")
         return
+    st.session_state['pdv_evento_offline'] = evento
     evento_id = evento.get('id')
     st.info(f"Evento ativo: {evento.get('nome')} (ID {evento_id})")
 
     # Caixa e movimento
-    caixas_resp = requests.get(f"{API_BASE_URL}/caixas/", headers=headers)
-    caixas = caixas_resp.json() if caixas_resp.status_code == 200 else []
-    caixa_options = {f"{c.get('id')} - {c.get('nome')}": c.get('id') for c in caixas}
-    selected_label = st.selectbox("Selecione o caixa", list(caixa_options.keys())) if caixa_options else None
-    selected_caixa = caixa_options.get(selected_label) if selected_label else None
+    nomes_caixas = {c.get('id'): c.get('nome') for c in caixas}
+    if st.session_state.get('pdv_caixa') not in nomes_caixas:
+        st.session_state.pop('pdv_caixa', None)
+    selected_caixa = st.selectbox(
+        "Selecione o caixa", list(nomes_caixas), format_func=lambda cid: f"{cid} - {nomes_caixas[cid]}", key='pdv_caixa'
+    ) if nomes_caixas else None
 
     movimento_id = None
     movimento_status = st.empty()
-    if selected_caixa:
-        mov_resp = requests.get(f"{API_BASE_URL}/caixas/{selected_caixa}/movimento-ativo", headers=headers)
-        if mov_resp.status_code == 200:
-            mov = mov_resp.json()
+    movimentos_offline = st.session_state.setdefault('pdv_movimentos_offline', {})
+    if selected_caixa and not api_online:
+        movimento_id = movimentos_offline.get(selected_caixa)
+        if movimento_id:
+            movimento_status.info(f"Movimento (offline): ID {movimento_id}")
+        else:
+            movimento_status.warning("Sem movimento conhecido para este caixa. Reconecte à API para abrir um.")
+            return
+    elif selected_caixa:
+        mov = estado['movimento'] if estado['caixa_id'] == selected_caixa else None
+        if mov:
             movimento_id = mov.get('id')
+            movimentos_offline[selected_caixa] = movimento_id
             movimento_status.success(f"Movimento aberto: ID {movimento_id} (Evento {mov.get('id_evento')})")
         else:
             movimento_status.warning("Nenhum movimento aberto para este caixa.")
             valor = st.number_input("Valor de abertura", min_value=0.0, value=0.0, step=10.0)
             if st.button("Abrir movimento", use_container_width=True):
-                open_resp = requests.post(
-                    f"{API_BASE_URL}/caixas/{selected_caixa}/abrir",
-                    headers=headers,
+                open_resp = api.post(
+                    f"/caixas/{selected_caixa}/abrir",
                     params={"usuario_id": user_id, "valor_abertura": valor, "id_evento": evento_id},
                 )
                 if open_resp.status_code in (200, 201):
@@ -215,7 +416,7 @@ def vendas_page():
         st.info("Selecione um caixa ou crie um na página de Gestão de Caixas.")
         return
 
-    grouped_catalog = get_grouped_catalog(auth_token)
+    grouped_catalog = st.session_state.get('pdv_catalogo_offline', {})
     if not grouped_catalog:
         st.warning("Catálogo vazio. Cadastre categorias e itens ativos antes de vender.")
         return
@@ -225,14 +426,12 @@ def vendas_page():
     st.markdown("---")
 
     if tab_choice == "Produtos":
-        render_item_buttons_by_category(grouped_catalog)
-        st.markdown("---")
-        render_quantity_controls(get_item_data_map(grouped_catalog))
+        render_painel_produtos(grouped_catalog, estoque, movimento_id, evento_id)
     elif tab_choice == "Carrinho":
-        render_cart_summary(movimento_id, evento_id=evento_id)
+        render_carrinho(movimento_id, evento_id)
     else:
         if st.button("Listar últimas 10 vendas", use_container_width=True, key="btn_ultimas"):
-            resp = requests.get(f"{API_BASE_URL}/vendas/ultimas", headers=headers, params={"limite": 10})
+            resp = api.get("/vendas/ultimas", params={"limite": 10})
             st.session_state['last_sales'] = resp.json() if resp.status_code == 200 else []
             if resp.status_code != 200:
                 st.error(f"Falha ao carregar vendas: {resp.text}")
@@ -0,0 +1,72 @@
+# frontend/utils/api_client.py
+# Cliente HTTP único do frontend: uma requests.Session por processo do Streamlit (keep-alive),
+# com timeouts padrão, retry com backoff e o token da sessão do usuário em cada chamada.
+
+from typing import Any, Optional
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.components import API_BASE_URL
+
+# (conexão, leitura) em segundos; chamadas específicas podem passar timeout= próprio
+TIMEOUT_PADRAO = (3.05, 15)
+
+# Falhas de conexão são repetidas para qualquer método (a requisição não chegou à API).
+# Respostas 502/503/504 e erros de leitura só para métodos idempotentes: um POST nunca é
+# reenviado depois de chegar à API (POST /vendas tem Idempotency-Key e fila offline próprias).
+RETRY_PADRAO = Retry(
+    total=2,
+    connect=2,
+    read=1,
+    backoff_factor=0.25,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}),
+    raise_on_status=False,
+    respect_retry_after_header=True,
+)
+
+
+class ApiClient:
+    """
+    Wrapper fino sobre requests.Session. A sessão (pool de conexões) é compartilhada entre
+    os usuários do processo; o header Authorization é montado a cada chamada a partir do
+    st.session_state de quem está chamando, nunca guardado na Session.
+    """
+
+    def __init__(self, base_url: str = API_BASE_URL, timeout: Any = TIMEOUT_PADRAO, retry: Retry = RETRY_PADRAO):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, path: str, autenticar: bool = True, **kwargs: Any) -> requests.Response:
+        """Como requests.request, com URL relativa à API, timeout padrão e Bearer token da sessão."""
+        headers = dict(kwargs.pop("headers", None) or {})
+        token = st.session_state.get("auth_token")
+        if autenticar and token and "Authorization" not in headers:
+            headers["Authorization"] = f"Bearer {token}"
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, f"{self.base_url}{path}", headers=headers, **kwargs)
+
+    def get(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("DELETE", path, **kwargs)
+
+
+@st.cache_resource
+def get_api_client(base_url: Optional[str] = None) -> ApiClient:
+    """Um ApiClient (e um pool de conexões) por URL base, compartilhado pelo processo."""
+    return ApiClient(base_url or API_BASE_URL)
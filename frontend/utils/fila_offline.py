@@ -0,0 +1,88 @@
+# frontend/utils/fila_offline.py
+# Fila local (SQLite) de vendas feitas enquanto a API estava inacessível.
+# Cada venda guarda a Idempotency-Key gerada no checkout: reenviar é sempre seguro.
+
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+FILA_PATH = Path(__file__).resolve().parents[2] / "data" / "pdv_offline.db"
+
+
+def _conectar() -> sqlite3.Connection:
+    FILA_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(FILA_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    # WAL: várias abas do Streamlit podem ler a fila enquanto uma sincroniza
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS fila_vendas_offline (
+            chave TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            criado_em TEXT NOT NULL,
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            ultimo_erro TEXT
+        )
+        """
+    )
+    return conn
+
+
+def enfileirar_venda(chave: str, payload: Dict[str, Any]) -> None:
+    """Guarda a venda para envio posterior. A mesma chave nunca é enfileirada duas vezes."""
+    with closing(_conectar()) as conn, conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO fila_vendas_offline (chave, payload, criado_em) VALUES (?, ?, ?)",
+            (chave, json.dumps(payload), datetime.now().isoformat(timespec="seconds")),
+        )
+
+
+def listar_pendentes(limite: int = 100, apos: int = 0) -> List[Dict[str, Any]]:
+    """
+    Vendas ainda não aceitas pela API, da mais antiga para a mais nova (ordem de enfileiramento).
+    `apos` é a `posicao` da última venda já lida: a sincronização percorre a fila uma vez,
+    sem voltar às vendas adiadas nesta mesma passada.
+    """
+    with closing(_conectar()) as conn:
+        rows = conn.execute(
+            "SELECT rowid, chave, payload FROM fila_vendas_offline WHERE status = 'pendente' AND rowid > ? "
+            "ORDER BY rowid LIMIT ?",
+            (apos, limite),
+        ).fetchall()
+    return [{"posicao": r["rowid"], "chave": r["chave"], "payload": json.loads(r["payload"])} for r in rows]
+
+
+def remover_vendas(chaves: List[str]) -> None:
+    if not chaves:
+        return
+    with closing(_conectar()) as conn, conn:
+        conn.executemany("DELETE FROM fila_vendas_offline WHERE chave = ?", [(c,) for c in chaves])
+
+
+def marcar_erro(chave: str, erro: str) -> None:
+    """Venda rejeitada pela API (ex.: estoque insuficiente): sai da fila de envio e fica para conferência."""
+    with closing(_conectar()) as conn, conn:
+        conn.execute(
+            "UPDATE fila_vendas_offline SET status = 'erro', ultimo_erro = ?, tentativas = tentativas + 1 WHERE chave = ?",
+            (erro, chave),
+        )
+
+
+def adiar_venda(chave: str, erro: str) -> None:
+    """Falha transitória (API/banco indisponível): a venda continua pendente e vai no próximo envio."""
+    with closing(_conectar()) as conn, conn:
+        conn.execute(
+            "UPDATE fila_vendas_offline SET ultimo_erro = ?, tentativas = tentativas + 1 WHERE chave = ?",
+            (erro, chave),
+        )
+
+
+def contar_vendas(status: str = "pendente") -> int:
+    with closing(_conectar()) as conn:
+        (total,) = conn.execute("SELECT COUNT(*) FROM fila_vendas_offline WHERE status = ?", (status,)).fetchone()
+    return total
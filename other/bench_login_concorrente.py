@@ -0,0 +1,101 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+"""
+Benchmark: N logins simultâneos (POST /token) enquanto outra tarefa sonda GET / continuamente.
+Se o bcrypt rodar no event loop, a latência da sonda sobe para a duração da rajada inteira;
+com o hashing fora do loop, ela fica perto da latência ociosa.
+
+Uso (raiz do projeto, banco configurado em config/secrets.toml):
+  python -m other.bench_login_concorrente --logins 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+from app.api_main import app
+from src.modules.usuario import UsuarioService
+from src.utils.database_manager import DatabaseManager
+from src.utils.models import Usuario
+
+EMAIL_BENCH = "bench-login@unython.local"
+SENHA_BENCH = "bench-senha-123"
+
+
+def _garantir_usuario() -> None:
+    db = DatabaseManager()
+    db.connect()
+    try:
+        UsuarioService(db).registrar_usuario(Usuario(nome="Bench Login", email=EMAIL_BENCH, funcao="Bench"), SENHA_BENCH)
+    finally:
+        db.disconnect()
+
+
+def _resumo(nome: str, latencias: List[float]) -> str:
+    if not latencias:
+        return f"{nome}: sem amostras"
+    ordenadas = sorted(latencias)
+    p95 = ordenadas[max(0, int(len(ordenadas) * 0.95) - 1)]
+    return (
+        f"{nome}: n={len(latencias)} p50={statistics.median(latencias) * 1000:.1f}ms "
+        f"p95={p95 * 1000:.1f}ms max={ordenadas[-1] * 1000:.1f}ms"
+    )
+
+
+async def _sondar(client: httpx.AsyncClient, parar: asyncio.Event, latencias: List[float]) -> None:
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        resp = await client.get("/")
+        resp.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+        await asyncio.sleep(0.01)
+
+
+async def _login(client: httpx.AsyncClient, latencias: List[float]) -> None:
+    inicio = time.perf_counter()
+    resp = await client.post("/token", data={"username": EMAIL_BENCH, "password": SENHA_BENCH})
+    resp.raise_for_status()
+    latencias.append(time.perf_counter() - inicio)
+
+
+async def main(logins: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        # Linha de base: sonda sem carga
+        ociosa: List[float] = []
+        parar = asyncio.Event()
+        sonda = asyncio.create_task(_sondar(client, parar, ociosa))
+        await asyncio.sleep(1)
+        parar.set()
+        await sonda
+
+        # Rajada de logins com a sonda rodando
+        sob_carga: List[float] = []
+        tempos_login: List[float] = []
+        parar = asyncio.Event()
+        sonda = asyncio.create_task(_sondar(client, parar, sob_carga))
+        inicio = time.perf_counter()
+        await asyncio.gather(*(_login(client, tempos_login) for _ in range(logins)))
+        duracao = time.perf_counter() - inicio
+        parar.set()
+        await sonda
+
+    print(f"{logins} logins em {duracao:.2f}s")
+    print(_resumo("login", tempos_login))
+    print(_resumo("GET / ociosa", ociosa))
+    print(_resumo("GET / durante os logins", sob_carga))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+    _garantir_usuario()
+    asyncio.run(main(args.logins))
+    DatabaseManager.close_pool()
@@ -21,13 +21,16 @@ class CaixaService:
     # -----------------------------------------------------------
 
     def registrar_caixa(self, caixa: Caixa) -> Optional[int]:
-        """Registra um novo Caixa físico (UPSERT lógico pelo nome)."""
-        caixa_existente = self.buscar_caixa_por_nome(caixa.nome)
-        if caixa_existente:
-            print(f"(Alerta: Caixa '{caixa.nome}' já existe. Usando ID: {caixa_existente.id})")
-            return caixa_existente.id
-
-        query = "INSERT INTO caixas (nome, descricao, status) VALUES (%s, %s, %s) RETURNING id"
+        """
+        Registra um novo Caixa físico e retorna o ID; se o nome já existir, retorna o ID existente
+        sem alterá-lo. O UPDATE de nome para ele mesmo só serve para o RETURNING devolver a linha
+        mesmo em conflito (DO NOTHING não devolve nada), inclusive entre chamadas concorrentes.
+        """
+        query = """
+        INSERT INTO caixas (nome, descricao, status) VALUES (%s, %s, %s)
+        ON CONFLICT (nome) DO UPDATE SET nome = EXCLUDED.nome
+        RETURNING id
+        """
         params = (caixa.nome, caixa.descricao, caixa.status)
         return self.db.execute_query(query, params, commit=True)
 
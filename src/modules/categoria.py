@@ -1,9 +1,22 @@
 # src/modules/categoria.py
 
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
+from src.utils.cache import CacheTTL
 from src.utils.database_manager import DatabaseManager
 from src.utils.models import Categoria # Importa o dataclass Categoria
 
+# Catálogo agrupado do PDV, indexado pela versão 'catalogo' do banco (tabela versoes).
+# Cada versão corresponde a um único conteúdo, então as entradas nunca ficam obsoletas:
+# o TTL só libera memória de versões antigas.
+CATALOGO_CACHE = CacheTTL(max_entradas=4, ttl_segundos=3600, fonte_versao=None)
+
+UPSERT_CATEGORIA_SQL = """
+ON CONFLICT (nome) DO UPDATE
+    SET descricao = EXCLUDED.descricao,
+        status = EXCLUDED.status
+"""
+
+
 class CategoriaService:
     """
     Gerencia a lógica de negócio para a entidade Categoria (Catálogo de Produtos).
@@ -16,25 +29,28 @@ class CategoriaService:
     # -----------------------------------------------------------
         
     def registrar_categoria(self, categoria: Categoria) -> Optional[int]:
-        """Registra uma nova categoria ou atualiza se já existir pelo nome (UPSERT Lógico)."""
-        
-        categoria_existente = self.buscar_categoria_por_nome(categoria.nome)
-        
-        if categoria_existente:
-            # Se existir, atualiza a descrição e o status.
-            self.editar_categoria(
-                categoria_existente.id, 
-                categoria.nome, 
-                categoria.descricao, 
-                categoria.status
-            )
-            print(f" (Alerta Washu: Categoria '{categoria.nome}' atualizada. Usando ID: {categoria_existente.id})")
-            return categoria_existente.id
-        
-        # Se não existe, insere
-        query = "INSERT INTO categorias (nome, descricao, status) VALUES (%s, %s, %s) RETURNING id"
+        """Registra uma nova categoria ou atualiza descrição/status se o nome já existir (UPSERT nativo)."""
+        query = f"""
+        INSERT INTO categorias (nome, descricao, status) VALUES (%s, %s, %s)
+        {UPSERT_CATEGORIA_SQL}
+        RETURNING id
+        """
         params = (categoria.nome, categoria.descricao, categoria.status)
         return self.db.execute_query(query, params, commit=True)
+
+    def registrar_categorias(self, categorias: List[Categoria], commit: bool = True) -> Optional[Dict[str, int]]:
+        """UPSERT em lote (um comando; nomes repetidos ficam com a última ocorrência). Retorna {nome: id}."""
+        if not categorias:
+            return {}
+        por_nome = {c.nome: c for c in categorias}
+        query = f"""
+        INSERT INTO categorias (nome, descricao, status) VALUES %s
+        {UPSERT_CATEGORIA_SQL}
+        RETURNING nome, id
+        """
+        rows = [(c.nome, c.descricao, c.status) for c in por_nome.values()]
+        result = self.db.execute_values(query, rows, fetch=True, commit=commit)
+        return dict(result) if result else None
     
     def editar_categoria(self, id_categoria: int, nome: str, descricao: Optional[str], status: str) -> bool:
         """Atualiza os dados de uma categoria existente."""
@@ -126,4 +142,24 @@ class CategoriaService:
                 grouped_data[categoria] = []
             grouped_data[categoria].append(data)
             
-        return grouped_data
\ No newline at end of file
+        return grouped_data
+
+    def versao_catalogo(self) -> int:
+        """Versão atual do catálogo (incrementada por trigger a cada escrita em itens/categorias)."""
+        result = self.db.execute_query("SELECT versao FROM versoes WHERE nome = 'catalogo'", fetch_one=True)
+        if not result or not result[1]:
+            return 0
+        return result[1][0]
+
+    def buscar_itens_por_categoria_versionado(self) -> Tuple[int, Dict[str, List[Dict[str, Any]]]]:
+        """
+        Retorna (versao, catálogo agrupado), reaproveitando o agrupamento em memória enquanto a versão não mudar.
+        A versão é lida ANTES do catálogo: se uma escrita acontecer no meio, o conteúdo guardado é no
+        máximo mais novo que a versão, e a próxima versão apenas força uma nova leitura.
+        """
+        versao = self.versao_catalogo()
+        encontrado, dados = CATALOGO_CACHE.obter(versao)
+        if not encontrado:
+            dados = self.buscar_itens_por_categoria()
+            CATALOGO_CACHE.guardar(versao, dados, 0)
+        return versao, dados
@@ -1,11 +1,24 @@
 # src/modules/estoque.py (Versão Corrigida)
 
 from src.utils.models import MovimentoEstoque
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 from src.utils.database_manager import DatabaseManager
+from src.utils.cache import incrementar_versao_dados
 
+# Sinal do movimento no saldo: 'Entrada' soma, qualquer saída subtrai
+DELTA_SALDO_SQL = "CASE WHEN tipo_movimento = 'Entrada' THEN quantidade ELSE -quantidade END"
+
+
+class EstoqueInsuficienteError(Exception):
+    """Saldo do item menor que a quantidade solicitada."""
+
+
+class EstoqueService:
+    """
+    Ledger de movimentos (`estoque`) + projeção materializada de saldos (`saldo_estoque`).
+    Todo movimento atualiza a projeção na mesma transação, então o saldo é lido em O(1).
+    """
 
-class EstoqueService:    
     # --- MÉTODOS AUXILIARES DE BUSCA (Ajustados para retornar Modelos) ---
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
@@ -18,9 +31,12 @@ class EstoqueService:
     
     def buscar_movimentos(self) -> List[MovimentoEstoque]:
         """Busca todos os movimentos de estoque."""
-        query = "SELECT * FROM estoque"
-        columns, results = self.db.execute_query(query, fetch_all=True)
-        return self._transmutar_movimento(columns, results)
+        return list(self.iterar_movimentos())
+
+    def iterar_movimentos(self, itersize: Optional[int] = None) -> Iterator[MovimentoEstoque]:
+        """Movimentos de estoque um a um, lidos em blocos por cursor nomeado (para StreamingResponse/exportação)."""
+        for row in self.db.stream_query("SELECT * FROM estoque ORDER BY id", itersize=itersize):
+            yield MovimentoEstoque(**row)
     
     def buscar_movimentos_por_item(self, id_item: int) -> List[MovimentoEstoque]:
         """Busca movimentos de estoque por ID de item."""
@@ -30,23 +46,51 @@ class EstoqueService:
 
     # --- MÉTODO PRINCIPAL ---
     
-    def registrar_movimento(self, movimento: MovimentoEstoque) -> Optional[int]:
-        """Registra um movimento de estoque (Entrada ou Saída)."""
-        query = """
-        INSERT INTO estoque 
-        (id_item, quantidade, tipo_movimento, origem_recurso, id_usuario, id_evento, data_movimento) 
-        VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id
+    def registrar_movimento(self, movimento: MovimentoEstoque, commit: bool = True) -> Optional[int]:
+        """Registra um movimento de estoque (Entrada ou Saída) e atualiza saldo_estoque na mesma transação."""
+        ids = self.registrar_movimentos([movimento], commit=commit)
+        return ids[0] if ids else None
+
+    def registrar_movimentos(self, movimentos: List[MovimentoEstoque], commit: bool = True) -> Optional[List[int]]:
+        """
+        Registra vários movimentos em um único comando: INSERT multi-linha no ledger + atualização
+        de saldo_estoque (agrupada por item) na mesma CTE, ou seja, na mesma transação.
+        Retorna os IDs na ordem dos movimentos, ou None em caso de falha.
         """
-        params = (
-            movimento.id_item, 
-            movimento.quantidade, 
-            movimento.tipo_movimento, 
-            movimento.origem_recurso, 
-            movimento.id_usuario, 
-            movimento.id_evento,
-            movimento.data_movimento # Adicionado para garantir a persistência
+        if not movimentos:
+            return []
+        query = f"""
+        WITH mov AS (
+            INSERT INTO estoque
+            (id_item, quantidade, tipo_movimento, origem_recurso, id_usuario, id_evento, data_movimento)
+            VALUES %s
+            RETURNING id, id_item, quantidade, tipo_movimento
+        ), saldo AS (
+            INSERT INTO saldo_estoque (id_item, saldo)
+            SELECT id_item, SUM({DELTA_SALDO_SQL}) FROM mov GROUP BY id_item
+            ON CONFLICT (id_item) DO UPDATE
+                SET saldo = saldo_estoque.saldo + EXCLUDED.saldo, atualizado_em = NOW()
         )
-        return self.db.execute_query(query, params, commit=True)
+        SELECT id FROM mov ORDER BY id
+        """
+        rows = [
+            (
+                m.id_item,
+                m.quantidade,
+                m.tipo_movimento,
+                m.origem_recurso,
+                m.id_usuario,
+                m.id_evento,
+                m.data_movimento,
+            )
+            for m in movimentos
+        ]
+        result = self.db.execute_values(query, rows, fetch=True, commit=commit)
+        if not result or len(result) != len(movimentos):
+            return None
+        if commit:
+            incrementar_versao_dados()
+        return [row[0] for row in result]
         
     # --- HELPERS (Funções de Alto Nível) ---
     
@@ -76,23 +120,106 @@ class EstoqueService:
     
     def calcular_saldo_item(self, id_item: int) -> int:
         """
-        Calcula o saldo atual de um item (Soma das Entradas - Soma das Saídas).
+        Retorna o saldo atual de um item (Entradas - Saídas) lendo a projeção saldo_estoque.
         """
-        query = """
-        SELECT
-            SUM(CASE WHEN tipo_movimento = 'Entrada' THEN quantidade ELSE -quantidade END)
-        FROM 
-            estoque
-        WHERE 
-            id_item = %s;
-        """
-        
+        query = "SELECT saldo FROM saldo_estoque WHERE id_item = %s"
+
         try:
             _, result = self.db.execute_query(query, (id_item,), fetch_one=True)
             
-            # O resultado é uma tupla (saldo,). Retorna 0 se for None.
+            # O resultado é uma tupla (saldo,). Retorna 0 se o item nunca teve movimento.
             saldo = result[0] if result and result[0] is not None else 0
             return int(saldo)
         except Exception as e:
             print(f" (Alerta Washu Saldo): Falha ao calcular saldo: {e}")
-            return 0
\ No newline at end of file
+            return 0
+
+    def calcular_saldos(self, ids_itens: Optional[List[int]] = None) -> Dict[int, int]:
+        """
+        Retorna {id_item: saldo} para vários itens (ou todos, se ids_itens for None) em uma única query.
+        Itens pedidos que nunca tiveram movimento aparecem com saldo 0.
+        """
+        if ids_itens is not None and not ids_itens:
+            return {}
+        query = "SELECT id_item, saldo FROM saldo_estoque"
+        params = None
+        if ids_itens is not None:
+            query += " WHERE id_item = ANY(%s)"
+            params = (list(ids_itens),)
+
+        result = self.db.execute_query(query, params, fetch_all=True)
+        rows = result[1] if result else None
+        saldos = {item_id: 0 for item_id in ids_itens} if ids_itens is not None else {}
+        for id_item, saldo in rows or []:
+            saldos[id_item] = int(saldo)
+        return saldos
+
+    def bloquear_saldos(self, ids_itens: List[int]) -> Dict[int, int]:
+        """
+        Trava (SELECT ... FOR UPDATE) as linhas de saldo dos itens, sempre em ordem crescente de id,
+        e retorna {id_item: saldo}. Não faz commit: os locks valem até o fim da transação do chamador.
+        A ordem determinística evita deadlock entre vendas concorrentes com os mesmos itens.
+        """
+        ids_ordenados = sorted(set(ids_itens))
+        query = "SELECT id_item, saldo FROM saldo_estoque WHERE id_item = ANY(%s) ORDER BY id_item FOR UPDATE"
+        result = self.db.execute_query(query, (ids_ordenados,), fetch_all=True)
+        if result is False:
+            raise Exception("Falha ao bloquear saldos de estoque.")
+        saldos = {item_id: 0 for item_id in ids_ordenados}
+        for id_item, saldo in result[1] or []:
+            saldos[id_item] = int(saldo)
+        return saldos
+
+    # --- MANUTENÇÃO DA PROJEÇÃO saldo_estoque ---
+
+    def verificar_saldos(self) -> List[Dict[str, Any]]:
+        """
+        Recalcula os saldos a partir do ledger e compara com a projeção.
+        Retorna apenas os itens divergentes (lista vazia = projeção consistente).
+        """
+        query = f"""
+        WITH ledger AS (
+            SELECT id_item, SUM({DELTA_SALDO_SQL}) AS saldo
+            FROM estoque
+            GROUP BY id_item
+        )
+        SELECT
+            COALESCE(l.id_item, s.id_item) AS id_item,
+            COALESCE(l.saldo, 0) AS saldo_ledger,
+            COALESCE(s.saldo, 0) AS saldo_projecao
+        FROM ledger l
+        FULL OUTER JOIN saldo_estoque s ON s.id_item = l.id_item
+        WHERE COALESCE(l.saldo, 0) <> COALESCE(s.saldo, 0)
+        ORDER BY 1
+        """
+        columns, results = self.db.execute_query(query, fetch_all=True)
+        if results:
+            return [dict(zip(columns, row)) for row in results]
+        return []
+
+    def reconstruir_saldos(self) -> Optional[int]:
+        """
+        Reconstrói saldo_estoque inteiro a partir do ledger, em uma única transação.
+        Bloqueia novas escritas no ledger durante a reconstrução. Retorna o nº de itens.
+        """
+        try:
+            if not self.db.execute_query("LOCK TABLE estoque IN SHARE MODE"):
+                raise Exception("Falha ao bloquear o ledger de estoque.")
+            if self.db.execute_query("DELETE FROM saldo_estoque", return_rowcount=True) is False:
+                raise Exception("Falha ao limpar a projeção.")
+            total = self.db.execute_query(
+                f"""
+                INSERT INTO saldo_estoque (id_item, saldo)
+                SELECT id_item, SUM({DELTA_SALDO_SQL}) FROM estoque GROUP BY id_item
+                """,
+                return_rowcount=True,
+            )
+            if total is False:
+                raise Exception("Falha ao recalcular a projeção.")
+            self.db.conn.commit()
+            incrementar_versao_dados()
+            return total
+        except Exception as e:
+            self.db.conn.rollback()
+            print(f" (Alerta Washu Saldo): Falha ao reconstruir saldos: {e}")
+            return None
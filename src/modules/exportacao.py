@@ -0,0 +1,141 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+# src/modules/exportacao.py
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.database_manager import DatabaseManager
+
+# Por conjunto: colunas (nome, tipo) na ordem do arquivo, SELECT base e coluna de data dos filtros.
+# Tipos: 'int', 'texto', 'data', 'timestamp', 'decimal' (usados pelo Parquet; CSV/NDJSON só precisam dos nomes).
+CONJUNTOS_EXPORTACAO: Dict[str, Dict[str, Any]] = {
+    # Uma linha por item vendido (o que a contabilidade concilia), com o cabeçalho da venda repetido
+    "vendas": {
+        "colunas": [
+            ("id_venda", "int"),
+            ("data_venda", "data"),
+            ("id_evento", "int"),
+            ("evento", "texto"),
+            ("caixa", "texto"),
+            ("responsavel", "texto"),
+            ("status_venda", "texto"),
+            ("id_item", "int"),
+            ("item", "texto"),
+            ("categoria", "texto"),
+            ("quantidade", "int"),
+            ("valor_unitario", "decimal"),
+            ("custo_unitario", "decimal"),
+            ("valor_total", "decimal"),
+            ("custo_total", "decimal"),
+        ],
+        "sql": """
+            SELECT v.id AS id_venda, v.data_venda, v.id_evento, e.nome AS evento, cx.nome AS caixa,
+                   v.responsavel, v.status AS status_venda, iv.id_item, i.nome AS item, c.nome AS categoria,
+                   iv.quantidade, iv.valor_unitario, iv.custo_unitario,
+                   iv.quantidade * iv.valor_unitario AS valor_total,
+                   iv.quantidade * iv.custo_unitario AS custo_total
+            FROM vendas v
+            JOIN itens_venda iv ON iv.id_venda = v.id
+            JOIN itens i ON i.id = iv.id_item
+            LEFT JOIN categorias c ON c.id = i.id_categoria
+            JOIN eventos e ON e.id = v.id_evento
+            JOIN movimentos_caixa mc ON mc.id = v.id_movimento_caixa
+            JOIN caixas cx ON cx.id = mc.id_caixa
+        """,
+        "data": "v.data_venda",
+        "evento": "v.id_evento",
+        "ordem": "v.id, iv.id",
+    },
+    "estoque": {
+        "colunas": [
+            ("id", "int"),
+            ("data_movimento", "data"),
+            ("id_item", "int"),
+            ("item", "texto"),
+            ("tipo_movimento", "texto"),
+            ("quantidade", "int"),
+            ("origem_recurso", "texto"),
+            ("id_usuario", "int"),
+            ("id_evento", "int"),
+        ],
+        "sql": """
+            SELECT m.id, m.data_movimento, m.id_item, i.nome AS item, m.tipo_movimento, m.quantidade,
+                   m.origem_recurso, m.id_usuario, m.id_evento
+            FROM estoque m
+            JOIN itens i ON i.id = m.id_item
+        """,
+        "data": "m.data_movimento",
+        "evento": "m.id_evento",
+        "ordem": "m.id",
+    },
+    "financeiro": {
+        "colunas": [
+            ("id", "int"),
+            ("data_registro", "timestamp"),
+            ("tipo_movimento", "texto"),
+            ("valor", "decimal"),
+            ("descricao", "texto"),
+            ("categoria", "texto"),
+            ("id_evento", "int"),
+            ("id_usuario", "int"),
+            ("status", "texto"),
+        ],
+        "sql": """
+            SELECT f.id, f.data_registro, f.tipo_movimento, f.valor, f.descricao, f.categoria,
+                   f.id_evento, f.id_usuario, f.status
+            FROM movimentos_financeiros f
+        """,
+        "data": "f.data_registro::date",
+        "evento": "f.id_evento",
+        "ordem": "f.id",
+    },
+}
+
+
+class ExportacaoService:
+    """
+    Exportação para a contabilidade: cada conjunto é lido por cursor nomeado (stream_query)
+    e entregue linha a linha, então a memória usada não depende do tamanho da tabela.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+
+    @staticmethod
+    def colunas(conjunto: str) -> List[Tuple[str, str]]:
+        return CONJUNTOS_EXPORTACAO[conjunto]["colunas"]
+
+    def iterar(
+        self,
+        conjunto: str,
+        id_evento: Optional[int] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        itersize: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Linhas do conjunto ('vendas', 'estoque' ou 'financeiro'), filtradas por evento e/ou período (inclusivo)."""
+        if conjunto not in CONJUNTOS_EXPORTACAO:
+            raise ValueError(f"Conjunto desconhecido: '{conjunto}'. Use {', '.join(CONJUNTOS_EXPORTACAO)}.")
+        if data_inicio and data_fim and data_inicio > data_fim:
+            raise ValueError("data_inicio posterior a data_fim.")
+
+        definicao = CONJUNTOS_EXPORTACAO[conjunto]
+        condicoes: List[str] = []
+        params: List[Any] = []
+        filtros = (
+            (f"{definicao['evento']} = %s", id_evento),
+            (f"{definicao['data']} >= %s", data_inicio),
+            (f"{definicao['data']} <= %s", data_fim),
+        )
+        for condicao, valor in filtros:
+            if valor is not None:
+                condicoes.append(condicao)
+                params.append(valor)
+
+        query = definicao["sql"]
+        if condicoes:
+            query += " WHERE " + " AND ".join(condicoes)
+        query += f" ORDER BY {definicao['ordem']}"
+        return self.db.stream_query(query, tuple(params), itersize=itersize, rotulo=f"ExportacaoService.{conjunto}")
@@ -2,6 +2,7 @@
 
 from typing import List, Optional, Dict, Any
 from src.utils.database_manager import DatabaseManager
+from src.utils.cache import incrementar_versao_dados
 from src.utils.models import MovimentoFinanceiro # Importar o dataclass que acabamos de criar
 
 class FluxoDeCaixaService:
@@ -54,6 +55,7 @@ class FluxoDeCaixaService:
             # Usamos commit=True aqui, pois cada movimento financeiro é atômico
             last_id = self.db.execute_query(query, values, commit=True)
             if last_id:
+                incrementar_versao_dados()
                 print(f" -> Movimento Financeiro de {movimento.tipo_movimento} ({movimento.categoria}) registrado com ID: {last_id}")
             return last_id
         except Exception as e:
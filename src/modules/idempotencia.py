@@ -0,0 +1,92 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+# src/modules/idempotencia.py
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from src.utils.database_manager import DatabaseManager
+
+# Por quanto tempo uma Idempotency-Key garante o replay da venda original
+TTL_IDEMPOTENCIA = timedelta(hours=24)
+
+# Limpeza das chaves expiradas durante o uso: no máximo uma a cada intervalo, por processo
+INTERVALO_LIMPEZA_SEGUNDOS = 300
+_proxima_limpeza = 0.0
+_limpeza_lock = threading.Lock()
+
+
+class IdempotenciaService:
+    """
+    Registro de Idempotency-Keys de POST /vendas.
+    A chave é gravada na mesma transação da venda; a PK em `chave` garante que,
+    entre retries concorrentes, só um consiga registrar a venda.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+
+    def buscar(self, chave: str) -> Optional[Dict[str, Any]]:
+        """Retorna {chave, hash_requisicao, id_venda} se a chave existir e não tiver expirado."""
+        query = """
+        SELECT chave, hash_requisicao, id_venda
+        FROM idempotencia_vendas
+        WHERE chave = %s AND expira_em > NOW()
+        """
+        result = self.db.execute_query(query, (chave,), fetch_one=True)
+        if result and result[1]:
+            return dict(zip(result[0], result[1]))
+        return None
+
+    def registrar(self, chave: str, hash_requisicao: str, id_venda: int, commit: bool = False) -> bool:
+        """
+        Grava a chave para a venda (sem commit, por padrão, para participar da transação da venda).
+        Retorna False se a chave já pertence a outra venda ainda válida; chaves expiradas são reaproveitadas.
+        """
+        query = """
+        INSERT INTO idempotencia_vendas (chave, hash_requisicao, id_venda, expira_em)
+        VALUES (%s, %s, %s, NOW() + %s)
+        ON CONFLICT (chave) DO UPDATE
+            SET hash_requisicao = EXCLUDED.hash_requisicao,
+                id_venda = EXCLUDED.id_venda,
+                criado_em = NOW(),
+                expira_em = EXCLUDED.expira_em
+            WHERE idempotencia_vendas.expira_em <= NOW()
+        RETURNING chave
+        """
+        result = self.db.execute_query(query, (chave, hash_requisicao, id_venda, TTL_IDEMPOTENCIA), commit=commit)
+        return result == chave
+
+    def limpar_expiradas(self, limite: int = 5000) -> int:
+        """
+        Remove até `limite` chaves expiradas. SKIP LOCKED evita disputar linhas com vendas em andamento.
+        Retorna o nº de chaves removidas.
+        """
+        query = """
+        DELETE FROM idempotencia_vendas
+        WHERE chave IN (
+            SELECT chave FROM idempotencia_vendas
+            WHERE expira_em <= NOW()
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        """
+        removidas = self.db.execute_query(query, (limite,), commit=True, return_rowcount=True)
+        return removidas or 0
+
+    def limpar_expiradas_se_devido(self, limite: int = 1000) -> int:
+        """
+        limpar_expiradas no máximo uma vez a cada INTERVALO_LIMPEZA_SEGUNDOS neste processo.
+        Chamada depois do commit das vendas com chave, para que a tabela não cresça numa API que
+        fica semanas no ar (o boot também limpa). Faz commit próprio: não usar dentro de uma transação.
+        """
+        global _proxima_limpeza
+        with _limpeza_lock:
+            agora = time.monotonic()
+            if agora < _proxima_limpeza:
+                return 0
+            _proxima_limpeza = agora + INTERVALO_LIMPEZA_SEGUNDOS
+        return self.limpar_expiradas(limite)
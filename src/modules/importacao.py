@@ -0,0 +1,214 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+# src/modules/importacao.py
+import csv
+import io
+from typing import IO, Any, Dict
+
+from src.utils.cache import incrementar_versao_dados
+from src.utils.database_manager import DatabaseManager
+
+# Colunas aceitas no arquivo (cabeçalho obrigatório, em qualquer ordem)
+COLUNAS_CATALOGO = ("categoria", "nome", "valor_compra", "valor_venda", "status")
+COLUNAS_OBRIGATORIAS = {"nome", "valor_compra", "valor_venda"}
+
+# Quantos erros voltam detalhados no relatório (o total vem sempre em erros_total)
+MAX_ERROS_RELATORIO = 1000
+
+# Valor monetário aceito: até 8 dígitos inteiros (NUMERIC(10, 2)), separador . ou ,
+_VALOR_REGEX = "^[0-9]{1,8}([.,][0-9]{1,2})?$"
+
+
+class ImportacaoCatalogoService:
+    """
+    Importação em massa de categorias/itens a partir de CSV ou XLSX.
+    O arquivo vai por COPY para uma tabela temporária (tudo TEXT, então nenhuma linha derruba o COPY);
+    validação e merge em categorias/itens são comandos set-based, em uma única transação.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+
+    def importar(self, arquivo: IO, nome_arquivo: str, simular: bool = False) -> Dict[str, Any]:
+        """Escolhe o formato pela extensão (.csv ou .xlsx)."""
+        extensao = nome_arquivo.lower().rsplit(".", 1)[-1]
+        if extensao == "xlsx":
+            return self.importar_xlsx(arquivo, simular)
+        if extensao == "csv":
+            return self.importar_csv(arquivo, simular)
+        raise ValueError(f"Formato não suportado: '{nome_arquivo}'. Use .csv ou .xlsx.")
+
+    def importar_xlsx(self, arquivo: IO, simular: bool = False) -> Dict[str, Any]:
+        """Converte a primeira planilha para CSV em memória e segue o fluxo do CSV."""
+        try:
+            import openpyxl  # dependência opcional, só para .xlsx
+        except ImportError:
+            raise ValueError("Importação de .xlsx requer o pacote 'openpyxl' (pip install openpyxl).")
+
+        planilha = openpyxl.load_workbook(arquivo, read_only=True, data_only=True).active
+        texto = io.StringIO()
+        writer = csv.writer(texto)
+        for row in planilha.iter_rows(values_only=True):
+            writer.writerow(["" if valor is None else str(valor) for valor in row])
+        texto.seek(0)
+        return self.importar_csv(texto, simular)
+
+    def importar_csv(self, arquivo: IO, simular: bool = False) -> Dict[str, Any]:
+        """
+        Importa um CSV (separador , ou ;) com cabeçalho. Itens com nome já existente são atualizados;
+        categorias novas são criadas. Com `simular=True` tudo é validado e desfeito no final.
+        Retorna {total_linhas, inseridos, atualizados, categorias_criadas, erros_total, erros, simulado},
+        onde `erros` traz {linha, nome, erro} (linha do arquivo, contando o cabeçalho como 1).
+        """
+        if isinstance(arquivo.read(0), bytes):
+            arquivo = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+        cabecalho_bruto = arquivo.readline().lstrip("﻿")
+        delimitador = ";" if cabecalho_bruto.count(";") > cabecalho_bruto.count(",") else ","
+        cabecalho = [c.strip().lower() for c in next(csv.reader([cabecalho_bruto], delimiter=delimitador), [])]
+
+        desconhecidas = [c for c in cabecalho if c not in COLUNAS_CATALOGO]
+        if desconhecidas:
+            raise ValueError(f"Colunas desconhecidas: {', '.join(desconhecidas)}. Aceitas: {', '.join(COLUNAS_CATALOGO)}.")
+        faltando = COLUNAS_OBRIGATORIAS - set(cabecalho)
+        if faltando:
+            raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(sorted(faltando))}.")
+        if len(set(cabecalho)) != len(cabecalho):
+            raise ValueError("Cabeçalho com colunas repetidas.")
+
+        try:
+            self._executar(
+                """
+                CREATE TEMP TABLE staging_catalogo (
+                    linha BIGINT GENERATED ALWAYS AS IDENTITY,
+                    categoria TEXT,
+                    nome TEXT,
+                    valor_compra TEXT,
+                    valor_venda TEXT,
+                    status TEXT,
+                    erro TEXT
+                ) ON COMMIT DROP
+                """,
+                rotulo="ImportacaoCatalogoService.staging",
+            )
+            total = self.db.copy_from(
+                f"COPY staging_catalogo ({', '.join(cabecalho)}) FROM STDIN "
+                f"WITH (FORMAT csv, DELIMITER '{delimitador}')",
+                arquivo,
+                rotulo="ImportacaoCatalogoService.copy",
+            )
+            if total is False:
+                raise ValueError("Arquivo CSV inválido (verifique aspas e número de colunas por linha).")
+
+            self._validar_staging()
+            categorias_criadas = self._executar(
+                """
+                INSERT INTO categorias (nome)
+                SELECT DISTINCT btrim(categoria) FROM staging_catalogo
+                WHERE erro IS NULL AND COALESCE(btrim(categoria), '') <> ''
+                ON CONFLICT (nome) DO NOTHING
+                """,
+                return_rowcount=True,
+                rotulo="ImportacaoCatalogoService.merge_categorias",
+            )
+            _, (inseridos, atualizados) = self._executar(
+                """
+                WITH merge AS (
+                    INSERT INTO itens (nome, valor_compra, valor_venda, status, id_categoria)
+                    SELECT btrim(s.nome),
+                           replace(btrim(s.valor_compra), ',', '.')::numeric,
+                           replace(btrim(s.valor_venda), ',', '.')::numeric,
+                           COALESCE(NULLIF(btrim(s.status), ''), 'Ativo'),
+                           c.id
+                    FROM staging_catalogo s
+                    LEFT JOIN categorias c ON c.nome = btrim(s.categoria)
+                    WHERE s.erro IS NULL
+                    ON CONFLICT (nome) DO UPDATE
+                        SET valor_compra = EXCLUDED.valor_compra,
+                            valor_venda = EXCLUDED.valor_venda,
+                            status = EXCLUDED.status,
+                            id_categoria = EXCLUDED.id_categoria
+                    RETURNING (xmax = 0) AS inserido
+                )
+                SELECT COUNT(*) FILTER (WHERE inserido), COUNT(*) FILTER (WHERE NOT inserido) FROM merge
+                """,
+                fetch_one=True,
+                rotulo="ImportacaoCatalogoService.merge_itens",
+            )
+            _, (erros_total,) = self._executar(
+                "SELECT COUNT(*) FROM staging_catalogo WHERE erro IS NOT NULL",
+                fetch_one=True,
+                rotulo="ImportacaoCatalogoService.contar_erros",
+            )
+            columns, erros = self._executar(
+                """
+                SELECT linha + 1 AS linha, nome, erro FROM staging_catalogo
+                WHERE erro IS NOT NULL ORDER BY linha LIMIT %s
+                """,
+                (MAX_ERROS_RELATORIO,),
+                fetch_all=True,
+                rotulo="ImportacaoCatalogoService.relatorio_erros",
+            )
+
+            if simular:
+                self.db.conn.rollback()
+            else:
+                self.db.conn.commit()
+                incrementar_versao_dados()
+
+        except Exception:
+            self.db.conn.rollback()
+            raise
+
+        return {
+            "total_linhas": total,
+            "inseridos": inseridos,
+            "atualizados": atualizados,
+            "categorias_criadas": categorias_criadas,
+            "erros_total": erros_total,
+            "erros": [dict(zip(columns, row)) for row in erros or []],
+            "simulado": simular,
+        }
+
+    def _validar_staging(self) -> None:
+        """Marca em `erro` as linhas inválidas; só as linhas com erro NULL entram no merge."""
+        self._executar(
+            f"""
+            UPDATE staging_catalogo SET erro = CASE
+                WHEN COALESCE(btrim(nome), '') = '' THEN 'nome obrigatório'
+                WHEN length(btrim(nome)) > 255 THEN 'nome com mais de 255 caracteres'
+                WHEN length(btrim(categoria)) > 100 THEN 'categoria com mais de 100 caracteres'
+                WHEN COALESCE(btrim(valor_compra), '') !~ '{_VALOR_REGEX}' THEN 'valor_compra inválido'
+                WHEN COALESCE(btrim(valor_venda), '') !~ '{_VALOR_REGEX}' THEN 'valor_venda inválido'
+                WHEN replace(btrim(valor_compra), ',', '.')::numeric <= 0 THEN 'valor_compra deve ser maior que zero'
+                WHEN replace(btrim(valor_venda), ',', '.')::numeric <= 0 THEN 'valor_venda deve ser maior que zero'
+                WHEN COALESCE(NULLIF(btrim(status), ''), 'Ativo') NOT IN ('Ativo', 'Inativo')
+                    THEN 'status deve ser Ativo ou Inativo'
+            END
+            """,
+            rotulo="ImportacaoCatalogoService.validar",
+        )
+        # Nome repetido no arquivo: vale a última ocorrência, as anteriores viram erro
+        self._executar(
+            """
+            UPDATE staging_catalogo s
+            SET erro = 'nome repetido no arquivo; vale a linha ' || (d.ultima + 1)
+            FROM (
+                SELECT btrim(nome) AS nome, MAX(linha) AS ultima
+                FROM staging_catalogo
+                WHERE erro IS NULL
+                GROUP BY btrim(nome)
+                HAVING COUNT(*) > 1
+            ) d
+            WHERE btrim(s.nome) = d.nome AND s.linha < d.ultima AND s.erro IS NULL
+            """,
+            rotulo="ImportacaoCatalogoService.duplicados",
+        )
+
+    def _executar(self, query: str, params: Any = None, **kwargs: Any) -> Any:
+        """execute_query que levanta exceção em erro SQL (a transação da importação é tudo ou nada)."""
+        result = self.db.execute_query(query, params, **kwargs)
+        if result is False:
+            raise Exception("Falha ao executar etapa da importação do catálogo.")
+        return result
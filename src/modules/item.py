@@ -1,9 +1,20 @@
 # src/modules/item.py
 
-from typing import List, Optional
+from typing import Dict, List, Optional
+from src.utils.cache import incrementar_versao_dados
 from src.utils.database_manager import DatabaseManager
 from src.utils.models import Item # Assumindo que Item agora tem 'id_categoria'
 
+# Conflito por nome: o item existente recebe os valores novos
+UPSERT_ITEM_SQL = """
+ON CONFLICT (nome) DO UPDATE
+    SET valor_compra = EXCLUDED.valor_compra,
+        valor_venda = EXCLUDED.valor_venda,
+        status = EXCLUDED.status,
+        id_categoria = EXCLUDED.id_categoria
+"""
+
+
 class ItemService:
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
@@ -13,26 +24,41 @@ class ItemService:
     # -----------------------------------------------------------
     
     def registrar_item(self, item: Item) -> Optional[int]:
-        """Registra um item ou retorna o ID se o nome já existir (UPSERT LÓGICO)."""
-        item_existente = self.buscar_item_por_nome(item.nome)
-        
-        if item_existente:
-            # Item já existe, atualiza os valores e retorna o ID existente.
-            self.editar_item(
-                item_existente.id, 
-                item.nome, 
-                item.valor_compra, 
-                item.valor_venda, 
-                item.status, 
-                item.id_categoria
-            ) 
-            print(f" (Alerta Washu: Item '{item.nome}' atualizado e usando ID: {item_existente.id})")
-            return item_existente.id
-        
-        # Se não existe, insere um novo (Incluindo id_categoria)
-        query = "INSERT INTO itens (nome, valor_compra, valor_venda, status, id_categoria) VALUES (%s, %s, %s, %s, %s) RETURNING id"
+        """Registra um item ou, se o nome já existir, atualiza seus valores. Retorna o ID (UPSERT nativo)."""
+        query = f"""
+        INSERT INTO itens (nome, valor_compra, valor_venda, status, id_categoria)
+        VALUES (%s, %s, %s, %s, %s)
+        {UPSERT_ITEM_SQL}
+        RETURNING id
+        """
         values = (item.nome, item.valor_compra, item.valor_venda, item.status, item.id_categoria)
-        return self.db.execute_query(query, values, commit=True)
+        novo_id = self.db.execute_query(query, values, commit=True)
+        if novo_id:
+            incrementar_versao_dados()  # inventário e relatórios usam o catálogo
+        return novo_id
+
+    def registrar_itens(self, itens: List[Item], commit: bool = True) -> Optional[Dict[str, int]]:
+        """
+        UPSERT em lote: um único INSERT ... ON CONFLICT para todos os itens. Nomes repetidos no lote
+        são reduzidos à última ocorrência (o Postgres não atualiza a mesma linha duas vezes por comando).
+        Retorna {nome: id}, ou None em caso de falha.
+        """
+        if not itens:
+            return {}
+        por_nome = {item.nome: item for item in itens}
+        query = f"""
+        INSERT INTO itens (nome, valor_compra, valor_venda, status, id_categoria)
+        VALUES %s
+        {UPSERT_ITEM_SQL}
+        RETURNING nome, id
+        """
+        rows = [(i.nome, i.valor_compra, i.valor_venda, i.status, i.id_categoria) for i in por_nome.values()]
+        result = self.db.execute_values(query, rows, fetch=True, commit=commit)
+        if not result:
+            return None
+        if commit:
+            incrementar_versao_dados()
+        return dict(result)
     
     def editar_item(self, item_id: int, nome: str, valor_compra: float, valor_venda: float, status: str, id_categoria: Optional[int]):
         """Atualiza os dados de um item existente, incluindo o status e a categoria."""
@@ -48,7 +74,10 @@ class ItemService:
         """
         values = (nome, valor_compra, valor_venda, status, id_categoria, item_id)
         # Usamos commit=True aqui para a operação atômica de atualização.
-        return self.db.execute_query(query, values, commit=True)
+        resultado = self.db.execute_query(query, values, commit=True)
+        if resultado:
+            incrementar_versao_dados()
+        return resultado
     
     # -----------------------------------------------------------
     # 2. BUSCA E CONSULTA (Queries atualizadas para incluir id_categoria)
@@ -97,10 +126,15 @@ class ItemService:
             
         # 2. Execução Segura (Se não houver vínculo, está livre para ir):
         query = "DELETE FROM itens WHERE id = %s"
-        self.db.execute_query(query, (item_id,), commit=True)
+        if not self.db.execute_query(query, (item_id,), commit=True):
+            return False
+        incrementar_versao_dados()
         return True
     
     def inativar_item(self, item_id: int) -> bool:
         """Inativa um item, mantendo a história da venda intacta."""
         query = "UPDATE itens SET status = 'Inativo' WHERE id = %s"
-        return self.db.execute_query(query, (item_id,), commit=True)
\ No newline at end of file
+        resultado = self.db.execute_query(query, (item_id,), commit=True)
+        if resultado:
+            incrementar_versao_dados()
+        return resultado
\ No newline at end of file
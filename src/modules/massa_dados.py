@@ -0,0 +1,267 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+# src/modules/massa_dados.py
+import csv
+import random
+import tempfile
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import Any, Dict, List, Tuple
+
+from src.modules.caixas import CaixaService
+from src.modules.estoque import EstoqueService
+from src.modules.venda import VendaService
+from src.utils.cache import incrementar_versao_dados
+from src.utils.database_manager import DatabaseManager
+
+# Colunas gravadas por tabela, na ordem do COPY (que respeita as FKs)
+COLUNAS_MASSA: Dict[str, Tuple[str, ...]] = {
+    "usuarios": ("id", "nome", "email", "funcao", "role", "status"),
+    "pessoas": ("id", "nome", "telefone", "data_cadastro"),
+    "categorias": ("id", "nome", "descricao", "status"),
+    "itens": ("id", "nome", "valor_compra", "valor_venda", "status", "id_categoria"),
+    "caixas": ("id", "nome", "descricao", "status"),
+    "eventos": ("id", "nome", "data_evento", "tipo", "status"),
+    "movimentos_caixa": (
+        "id", "id_caixa", "id_usuario_abertura", "id_evento", "valor_abertura", "status", "data_abertura", "data_fechamento",
+    ),
+    "vendas": (
+        "id", "id_pessoa", "data_venda", "id_evento", "responsavel", "id_movimento_caixa",
+        "valor_total", "custo_total", "qtd_itens", "status",
+    ),
+    "itens_venda": ("id", "id_venda", "id_item", "quantidade", "valor_unitario", "custo_unitario"),
+    "estoque": ("id", "id_item", "quantidade", "tipo_movimento", "data_movimento", "origem_recurso", "id_usuario", "id_evento"),
+    "agendamentos": ("id", "id_pessoa", "id_facilitador", "data_hora", "tipo_servico", "status", "id_evento", "compareceu"),
+    "movimentos_financeiros": (
+        "id", "data_registro", "id_usuario", "tipo_movimento", "valor", "descricao", "categoria", "id_evento", "status",
+    ),
+}
+
+# Tabelas esvaziadas por `limpar` (as mesmas da fixture cleanup_db); usuarios só perde os da massa
+TABELAS_LIMPEZA = (
+    "idempotencia_vendas", "itens_venda", "vendas", "estoque", "saldo_estoque", "vendas_diarias",
+    "movimentos_financeiros", "agendamentos", "eventos", "pessoas", "itens", "categorias", "movimentos_caixa", "caixas",
+)
+DOMINIO_EMAIL_MASSA = "massa.unython.local"
+
+SERVICOS = ("Consulta", "Passe", "Benzimento", "Jogo de Búzios", "Reiki")
+DESPESAS = (("Aluguel do espaço", 30000, 60000), ("Transporte", 5000, 15000), ("Materiais", 2000, 20000), ("Limpeza", 1000, 5000))
+RECEITAS = (("Doação", 1000, 30000), ("Mensalidade", 5000, 10000))
+
+
+@dataclass
+class ParametrosMassa:
+    """
+    Volumes e distribuição da massa. `escala` multiplica eventos, itens, pessoas e vendas_por_evento.
+    Com os padrões (quase quatro anos de feiras semanais): 200 eventos, 2.000 itens,
+    ~400 mil vendas, ~1,1 milhão de linhas em itens_venda e ~1,2 milhão em estoque.
+    """
+
+    semente: int = 42
+    escala: float = 1.0
+    data_inicio: date = date(2022, 1, 8)  # um sábado; um evento por semana a partir daqui
+    eventos: int = 200
+    itens: int = 2000
+    categorias: int = 40
+    caixas: int = 4
+    vendedores: int = 8
+    pessoas: int = 3000
+    vendas_por_evento: int = 2000  # média; cada evento varia ±30%
+    max_linhas_por_venda: int = 5
+    max_quantidade: int = 3
+    zipf: float = 1.1  # expoente da popularidade dos itens (0 = uniforme)
+    agendamentos_por_evento: int = 40
+    lancamentos_por_evento: int = 6
+
+    def escalado(self, valor: int) -> int:
+        return max(1, round(valor * self.escala))
+
+
+def _reais(centavos: int) -> str:
+    return f"{centavos // 100}.{centavos % 100:02d}"
+
+
+class MassaDadosService:
+    """
+    Gera uma massa de dados realista e determinística (mesma semente e banco vazio = mesmas linhas)
+    para medir os services em volume. As linhas são escritas em CSV (arquivos temporários que vão
+    para o disco quando crescem) e carregadas por COPY, uma tabela por vez, em uma única transação;
+    depois as projeções saldo_estoque e vendas_diarias são reconstruídas pelos services.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+
+    def gerar(self, parametros: ParametrosMassa, limpar: bool = False) -> Dict[str, int]:
+        """Gera e carrega a massa; retorna {tabela: linhas}. Exige as tabelas vazias (ou `limpar=True`)."""
+        try:
+            if limpar:
+                self._executar(f"TRUNCATE TABLE {', '.join(TABELAS_LIMPEZA)} RESTART IDENTITY CASCADE")
+                self._executar("DELETE FROM usuarios WHERE email LIKE %s", (f"%@{DOMINIO_EMAIL_MASSA}",))
+            ocupadas = self._tabelas_ocupadas()
+            if ocupadas:
+                raise ValueError(f"Tabelas com dados: {', '.join(ocupadas)}. Use um banco vazio ou limpar=True (--limpar).")
+
+            _, (base_usuarios,) = self._executar("SELECT COALESCE(MAX(id), 0) FROM usuarios", fetch_one=True)
+            arquivos = {tabela: tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024, mode="w+", encoding="utf-8", newline="")
+                        for tabela in COLUNAS_MASSA}
+            try:
+                writers = {tabela: csv.writer(arquivo, lineterminator="\n") for tabela, arquivo in arquivos.items()}
+                self._escrever(parametros, base_usuarios, writers)
+
+                totais: Dict[str, int] = {}
+                for tabela, colunas in COLUNAS_MASSA.items():
+                    arquivos[tabela].seek(0)
+                    total = self.db.copy_from(
+                        f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)",
+                        arquivos[tabela],
+                        rotulo=f"MassaDadosService.copy_{tabela}",
+                    )
+                    if total is False:
+                        raise Exception(f"Falha no COPY de {tabela}.")
+                    totais[tabela] = total
+            finally:
+                for arquivo in arquivos.values():
+                    arquivo.close()
+
+            for tabela in COLUNAS_MASSA:
+                self._executar(f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), (SELECT MAX(id) FROM {tabela}))")
+            self.db.conn.commit()
+        except Exception:
+            self.db.conn.rollback()
+            raise
+
+        estoque_srv = EstoqueService(self.db)
+        totais["saldo_estoque"] = estoque_srv.reconstruir_saldos()
+        totais["vendas_diarias"] = VendaService(self.db, estoque_srv, CaixaService(self.db)).reconstruir_vendas_diarias()
+        if totais["saldo_estoque"] is None or totais["vendas_diarias"] is None:
+            raise Exception("Massa carregada, mas a reconstrução das projeções falhou (app.cli saldos/vendas-diarias --reconstruir).")
+        incrementar_versao_dados()
+        return totais
+
+    def _tabelas_ocupadas(self) -> List[str]:
+        tabelas = [t for t in COLUNAS_MASSA if t != "usuarios"]
+        _, row = self._executar(
+            "SELECT " + ", ".join(f"EXISTS (SELECT 1 FROM {t})" for t in tabelas), fetch_one=True
+        )
+        return [t for t, ocupada in zip(tabelas, row) if ocupada]
+
+    def _escrever(self, p: ParametrosMassa, base_usuarios: int, w: Dict[str, Any]) -> None:
+        """Escreve todas as linhas nos CSVs. Só o estado de um evento por vez fica em memória."""
+        rng = random.Random(p.semente)
+        n_eventos, n_itens, n_pessoas = p.escalado(p.eventos), p.escalado(p.itens), p.escalado(p.pessoas)
+        vendas_por_evento = p.escalado(p.vendas_por_evento)
+
+        vendedores = [base_usuarios + n for n in range(1, p.vendedores + 1)]
+        for n, id_usuario in enumerate(vendedores, start=1):
+            w["usuarios"].writerow([id_usuario, f"Vendedor {n:02d}", f"vendedor{n:02d}@{DOMINIO_EMAIL_MASSA}", "Vendedor", "Vendedor", "Ativo"])
+
+        for id_pessoa in range(1, n_pessoas + 1):
+            cadastro = p.data_inicio + timedelta(days=rng.randrange(7 * n_eventos))
+            w["pessoas"].writerow([id_pessoa, f"Pessoa {id_pessoa:05d}", f"5511{rng.randrange(10 ** 8, 10 ** 9)}", cadastro])
+
+        for id_categoria in range(1, p.categorias + 1):
+            w["categorias"].writerow([id_categoria, f"Categoria {id_categoria:03d}", None, "Ativo"])
+
+        # Preços em centavos; margem de 30% a 120%; ~5% dos itens inativos
+        compra, venda = [0] * (n_itens + 1), [0] * (n_itens + 1)
+        for id_item in range(1, n_itens + 1):
+            compra[id_item] = round(rng.lognormvariate(6.5, 0.8)) + 50
+            venda[id_item] = round(compra[id_item] * rng.uniform(1.3, 2.2) / 50) * 50
+            status = "Inativo" if rng.random() < 0.05 else "Ativo"
+            w["itens"].writerow(
+                [id_item, f"Item {id_item:05d}", _reais(compra[id_item]), _reais(venda[id_item]), status, rng.randint(1, p.categorias)]
+            )
+
+        for id_caixa in range(1, p.caixas + 1):
+            w["caixas"].writerow([id_caixa, f"Caixa {id_caixa:02d}", None, "Ativo"])
+
+        # Popularidade: Zipf sobre uma ordem embaralhada dos itens (os mais vendidos não são os primeiros ids)
+        ordem_itens = list(range(1, n_itens + 1))
+        rng.shuffle(ordem_itens)
+        pesos_acumulados = list(accumulate(1 / (posicao ** p.zipf) for posicao in range(1, n_itens + 1)))
+
+        saldo = [0] * (n_itens + 1)
+        ids = defaultdict(int)
+        for id_evento in range(1, n_eventos + 1):
+            dia = p.data_inicio + timedelta(weeks=id_evento - 1)
+            aberto = id_evento == n_eventos  # o último evento fica aberto, como numa feira em andamento
+            w["eventos"].writerow([id_evento, f"Feira {id_evento:03d}", dia, "Feira", "Aberto" if aberto else "Fechado"])
+
+            movimentos = []
+            for id_caixa in range(1, p.caixas + 1):
+                ids["movimentos_caixa"] += 1
+                operador = vendedores[rng.randrange(len(vendedores))]
+                w["movimentos_caixa"].writerow([
+                    ids["movimentos_caixa"], id_caixa, operador, id_evento, "100.00", "Aberto" if aberto else "Fechado",
+                    f"{dia} 08:00:00", None if aberto else f"{dia} 18:00:00",
+                ])
+                movimentos.append((ids["movimentos_caixa"], operador))
+
+            # Vendas do evento: primeiro o carrinho (para repor o estoque antes), depois as linhas
+            vendas = []
+            demanda: Dict[int, int] = defaultdict(int)
+            for _ in range(max(1, round(vendas_por_evento * rng.uniform(0.7, 1.3)))):
+                movimento = movimentos[rng.randrange(len(movimentos))]
+                carrinho: Dict[int, int] = {}
+                for indice in rng.choices(range(n_itens), cum_weights=pesos_acumulados, k=rng.randint(1, p.max_linhas_por_venda)):
+                    id_item = ordem_itens[indice]
+                    carrinho[id_item] = carrinho.get(id_item, 0) + rng.randint(1, p.max_quantidade)
+                for id_item, quantidade in carrinho.items():
+                    demanda[id_item] += quantidade
+                vendas.append((movimento, carrinho))
+
+            for id_item, quantidade in demanda.items():
+                falta = quantidade - saldo[id_item]
+                if falta > 0:
+                    reposicao = falta + rng.randint(0, quantidade)
+                    ids["estoque"] += 1
+                    origem = "Compra" if rng.random() < 0.7 else "Doacao"
+                    w["estoque"].writerow([ids["estoque"], id_item, reposicao, "Entrada", dia, origem, vendedores[0], id_evento])
+                    saldo[id_item] += reposicao
+
+            for (id_movimento, operador), carrinho in vendas:
+                ids["vendas"] += 1
+                valor_total = sum(q * venda[i] for i, q in carrinho.items())
+                custo_total = sum(q * compra[i] for i, q in carrinho.items())
+                w["vendas"].writerow([
+                    ids["vendas"], None, dia, id_evento, str(operador), id_movimento,
+                    _reais(valor_total), _reais(custo_total), sum(carrinho.values()), "Ativa",
+                ])
+                for id_item, quantidade in carrinho.items():
+                    ids["itens_venda"] += 1
+                    w["itens_venda"].writerow(
+                        [ids["itens_venda"], ids["vendas"], id_item, quantidade, _reais(venda[id_item]), _reais(compra[id_item])]
+                    )
+                    ids["estoque"] += 1
+                    w["estoque"].writerow([ids["estoque"], id_item, quantidade, "Saida", dia, "Venda", operador, id_evento])
+                    saldo[id_item] -= quantidade
+
+            for n in range(p.agendamentos_por_evento):
+                ids["agendamentos"] += 1
+                hora = f"{dia} {9 + n * 8 // max(p.agendamentos_por_evento, 1):02d}:{rng.choice((0, 15, 30, 45)):02d}:00"
+                compareceu = "Pendente" if aberto else ("Sim" if rng.random() < 0.85 else "Nao")
+                w["agendamentos"].writerow([
+                    ids["agendamentos"], rng.randint(1, n_pessoas), vendedores[rng.randrange(len(vendedores))], hora,
+                    rng.choice(SERVICOS), "Agendado", id_evento, compareceu,
+                ])
+
+            for _ in range(p.lancamentos_por_evento):
+                ids["movimentos_financeiros"] += 1
+                tipo = "Despesa" if rng.random() < 0.6 else "Receita"
+                descricao, minimo, maximo = rng.choice(DESPESAS if tipo == "Despesa" else RECEITAS)
+                w["movimentos_financeiros"].writerow([
+                    ids["movimentos_financeiros"], f"{dia} 19:00:00", vendedores[0], tipo, _reais(rng.randint(minimo, maximo)),
+                    descricao, descricao, id_evento, "Cancelado" if rng.random() < 0.03 else "Ativo",
+                ])
+
+    def _executar(self, query: str, params=None, **kwargs):
+        """execute_query que levanta exceção em erro SQL (a carga é tudo ou nada)."""
+        result = self.db.execute_query(query, params, **kwargs)
+        if result is False:
+            raise Exception("Falha ao executar etapa da geração de massa de dados.")
+        return result
@@ -0,0 +1,74 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+# src/modules/pdv.py
+from typing import Any, Dict, Optional
+
+from src.modules.categoria import CategoriaService
+from src.utils.database_manager import DatabaseManager
+
+# Estado da tela do PDV em um único SELECT (o Postgres monta o JSON; psycopg2 devolve dict).
+# Sem caixa informado, usa o primeiro caixa ativo por nome (o mesmo que o seletor mostra por padrão).
+ESTADO_PDV_SQL = """
+WITH caixas_ativos AS (
+    SELECT id, nome, descricao, status FROM caixas WHERE status = 'Ativo'
+),
+caixa_escolhido AS (
+    SELECT COALESCE(%(id_caixa)s, (SELECT id FROM caixas_ativos ORDER BY nome, id LIMIT 1)) AS id
+)
+SELECT json_build_object(
+    'evento', (
+        SELECT row_to_json(e) FROM (
+            SELECT id, nome, data_evento, tipo, status FROM eventos WHERE status = 'Aberto' LIMIT 1
+        ) e
+    ),
+    'caixas', COALESCE((SELECT json_agg(c ORDER BY c.nome, c.id) FROM caixas_ativos c), '[]'::json),
+    'caixa_id', (SELECT id FROM caixa_escolhido),
+    'movimento', (
+        SELECT row_to_json(m) FROM (
+            SELECT id, id_caixa, id_usuario_abertura, id_evento, valor_abertura, status, data_abertura
+            FROM movimentos_caixa
+            WHERE id_caixa = (SELECT id FROM caixa_escolhido) AND status = 'Aberto'
+            ORDER BY data_abertura DESC
+            LIMIT 1
+        ) m
+    ),
+    'versao_catalogo', COALESCE((SELECT versao FROM versoes WHERE nome = 'catalogo'), 0),
+    'estoque', COALESCE((
+        SELECT json_object_agg(s.id_item, s.saldo)
+        FROM saldo_estoque s
+        JOIN itens i ON i.id = s.id_item
+        WHERE i.status = 'Ativo'
+    ), '{}'::json)
+)
+"""
+
+
+class PdvService:
+    """
+    Monta tudo o que a tela de vendas precisa (evento aberto, caixas, movimento ativo,
+    catálogo e saldos) para que cada rerun do PDV custe uma única chamada à API.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+
+    def buscar_estado(self, id_caixa: Optional[int] = None, versao_catalogo: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retorna {evento, caixas, caixa_id, movimento, estoque, catalogo: {versao, grupos}}.
+        Se `versao_catalogo` for a versão atual, `grupos` volta None (o cliente reaproveita a cópia que já tem).
+        """
+        result = self.db.execute_query(ESTADO_PDV_SQL, {"id_caixa": id_caixa}, fetch_one=True)
+        if not result or not result[1]:
+            return None
+        estado = result[1][0]
+
+        versao = estado.pop("versao_catalogo")
+        if versao_catalogo == versao:
+            estado["catalogo"] = {"versao": versao, "grupos": None}
+        else:
+            # Cache do catálogo por versão (mesmo do GET /catalogo/grupos): o JOIN só roda após mudanças
+            versao, grupos = CategoriaService(self.db).buscar_itens_por_categoria_versionado()
+            estado["catalogo"] = {"versao": versao, "grupos": grupos}
+        return estado
@@ -1,7 +1,14 @@
 # src/modules/relatorio.py
-from typing import List, Dict, Any
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+from src.utils.cache import CacheTTL, VersaoCompartilhada, versao_dados
 from src.utils.database_manager import DatabaseManager
-from src.modules.estoque import EstoqueService
+
+# Cache de relatórios compartilhado pelo processo (ver RelatorioCacheado)
+RELATORIOS_CACHE = CacheTTL(max_entradas=256, ttl_segundos=300)
+# Versão 'dados' do banco: escritas de outros workers invalidam o cache em até 2 s
+VERSAO_RELATORIOS = VersaoCompartilhada(intervalo_segundos=2.0)
 
 class RelatorioService:
     """
@@ -11,22 +18,26 @@ class RelatorioService:
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
 
+    def versao_dados(self) -> Optional[int]:
+        """Versão 'dados' (incrementada por trigger a cada escrita nas tabelas dos relatórios); None se falhar."""
+        result = self.db.execute_query("SELECT versao FROM versoes WHERE nome = 'dados'", fetch_one=True)
+        if not result:
+            return None
+        return result[1][0] if result[1] else 0
+
     def gerar_faturamento_mensal(self) -> List[Dict[str, Any]]:
         """
         Calcula o faturamento total por mês (Ano-Mês) proveniente das vendas.
         Retorna uma lista de dicionários: [{'mes': '2025-10', 'faturamento_total': 150.50}, ...]
         """
-        # A Sintaxe Universal para Agregação no SQLite:
+        # Lê só o rollup vendas_diarias (mantido a cada venda/cancelamento), nunca o histórico de vendas
         query = """
         SELECT 
-            -- Formata a data de venda para 'YYYY-MM' (Ex: 2025-11)
-            TO_CHAR(v.data_venda, 'YYYY-MM') AS mes, 
-            -- Soma o valor total de cada item na venda (quantidade * valor_unitario)
-            SUM(iv.quantidade * iv.valor_unitario) AS faturamento_total
+            -- Formata o dia para 'YYYY-MM' (Ex: 2025-11)
+            TO_CHAR(d.dia, 'YYYY-MM') AS mes, 
+            SUM(d.valor_total) AS faturamento_total
         FROM 
-            vendas v
-        INNER JOIN 
-            itens_venda iv ON v.id = iv.id_venda
+            vendas_diarias d
         GROUP BY 
             mes
         ORDER BY 
@@ -80,7 +91,7 @@ class RelatorioService:
             print(f" (Alerta Washu Relatório): Falha ao gerar agendamentos pendentes: {e}")
             return []
         
-    def calcular_saldo_fluxo_caixa(self) -> float:
+    def calcular_saldo_fluxo_caixa(self) -> Decimal:
         """
         Calcula o saldo total do fluxo de caixa (Receitas - Despesas).
         Considera apenas movimentos com status 'Ativo'.
@@ -102,8 +113,8 @@ class RelatorioService:
         _, result_despesas = self.db.execute_query(query_despesas, fetch_one=True)
         
         # Trata caso onde SUM retorna None (se não houver registros)
-        total_receitas = result_receitas[0] if result_receitas and result_receitas[0] is not None else 0.0
-        total_despesas = result_despesas[0] if result_despesas and result_despesas[0] is not None else 0.0
+        total_receitas = result_receitas[0] if result_receitas and result_receitas[0] is not None else Decimal("0.00")
+        total_despesas = result_despesas[0] if result_despesas and result_despesas[0] is not None else Decimal("0.00")
         
         saldo = total_receitas - total_despesas
         return saldo
@@ -112,24 +123,17 @@ class RelatorioService:
         """
         Calcula o lucro bruto total por mês, subtraindo o custo da venda.
         """
-        # CRÍTICO: INNER JOIN em 3 tabelas
+        # Custo gravado no momento da venda e já somado por dia/item no rollup vendas_diarias
         query = """
         SELECT
             -- 1. Agrupamento temporal
-            TO_CHAR(v.data_venda, 'YYYY-MM') AS mes,
+            TO_CHAR(d.dia, 'YYYY-MM') AS mes,
             
-            -- 2. CÁLCULO DO LUCRO BRUTO:
-            -- Lucro Bruto = SUM( Quantidade * (Valor de Venda - Custo de Compra) )
-            SUM(
-                iv.quantidade * (iv.valor_unitario - i.valor_compra)
-            ) AS lucro_bruto_total
+            -- 2. CÁLCULO DO LUCRO BRUTO: Valor de Venda - Custo de Compra
+            SUM(d.valor_total - d.custo_total) AS lucro_bruto_total
             
         FROM 
-            vendas v
-        INNER JOIN 
-            itens_venda iv ON v.id = iv.id_venda  -- Liga o cabeçalho ao detalhe
-        INNER JOIN
-            itens i ON iv.id_item = i.id          -- Liga o detalhe ao catálogo para pegar o custo
+            vendas_diarias d
         GROUP BY 
             mes
         ORDER BY 
@@ -148,37 +152,79 @@ class RelatorioService:
             return []
         
         
+    def gerar_top_itens(
+        self, limite: int = 10, data_inicio: Optional[date] = None, data_fim: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Itens mais vendidos (por quantidade) no período, a partir do rollup vendas_diarias.
+        Retorna [{'id_item', 'nome', 'quantidade', 'faturamento_total', 'lucro_bruto_total'}, ...].
+        """
+        query = """
+        SELECT
+            d.id_item,
+            i.nome,
+            SUM(d.quantidade) AS quantidade,
+            SUM(d.valor_total) AS faturamento_total,
+            SUM(d.valor_total - d.custo_total) AS lucro_bruto_total
+        FROM
+            vendas_diarias d
+        INNER JOIN
+            itens i ON i.id = d.id_item
+        WHERE
+            (%(inicio)s::date IS NULL OR d.dia >= %(inicio)s)
+            AND (%(fim)s::date IS NULL OR d.dia <= %(fim)s)
+        GROUP BY
+            d.id_item, i.nome
+        HAVING
+            SUM(d.quantidade) > 0
+        ORDER BY
+            quantidade DESC, faturamento_total DESC, d.id_item
+        LIMIT %(limite)s;
+        """
+
+        try:
+            params = {"inicio": data_inicio, "fim": data_fim, "limite": limite}
+            columns, results = self.db.execute_query(query, params, fetch_all=True)
+
+            if results:
+                return [dict(zip(columns, row)) for row in results]
+            return []
+        except Exception as e:
+            print(f" (Alerta Washu Top Itens): Falha ao gerar ranking de itens: {e}")
+            return []
+
     def gerar_inventario_total(self) -> List[Dict[str, Any]]:
         """
-        Gera o inventário completo consultando itens e usando o EstoqueService 
-        para calcular o saldo de cada item individualmente.
+        Gera o inventário completo dos itens ativos em um único comando:
+        catálogo + saldo materializado (saldo_estoque) + custo total em estoque.
         """
-        
-        # 1. Consulta Apenas os Itens Ativos (Catálogo)
-        query = "SELECT id, nome, valor_compra, valor_venda FROM itens WHERE status = 'Ativo'"
-        columns, itens_raw = self.db.execute_query(query, fetch_all=True)
+        query = """
+        SELECT
+            i.id,
+            i.nome,
+            i.valor_compra,
+            i.valor_venda,
+            COALESCE(s.saldo, 0) AS saldo_atual,
+            COALESCE(s.saldo, 0) * i.valor_compra AS custo_total_estoque
+        FROM
+            itens i
+        LEFT JOIN
+            saldo_estoque s ON s.id_item = i.id
+        WHERE
+            i.status = 'Ativo'
+        ORDER BY
+            i.id;
+        """
+
+        try:
+            columns, results = self.db.execute_query(query, fetch_all=True)
 
-        if not itens_raw:
+            if results:
+                return [dict(zip(columns, row)) for row in results]
+            return []
+        except Exception as e:
+            print(f" (Alerta Washu Inventário): Falha ao gerar inventário: {e}")
             return []
-            
-        inventario_completo = []
-        estoque_service = EstoqueService(self.db) # Inicializa o serviço de estoque
-        
-        # 2. Itera sobre cada item para calcular o saldo (Método Híbrido)
-        for row in itens_raw:
-            item = dict(zip(columns, row))
-            item_id = item['id']
-            
-            # Chama a lógica de cálculo de saldo que já está testada!
-            saldo_atual = estoque_service.calcular_saldo_item(item_id)
-            
-            # Adiciona os campos calculados
-            item['saldo_atual'] = saldo_atual
-            item['custo_total_estoque'] = saldo_atual * item['valor_compra']
-            
-            inventario_completo.append(item)
-            
-        return inventario_completo
     
     def gerar_despesas_por_categoria(self) -> List[Dict[str, Any]]:
         """
@@ -208,4 +254,88 @@ class RelatorioService:
             return []
         except Exception as e:
             print(f" (Alerta Washu Despesas): Falha ao gerar relatório de despesas: {e}")
-            return []
\ No newline at end of file
+            return []
+
+
+class RelatorioCacheado:
+    """
+    Fachada com cache na frente do RelatorioService: mesma interface, mas os relatórios
+    de CACHEAVEIS devolvem o resultado em memória enquanto a versão dos dados não mudar e o TTL
+    não expirar. A chave inclui a versão 'dados' do banco, incrementada por trigger em qualquer
+    processo (relida a cada VERSAO_RELATORIOS.intervalo_segundos), e a entrada guarda o contador
+    local, que VendaService, EstoqueService, FluxoDeCaixaService e ItemService incrementam a cada
+    escrita. Resultados vazios não são guardados: podem vir de uma falha tratada.
+
+    Com `executar` (ex.: executar_com_conexao) em vez de um service pronto, a conexão do pool só
+    é emprestada quando o banco é consultado (falta de cache ou releitura da versão).
+    """
+
+    # Só relatórios cujos dados vêm de escritas que incrementam a versão
+    CACHEAVEIS = {
+        "gerar_faturamento_mensal",
+        "gerar_lucro_bruto_mensal",
+        "gerar_top_itens",
+        "gerar_inventario_total",
+        "gerar_despesas_por_categoria",
+        "calcular_saldo_fluxo_caixa",
+    }
+
+    def __init__(
+        self,
+        relatorio_service: Optional[RelatorioService] = None,
+        cache: CacheTTL = RELATORIOS_CACHE,
+        executar: Optional[Callable[[Callable[[DatabaseManager], Any]], Any]] = None,
+        versao_banco: VersaoCompartilhada = VERSAO_RELATORIOS,
+    ):
+        if relatorio_service is None and executar is None:
+            raise ValueError("Informe relatorio_service ou executar.")
+        self.service = relatorio_service
+        self.cache = cache
+        self.executar = executar
+        self.versao_banco = versao_banco
+
+    def _com_service(self, funcao: Callable[[RelatorioService], Any]) -> Any:
+        if self.service is not None:
+            return funcao(self.service)
+        return self.executar(lambda db: funcao(RelatorioService(db)))
+
+    def __getattr__(self, nome: str) -> Any:
+        getattr(RelatorioService, nome)  # AttributeError para nomes inexistentes
+
+        def chamar(*args: Any, **kwargs: Any) -> Any:
+            return self._com_service(lambda service: getattr(service, nome)(*args, **kwargs))
+
+        if nome not in self.CACHEAVEIS:
+            return chamar
+
+        def cacheado(*args: Any, **kwargs: Any) -> Any:
+            def chave(versao: int) -> tuple:
+                return (versao, nome, args, tuple(sorted(kwargs.items())))
+
+            versao_banco = self.versao_banco.atual()
+            if versao_banco is not None:
+                encontrado, valor = self.cache.obter(chave(versao_banco))
+                if encontrado:
+                    return valor
+
+            def consultar(service: RelatorioService) -> Any:
+                # Versões lidas antes da consulta: uma escrita concorrente torna o resultado
+                # obsoleto, nunca o contrário
+                versao_local = self.cache.versao()
+                versao = versao_banco
+                if versao is None:
+                    versao_processo = versao_dados()
+                    versao = service.versao_dados()
+                    if versao is not None:
+                        self.versao_banco.atualizar(versao, versao_processo)
+                        encontrado, valor = self.cache.obter(chave(versao))
+                        if encontrado:
+                            return valor
+                valor = getattr(service, nome)(*args, **kwargs)
+                if versao is not None and (valor or valor == 0):
+                    self.cache.guardar(chave(versao), valor, versao_local)
+                return valor
+
+            return self._com_service(consultar)
+
+        return cacheado
@@ -1,9 +1,13 @@
 ﻿# src/modules/usuario.py (VERSAO FINAL SANADA)
-from typing import Optional, List
+from typing import Iterator, Optional, List
+from src.utils.cache import CacheTTL
 from src.utils.database_manager import DatabaseManager
 from src.utils.models import Usuario
 from src.utils.security import hash_password, verify_password
 
+# Usuários por id para as dependências de autenticação; invalidado a cada alteração do usuário
+USUARIOS_CACHE = CacheTTL(max_entradas=512, ttl_segundos=60, fonte_versao=None)
+
 
 class UsuarioService:
     def __init__(self, db_manager: DatabaseManager):
@@ -13,40 +17,60 @@ class UsuarioService:
 
     def editar_usuario_seguro(self, user_id: int, role: str, hashed_password: str, require_password_change: bool = False) -> bool:
         """Atualiza role, senha e flag de troca obrigatoria para um usuario existente."""
-        query = "UPDATE usuarios SET role = %s, hashed_password = %s, require_password_change = %s WHERE id = %s"
+        query = """
+        UPDATE usuarios SET role = %s, hashed_password = %s, require_password_change = %s, token_version = token_version + 1
+        WHERE id = %s
+        """
         params = (role, hashed_password, require_password_change, user_id)
-        return self.db.execute_query(query, params, commit=True)
+        resultado = self.db.execute_query(query, params, commit=True)
+        self._invalidar_usuario(user_id)
+        return resultado
+
+    @staticmethod
+    def _invalidar_usuario(user_id: int) -> None:
+        """
+        Descarta o usuário do cache deste processo. Os tokens já emitidos são revogados pelo
+        token_version incrementado no mesmo UPDATE (os demais processos percebem em até USUARIOS_CACHE.ttl_segundos).
+        """
+        USUARIOS_CACHE.remover(user_id)
 
     def registrar_usuario(self, usuario: Usuario, password: str, require_password_change: bool = False):
-        """Registra um novo usuario com a senha criptografada (com UPSERT)."""
-        usuario_existente = self.buscar_usuario_por_email(usuario.email)
+        """
+        Registra um novo usuario com a senha criptografada. Se o email já existir, atualiza
+        role, senha e flag de troca (mesmo efeito de editar_usuario_seguro) em um único comando.
+        """
         hashed_pwd = hash_password(password)
-
-        if usuario_existente:
-            self.editar_usuario_seguro(usuario_existente.id, usuario.role, hashed_pwd, require_password_change)
-            print(f"(Alerta: Usuario '{usuario.nome}' atualizado. Usando ID: {usuario_existente.id})")
-            return usuario_existente.id
-
         query = """
         INSERT INTO usuarios (nome, email, funcao, status, role, hashed_password, require_password_change)
-        VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (email) DO UPDATE
+            SET role = EXCLUDED.role,
+                hashed_password = EXCLUDED.hashed_password,
+                require_password_change = EXCLUDED.require_password_change,
+                token_version = usuarios.token_version + 1
+        RETURNING id
         """
         params = (usuario.nome, usuario.email, usuario.funcao, usuario.status, usuario.role, hashed_pwd, require_password_change)
-        return self.db.execute_query(query, params, commit=True)
+        user_id = self.db.execute_query(query, params, commit=True)
+        if user_id:
+            self._invalidar_usuario(user_id)
+        return user_id
 
     # --- METODOS DE BUSCA ---
 
     def buscar_usuarios(self) -> List[Usuario]:
         """Busca todos os usuarios e os retorna como objetos Usuario."""
-        query = "SELECT id, nome, email, funcao, status, role, hashed_password, require_password_change FROM usuarios"
-        columns, results = self.db.execute_query(query, fetch_all=True)
-        if results:
-            return [Usuario(**dict(zip(columns, row))) for row in results]
-        return []
+        return list(self.iterar_usuarios())
+
+    def iterar_usuarios(self, itersize: Optional[int] = None) -> Iterator[Usuario]:
+        """Usuarios um a um, lidos em blocos por cursor nomeado (sem materializar o resultado)."""
+        query = "SELECT id, nome, email, funcao, status, role, hashed_password, require_password_change, token_version FROM usuarios ORDER BY id"
+        for row in self.db.stream_query(query, itersize=itersize):
+            yield Usuario(**row)
 
     def buscar_usuario_por_email(self, email: str) -> Optional[Usuario]:
         """Busca um usuario pelo email."""
-        query = "SELECT id, nome, email, funcao, status, role, hashed_password, require_password_change FROM usuarios WHERE email = %s"
+        query = "SELECT id, nome, email, funcao, status, role, hashed_password, require_password_change, token_version FROM usuarios WHERE email = %s"
         columns, result = self.db.execute_query(query, (email,), fetch_one=True)
         if result:
             return Usuario(**dict(zip(columns, result)))
@@ -54,12 +78,25 @@ class UsuarioService:
 
     def buscar_usuario_por_id(self, user_id: int) -> Optional[Usuario]:
         """Busca um usuario pelo ID e retorna o objeto Usuario completo."""
-        query = "SELECT id, nome, email, funcao, status, role, hashed_password, require_password_change FROM usuarios WHERE id = %s"
+        query = "SELECT id, nome, email, funcao, status, role, hashed_password, require_password_change, token_version FROM usuarios WHERE id = %s"
         columns, result = self.db.execute_query(query, (user_id,), fetch_one=True)
         if result:
             return Usuario(**dict(zip(columns, result)))
         return None
 
+    def buscar_usuario_por_id_cacheado(self, user_id: int) -> Optional[Usuario]:
+        """buscar_usuario_por_id com cache TTL (usado a cada requisição autenticada)."""
+        encontrado, usuario = USUARIOS_CACHE.obter(user_id)
+        if encontrado:
+            return usuario
+        # Geração lida antes da consulta: se o usuário for invalidado (ex.: token revogado)
+        # enquanto a linha antiga está a caminho, ela não é guardada.
+        geracao = USUARIOS_CACHE.geracao(user_id)
+        usuario = self.buscar_usuario_por_id(user_id)
+        if usuario:
+            USUARIOS_CACHE.guardar(user_id, usuario, USUARIOS_CACHE.versao(), geracao=geracao)
+        return usuario
+
     # --- METODOS DE DADOS E DELECAO ---
 
     def verificar_credenciais(self, email: str, password: str) -> Optional[Usuario]:
@@ -72,19 +109,27 @@ class UsuarioService:
     def deletar_usuario(self, usuario_id: int):
         query = "DELETE FROM usuarios WHERE id = %s"
         params = (usuario_id,)
-        return self.db.execute_query(query, params, commit=True)
+        resultado = self.db.execute_query(query, params, commit=True)
+        self._invalidar_usuario(usuario_id)
+        return resultado
 
     def atualizar_role_status(self, usuario_id: int, role: str, status: str = "Ativo", funcao: Optional[str] = None) -> bool:
         """Atualiza role/status/funcao sem alterar senha."""
-        query = "UPDATE usuarios SET role = %s, status = %s, funcao = %s WHERE id = %s"
+        query = "UPDATE usuarios SET role = %s, status = %s, funcao = %s, token_version = token_version + 1 WHERE id = %s"
         params = (role, status, funcao, usuario_id)
-        return self.db.execute_query(query, params, commit=True)
+        resultado = self.db.execute_query(query, params, commit=True)
+        self._invalidar_usuario(usuario_id)
+        return resultado
+
     def alterar_senha(self, email: str, old_password: str, new_password: str) -> bool:
         """Altera a senha se a senha atual confere e limpa o flag de troca obrigatoria."""
         usuario = self.buscar_usuario_por_email(email)
         if not usuario or not verify_password(old_password, usuario.hashed_password):
             return False
-        new_hash = hash_password(new_password)
+        return self.gravar_nova_senha(usuario, hash_password(new_password))
+
+    def gravar_nova_senha(self, usuario: Usuario, new_hash: str) -> bool:
+        """Grava um hash de senha já calculado (e já validado pelo chamador) e limpa o flag de troca."""
         return self.editar_usuario_seguro(
             user_id=usuario.id,
             role=usuario.role,
@@ -3,13 +3,56 @@
 # sob os termos da GNU General Public License como publicada pela Free Software Foundation,
 # na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
 # src/modules/venda.py
-from typing import List, Optional
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from decimal import Decimal
 
-from src.utils.database_manager import DatabaseManager
+import psycopg2
+
+from src.utils.database_manager import DatabaseManager, erro_sql_transitorio
+from src.utils.cache import incrementar_versao_dados
 from src.utils.models import ItemVenda, MovimentoEstoque, Venda
-from src.modules.estoque import EstoqueService
+from src.modules.estoque import EstoqueInsuficienteError, EstoqueService
 from src.modules.caixas import CaixaService
+from src.modules.idempotencia import IdempotenciaService
+
+
+# Colunas de Venda usadas pelas listagens
+VENDAS_SELECT = "SELECT id, id_pessoa, data_venda, responsavel, id_evento, id_movimento_caixa, status FROM vendas"
+
+# Soma (sinal = 1) ou subtrai (sinal = -1) as linhas de uma venda no rollup vendas_diarias
+ACUMULAR_VENDAS_DIARIAS_SQL = """
+INSERT INTO vendas_diarias (dia, id_evento, id_caixa, id_item, quantidade, valor_total, custo_total)
+SELECT v.data_venda, v.id_evento, mc.id_caixa, iv.id_item,
+       %(sinal)s * SUM(iv.quantidade),
+       %(sinal)s * SUM(iv.quantidade * iv.valor_unitario),
+       %(sinal)s * SUM(iv.quantidade * COALESCE(iv.custo_unitario, 0))
+FROM vendas v
+JOIN movimentos_caixa mc ON mc.id = v.id_movimento_caixa
+JOIN itens_venda iv ON iv.id_venda = v.id
+WHERE v.id = %(id_venda)s
+GROUP BY v.data_venda, v.id_evento, mc.id_caixa, iv.id_item
+ORDER BY iv.id_item
+ON CONFLICT (dia, id_evento, id_caixa, id_item) DO UPDATE
+    SET quantidade = vendas_diarias.quantidade + EXCLUDED.quantidade,
+        valor_total = vendas_diarias.valor_total + EXCLUDED.valor_total,
+        custo_total = vendas_diarias.custo_total + EXCLUDED.custo_total
+"""
+
+
+class LoteVendasIndisponivelError(Exception):
+    """O lote inteiro foi desfeito por uma falha do banco; nada foi gravado e reenviar depois é seguro."""
+
+
+@dataclass
+class VendaLote:
+    """Uma venda dentro de um lote (POST /vendas/lote)."""
+
+    cabecalho: Venda
+    itens: List[ItemVenda]
+    chave: Optional[str] = None
+    hash_requisicao: Optional[str] = None
 
 
 class VendaService:
@@ -21,6 +64,8 @@ class VendaService:
         self.db = db_manager
         self.estoque_service = estoque_service
         self.caixa_service = caixa_service
+        # Motivo da última falha de registrar_venda_completa (para mensagens da API)
+        self.ultimo_erro: Optional[str] = None
 
     # -----------------------------------------------------------
     # Inserções auxiliares (sem commit)
@@ -29,83 +74,391 @@ class VendaService:
     def registrar_venda(self, venda: Venda) -> Optional[int]:
         """Registra o cabeçalho da venda (sem commit)."""
         query = """
-        INSERT INTO vendas (id_pessoa, data_venda, responsavel, id_evento, id_movimento_caixa)
-        VALUES (%s, %s, %s, %s, %s) RETURNING id
+        INSERT INTO vendas (
+            id_pessoa, data_venda, responsavel, id_evento, id_movimento_caixa, valor_total, custo_total, qtd_itens
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
         """
-        values = (venda.id_pessoa, venda.data_venda, venda.responsavel, venda.id_evento, venda.id_movimento_caixa)
+        values = (
+            venda.id_pessoa,
+            venda.data_venda,
+            venda.responsavel,
+            venda.id_evento,
+            venda.id_movimento_caixa,
+            venda.valor_total,
+            venda.custo_total,
+            venda.qtd_itens,
+        )
         return self.db.execute_query(query, values, commit=False)
 
+    def buscar_custos_itens(self, ids_itens: List[int]) -> Dict[int, Decimal]:
+        """Retorna {id_item: valor_compra} do catálogo, o custo registrado na venda."""
+        query = "SELECT id, valor_compra FROM itens WHERE id = ANY(%s)"
+        result = self.db.execute_query(query, (sorted(set(ids_itens)),), fetch_all=True)
+        if result is False:
+            raise Exception("Falha ao buscar o custo dos itens da venda.")
+        return {id_item: Decimal(valor_compra) for id_item, valor_compra in result[1] or []}
+
     def registrar_item_venda(self, item_venda: ItemVenda) -> Optional[int]:
         """Registra o detalhe de item de uma venda (sem commit)."""
         query = "INSERT INTO itens_venda (id_venda, id_item, quantidade, valor_unitario) VALUES (%s, %s, %s, %s) RETURNING id"
         values = (item_venda.id_venda, item_venda.id_item, item_venda.quantidade, item_venda.valor_unitario)
         return self.db.execute_query(query, values, commit=False)
 
+    def registrar_itens_venda(self, itens: List[ItemVenda]) -> Optional[List[int]]:
+        """Registra todos os itens de uma venda em um único INSERT multi-linha (sem commit)."""
+        query = """
+        INSERT INTO itens_venda (id_venda, id_item, quantidade, valor_unitario, custo_unitario)
+        VALUES %s RETURNING id
+        """
+        rows = [(iv.id_venda, iv.id_item, iv.quantidade, iv.valor_unitario, iv.custo_unitario) for iv in itens]
+        result = self.db.execute_values(query, rows, fetch=True, commit=False)
+        if not result or len(result) != len(itens):
+            return None
+        for item_venda, (id_item_venda,) in zip(itens, result):
+            item_venda.id = id_item_venda
+        return [row[0] for row in result]
+
+    def _acumular_vendas_diarias(self, id_venda: int, sinal: int) -> None:
+        """Aplica a venda (sinal 1) ou seu cancelamento (sinal -1) no rollup vendas_diarias, sem commit."""
+        if self.db.execute_query(ACUMULAR_VENDAS_DIARIAS_SQL, {"id_venda": id_venda, "sinal": sinal}) is False:
+            raise Exception("Falha ao atualizar o rollup vendas_diarias.")
+
     # -----------------------------------------------------------
     # Fluxo principal: venda completa com baixa de estoque
     # -----------------------------------------------------------
 
-    def registrar_venda_completa(self, venda_cabecalho: Venda, itens_detalhe: List[ItemVenda]) -> Optional[int]:
+    def _gravar_venda(
+        self,
+        venda_cabecalho: Venda,
+        itens_detalhe: List[ItemVenda],
+        chave_idempotencia: Optional[str] = None,
+        hash_requisicao: Optional[str] = None,
+    ) -> int:
         """
-        Insere cabeçalho, itens e baixa estoque em uma transação.
-        Se qualquer passo falhar, executa rollback e retorna None.
+        Executa os passos da venda na transação corrente, sem commit nem rollback.
+        Levanta exceção em qualquer falha; quem chama decide o escopo (transação ou savepoint).
         """
-        id_venda = None
+        # 0. Trava os saldos e checa o estoque (linhas repetidas do mesmo item são somadas)
+        quantidades: Dict[int, int] = {}
+        for item_venda in itens_detalhe:
+            quantidades[item_venda.id_item] = quantidades.get(item_venda.id_item, 0) + item_venda.quantidade
+
+        saldos = self.estoque_service.bloquear_saldos(list(quantidades))
+        for id_item, necessario in sorted(quantidades.items()):
+            if saldos[id_item] < necessario:
+                raise EstoqueInsuficienteError(
+                    f"Estoque insuficiente para o item {id_item}. Necessário: {necessario}, Saldo: {saldos[id_item]}"
+                )
+
+        # 1. Cabeçalho, já com os totais (relatórios agregam só vendas, sem reler itens_venda)
+        custos = self.buscar_custos_itens(list(quantidades))
+        for item_venda in itens_detalhe:
+            item_venda.custo_unitario = custos.get(item_venda.id_item, Decimal("0.00"))
+        venda_cabecalho.valor_total = sum(
+            (iv.quantidade * Decimal(iv.valor_unitario) for iv in itens_detalhe), Decimal("0.00")
+        )
+        venda_cabecalho.custo_total = sum(
+            (iv.quantidade * iv.custo_unitario for iv in itens_detalhe), Decimal("0.00")
+        )
+        venda_cabecalho.qtd_itens = sum(quantidades.values())
+        id_venda = self.registrar_venda(venda_cabecalho)
+        if not isinstance(id_venda, int) or id_venda <= 0:
+            raise Exception("Falha ao criar o cabeçalho da Venda. ID não foi capturado.")
+
+        # 2. Detalhes + saída de estoque: dois comandos multi-linha, sem commit intermediário
+        for item_venda in itens_detalhe:
+            item_venda.id_venda = id_venda
+        if not self.registrar_itens_venda(itens_detalhe):
+            raise Exception("Falha ao registrar os itens da venda.")
+
+        baixas = [
+            MovimentoEstoque(
+                id_item=item_venda.id_item,
+                quantidade=item_venda.quantidade,
+                tipo_movimento="Saida",
+                origem_recurso="Venda",
+                id_usuario=int(venda_cabecalho.responsavel),
+                id_evento=venda_cabecalho.id_evento,
+            )
+            for item_venda in itens_detalhe
+        ]
+        if not self.estoque_service.registrar_movimentos(baixas, commit=False):
+            raise Exception("Falha ao baixar o estoque dos itens da venda.")
+        self._acumular_vendas_diarias(id_venda, 1)
+
+        # 3. Idempotency-Key (a PK impede que dois retries registrem a mesma venda)
+        if chave_idempotencia:
+            idempotencia = IdempotenciaService(self.db)
+            if not idempotencia.registrar(chave_idempotencia, hash_requisicao or "", id_venda):
+                raise Exception(f"Idempotency-Key '{chave_idempotencia}' já registrada por outra requisição.")
+
+        return id_venda
+
+    def registrar_venda_completa(
+        self,
+        venda_cabecalho: Venda,
+        itens_detalhe: List[ItemVenda],
+        chave_idempotencia: Optional[str] = None,
+        hash_requisicao: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        Insere cabeçalho, itens e baixa estoque em uma única transação, com um número
+        constante de round trips (lock, cabeçalho, itens, baixas), independente do nº de linhas.
+        Os saldos dos itens são travados (FOR UPDATE, em ordem de id) antes da checagem,
+        então duas vendas simultâneas do último item nunca passam juntas.
+        Com `chave_idempotencia`, a chave é gravada na mesma transação: se outro retry com a mesma
+        chave já registrou a venda, esta é desfeita (rollback) e o chamador deve fazer o replay.
+        Se qualquer passo falhar, executa rollback e retorna None (motivo em self.ultimo_erro).
+        """
+        self.ultimo_erro = None
 
         try:
-            # 0. Checagem de estoque
-            for item_venda in itens_detalhe:
-                saldo = self.estoque_service.calcular_saldo_item(item_venda.id_item)
-                if saldo < item_venda.quantidade:
-                    raise Exception(f"Estoque Insuficiente! Item ID {item_venda.id_item} (Necessário: {item_venda.quantidade}, Saldo: {saldo})")
-
-            # 1. Cabeçalho
-            id_venda = self.registrar_venda(venda_cabecalho)
-            if not isinstance(id_venda, int) or id_venda <= 0:
-                raise Exception("Falha ao criar o cabeçalho da Venda. ID não foi capturado.")
-
-            # 2. Detalhes + saída de estoque
-            for item_venda in itens_detalhe:
-                item_venda.id_venda = id_venda
-                self.registrar_item_venda(item_venda)
-
-                # Baixa de estoque
-                self.estoque_service.registrar_movimento(
-                    MovimentoEstoque(
-                        id_item=item_venda.id_item,
-                        quantidade=item_venda.quantidade,
-                        tipo_movimento="Saida",
-                        origem_recurso="Venda",
-                        id_usuario=int(venda_cabecalho.responsavel),
-                        id_evento=venda_cabecalho.id_evento,
+            id_venda = self._gravar_venda(venda_cabecalho, itens_detalhe, chave_idempotencia, hash_requisicao)
+            # Commit geral (libera os locks)
+            self.db.conn.commit()
+            incrementar_versao_dados()
+
+        except Exception as e:
+            self.db.conn.rollback()
+            self.ultimo_erro = str(e)
+            print(f"(Alerta: Transação de venda falhou. Rollback executado.) Erro: {e}")
+            return None
+
+        # Fora do try: a venda já está confirmada, uma falha aqui não pode desfazê-la
+        if chave_idempotencia:
+            IdempotenciaService(self.db).limpar_expiradas_se_devido()
+        return id_venda
+
+    def registrar_vendas_lote(self, vendas: List[VendaLote]) -> List[Dict[str, Any]]:
+        """
+        Ingere um lote de vendas (ex.: fila offline do PDV) em uma única transação.
+        Cada venda roda em um SAVEPOINT: uma venda inválida é desfeita sozinha e não derruba o lote.
+        Vendas cuja Idempotency-Key já existe são reportadas como 'duplicada' sem reprocessar.
+        Retorna um resultado por venda, na ordem de entrada:
+        {'indice', 'chave', 'status': 'registrada' | 'duplicada' | 'reenviar' | 'erro', 'id_venda', 'detalhe'}.
+        'erro' é recusa definitiva (estoque insuficiente, chave reutilizada, dados inválidos);
+        'reenviar' é falha transitória do banco naquela venda (deadlock, conexão), que o cliente reenvia depois.
+        Se o lote inteiro for desfeito, levanta LoteVendasIndisponivelError.
+        """
+        idempotencia = IdempotenciaService(self.db)
+        resultados: List[Dict[str, Any]] = []
+
+        try:
+            # Trava todos os saldos do lote de uma vez, em ordem de id (mesma ordem do checkout)
+            todos_itens = [iv.id_item for venda in vendas for iv in venda.itens]
+            if todos_itens:
+                self.estoque_service.bloquear_saldos(todos_itens)
+
+            for indice, venda in enumerate(vendas):
+                resultado: Dict[str, Any] = {"indice": indice, "chave": venda.chave, "id_venda": None, "detalhe": None}
+                registro = idempotencia.buscar(venda.chave) if venda.chave else None
+                if registro:
+                    conflito = venda.hash_requisicao and registro["hash_requisicao"] != venda.hash_requisicao
+                    resultado.update(
+                        status="erro" if conflito else "duplicada",
+                        id_venda=None if conflito else registro["id_venda"],
+                        detalhe="Idempotency-Key já utilizada com um payload diferente." if conflito else None,
                     )
+                    resultados.append(resultado)
+                    continue
+
+                self.db.ultimo_erro_sql = None
+                try:
+                    with self.db.savepoint("venda_lote"):
+                        id_venda = self._gravar_venda(venda.cabecalho, venda.itens, venda.chave, venda.hash_requisicao)
+                    resultado.update(status="registrada", id_venda=id_venda)
+                except Exception as e:
+                    transitorio = erro_sql_transitorio(e) or erro_sql_transitorio(self.db.ultimo_erro_sql)
+                    resultado.update(status="reenviar" if transitorio else "erro", detalhe=str(e))
+                resultados.append(resultado)
+
+            self.db.conn.commit()
+            incrementar_versao_dados()
+
+        except Exception as e:
+            try:
+                self.db.conn.rollback()
+            except psycopg2.Error:
+                pass  # conexão perdida: não há o que desfazer deste lado
+            print(f"(Alerta: Lote de vendas falhou. Rollback executado.) Erro: {e}")
+            raise LoteVendasIndisponivelError(f"Lote desfeito: {e}") from e
+
+        # Fora do try: o lote já está confirmado, uma falha aqui não pode transformá-lo em 503
+        idempotencia.limpar_expiradas_se_devido()
+        return resultados
+
+    def cancelar_venda(self, id_venda: int, id_usuario: int) -> bool:
+        """
+        Cancela uma venda ativa em uma única transação: devolve os itens ao estoque (entrada
+        'Cancelamento de Venda'), subtrai a venda do rollup vendas_diarias e marca o cabeçalho.
+        Retorna False (motivo em self.ultimo_erro) se a venda não existir ou já estiver cancelada.
+        """
+        self.ultimo_erro = None
+        try:
+            # Trava o cabeçalho: dois cancelamentos simultâneos não devolvem o estoque duas vezes
+            result = self.db.execute_query(
+                "SELECT status, id_evento FROM vendas WHERE id = %s FOR UPDATE", (id_venda,), fetch_one=True
+            )
+            if not result or not result[1]:
+                raise Exception(f"Venda {id_venda} não encontrada.")
+            status_atual, id_evento = result[1]
+            if status_atual == "Cancelada":
+                raise Exception(f"Venda {id_venda} já está cancelada.")
+
+            _, linhas = self.db.execute_query(
+                "SELECT id_item, quantidade FROM itens_venda WHERE id_venda = %s ORDER BY id_item",
+                (id_venda,),
+                fetch_all=True,
+            )
+            linhas = linhas or []
+            self.estoque_service.bloquear_saldos([id_item for id_item, _ in linhas])
+            devolucoes = [
+                MovimentoEstoque(
+                    id_item=id_item,
+                    quantidade=quantidade,
+                    tipo_movimento="Entrada",
+                    origem_recurso="Cancelamento de Venda",
+                    id_usuario=id_usuario,
+                    id_evento=id_evento,
                 )
+                for id_item, quantidade in linhas
+            ]
+            if not self.estoque_service.registrar_movimentos(devolucoes, commit=False):
+                raise Exception("Falha ao devolver os itens ao estoque.")
+
+            self._acumular_vendas_diarias(id_venda, -1)
+            if not self.db.execute_query("UPDATE vendas SET status = 'Cancelada' WHERE id = %s", (id_venda,), return_rowcount=True):
+                raise Exception("Falha ao marcar a venda como cancelada.")
 
-            # 3. Commit geral
             self.db.conn.commit()
-            return id_venda
+            incrementar_versao_dados()
+            return True
 
         except Exception as e:
             self.db.conn.rollback()
-            print(f"(Alerta: Transação de venda falhou. Rollback executado.) Erro: {e}")
+            self.ultimo_erro = str(e)
+            print(f"(Alerta: Cancelamento de venda falhou. Rollback executado.) Erro: {e}")
+            return False
+
+    def reconstruir_vendas_diarias(self) -> Optional[int]:
+        """
+        Recalcula o rollup vendas_diarias inteiro a partir das vendas ativas, em uma única transação.
+        Bloqueia novas vendas e cancelamentos durante a reconstrução. Retorna o nº de linhas do rollup.
+        """
+        try:
+            if not self.db.execute_query("LOCK TABLE vendas IN SHARE MODE"):
+                raise Exception("Falha ao bloquear a tabela de vendas.")
+            if self.db.execute_query("DELETE FROM vendas_diarias", return_rowcount=True) is False:
+                raise Exception("Falha ao limpar o rollup.")
+            total = self.db.execute_query(
+                """
+                INSERT INTO vendas_diarias (dia, id_evento, id_caixa, id_item, quantidade, valor_total, custo_total)
+                SELECT v.data_venda, v.id_evento, mc.id_caixa, iv.id_item,
+                       SUM(iv.quantidade),
+                       SUM(iv.quantidade * iv.valor_unitario),
+                       SUM(iv.quantidade * COALESCE(iv.custo_unitario, 0))
+                FROM vendas v
+                JOIN movimentos_caixa mc ON mc.id = v.id_movimento_caixa
+                JOIN itens_venda iv ON iv.id_venda = v.id
+                WHERE v.status = 'Ativa'
+                GROUP BY v.data_venda, v.id_evento, mc.id_caixa, iv.id_item
+                """,
+                return_rowcount=True,
+            )
+            if total is False:
+                raise Exception("Falha ao recalcular o rollup.")
+            self.db.conn.commit()
+            incrementar_versao_dados()
+            return total
+        except Exception as e:
+            self.db.conn.rollback()
+            print(f"(Alerta: Reconstrução de vendas_diarias falhou.) Erro: {e}")
             return None
 
     # -----------------------------------------------------------
     # Consultas
     # -----------------------------------------------------------
 
-    def buscar_vendas(self) -> List[Venda]:
-        """Busca todas as vendas."""
-        query = "SELECT id, id_pessoa, data_venda, responsavel, id_evento, id_movimento_caixa FROM vendas"
-        columns, results = self.db.execute_query(query, fetch_all=True)
+    @staticmethod
+    def _filtros_vendas(
+        id_evento: Optional[int] = None,
+        id_movimento_caixa: Optional[int] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        responsavel: Optional[str] = None,
+        cursor: Optional[int] = None,
+    ) -> Tuple[str, List[Any], str]:
+        """
+        Cláusula WHERE (ou ''), parâmetros e ORDER BY para os filtros opcionais de vendas.
+        Com filtro de data a ordem (e o keyset) é (data_venda, id) DESC, a mesma de idx_vendas_data_id:
+        a página sai de um scan reverso do índice dentro do período. `cursor` continua sendo um id;
+        a data dele é lida da própria venda (data_venda não muda depois do registro).
+        """
+        por_data = data_inicio is not None or data_fim is not None
+        condicoes: List[str] = []
+        params: List[Any] = []
+        filtros = (
+            ("(data_venda, id) < (SELECT data_venda, id FROM vendas WHERE id = %s)" if por_data else "id < %s", cursor),
+            ("id_evento = %s", id_evento),
+            ("id_movimento_caixa = %s", id_movimento_caixa),
+            ("data_venda >= %s", data_inicio),
+            ("data_venda <= %s", data_fim),
+            ("responsavel = %s", responsavel),
+        )
+        for condicao, valor in filtros:
+            if valor is not None:
+                condicoes.append(condicao)
+                params.append(valor)
+        where = (" WHERE " + " AND ".join(condicoes)) if condicoes else ""
+        return where, params, " ORDER BY data_venda DESC, id DESC" if por_data else " ORDER BY id DESC"
+
+    def buscar_vendas(
+        self,
+        limite: Optional[int] = None,
+        cursor: Optional[int] = None,
+        id_evento: Optional[int] = None,
+        id_movimento_caixa: Optional[int] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        responsavel: Optional[str] = None,
+    ) -> List[Venda]:
+        """
+        Busca vendas da mais recente para a mais antiga, com filtros opcionais.
+        Paginação por keyset: `cursor` é o id da última venda da página anterior (retorna as que vêm
+        depois dela na ordem: id DESC, ou (data_venda, id) DESC quando há filtro de data), então o custo
+        de cada página não cresce com a profundidade, ao contrário de OFFSET.
+        Sem `limite`, lê por cursor nomeado (ver iterar_vendas) em vez de materializar o resultado duas vezes.
+        """
+        if limite is None:
+            return list(self.iterar_vendas(id_evento, id_movimento_caixa, data_inicio, data_fim, responsavel, cursor))
+
+        where, params, ordem = self._filtros_vendas(id_evento, id_movimento_caixa, data_inicio, data_fim, responsavel, cursor)
+        query = f"{VENDAS_SELECT}{where}{ordem} LIMIT %s"
+        columns, results = self.db.execute_query(query, tuple(params + [limite]), fetch_all=True)
         if results:
             return [Venda(**dict(zip(columns, row))) for row in results]
         return []
 
+    def iterar_vendas(
+        self,
+        id_evento: Optional[int] = None,
+        id_movimento_caixa: Optional[int] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        responsavel: Optional[str] = None,
+        cursor: Optional[int] = None,
+        itersize: Optional[int] = None,
+    ) -> Iterator[Venda]:
+        """Mesmos filtros e ordem de buscar_vendas, uma venda por vez (cursor nomeado, blocos de `itersize`)."""
+        where, params, ordem = self._filtros_vendas(id_evento, id_movimento_caixa, data_inicio, data_fim, responsavel, cursor)
+        for row in self.db.stream_query(f"{VENDAS_SELECT}{where}{ordem}", tuple(params), itersize=itersize):
+            yield Venda(**row)
+
     def buscar_ultimas_vendas(self, limite: int = 10) -> List[Venda]:
         """Busca as últimas vendas (ordem desc)."""
         query = """
-        SELECT id, id_pessoa, data_venda, responsavel, id_evento, id_movimento_caixa
+        SELECT id, id_pessoa, data_venda, responsavel, id_evento, id_movimento_caixa, status
         FROM vendas
         ORDER BY id DESC
         LIMIT %s
@@ -0,0 +1,138 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+# src/utils/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# --- VERSÃO DOS DADOS ---
+# Contador do processo, incrementado pelos services após cada escrita confirmada (commit).
+# Entradas de cache guardam a versão em que foram calculadas; versão diferente = entrada obsoleta.
+# Escritas feitas por outro processo (outro worker, CLI) não incrementam este contador: caches
+# que precisam percebê-las usam também uma VersaoCompartilhada (versão mantida no banco).
+_versao_dados = 0
+_versao_lock = threading.Lock()
+
+
+def versao_dados() -> int:
+    return _versao_dados
+
+
+def incrementar_versao_dados() -> int:
+    """Invalida todos os resultados derivados dos dados de negócio (vendas, estoque, financeiro)."""
+    global _versao_dados
+    with _versao_lock:
+        _versao_dados += 1
+        return _versao_dados
+
+
+class VersaoCompartilhada:
+    """
+    Versão mantida no banco (tabela versoes, incrementada por trigger em qualquer processo),
+    reaproveitada por até `intervalo_segundos` para que um acerto de cache não precise de conexão.
+    Uma escrita confirmada neste processo (incrementar_versao_dados) força nova leitura na próxima
+    consulta; as de outros processos são percebidas em até `intervalo_segundos`.
+    """
+
+    def __init__(self, intervalo_segundos: float = 2.0):
+        self.intervalo_segundos = intervalo_segundos
+        self._lida: Optional[Tuple[int, int, float]] = None  # (versão do banco, versão local, lida em)
+        self._lock = threading.Lock()
+
+    def atual(self) -> Optional[int]:
+        """Versão lida há menos de `intervalo_segundos` e sem escrita local desde então; senão None."""
+        with self._lock:
+            if self._lida is None:
+                return None
+            versao, versao_local, lida_em = self._lida
+            if versao_local != versao_dados() or time.monotonic() - lida_em > self.intervalo_segundos:
+                return None
+            return versao
+
+    def atualizar(self, versao: int, versao_local: int) -> None:
+        """Registra a `versao` lida do banco; `versao_local` = versao_dados() lida ANTES da consulta."""
+        with self._lock:
+            self._lida = (versao, versao_local, time.monotonic())
+
+
+class CacheTTL:
+    """
+    Cache em memória, thread-safe, com expiração por tempo (TTL) e limite de entradas (LRU).
+    Cada entrada é válida enquanto não expirar e enquanto a versão (`fonte_versao`) não mudar.
+    Caches que não dependem dos dados de negócio passam `fonte_versao=None` e usam `remover`;
+    nesse caso, quem calcula lê `geracao(chave)` antes e a repassa a `guardar`, para que um valor
+    lido antes de uma remoção concorrente não volte ao cache depois dela.
+    """
+
+    def __init__(
+        self,
+        max_entradas: int = 128,
+        ttl_segundos: float = 60.0,
+        fonte_versao: Optional[Callable[[], int]] = versao_dados,
+    ):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.fonte_versao = fonte_versao or (lambda: 0)
+        self._entradas: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._geracoes: Dict[Hashable, int] = {}  # remoções por chave
+        self._limpezas = 0
+
+    def obter(self, chave: Hashable) -> Tuple[bool, Any]:
+        """Retorna (True, valor) se houver entrada válida; senão (False, None)."""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                versao, expira_em, valor = entrada
+                if versao == self.fonte_versao() and expira_em > time.monotonic():
+                    self._entradas.move_to_end(chave)
+                    self._stats["hits"] += 1
+                    return True, valor
+                del self._entradas[chave]
+            self._stats["misses"] += 1
+            return False, None
+
+    def guardar(self, chave: Hashable, valor: Any, versao: int, geracao: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Guarda `valor` calculado na `versao` dos dados (lida ANTES de calcular). Com `geracao`
+        (também lida antes), não guarda nada se a chave foi removida enquanto o valor era calculado.
+        """
+        with self._lock:
+            if geracao is not None and geracao != self._geracao(chave):
+                return
+            self._entradas[chave] = (versao, time.monotonic() + self.ttl_segundos, valor)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def versao(self) -> int:
+        """Versão atual dos dados; leia ANTES de calcular o valor que será guardado."""
+        return self.fonte_versao()
+
+    def geracao(self, chave: Hashable) -> Tuple[int, int]:
+        """Geração da chave (muda a cada `remover`/`limpar`); leia ANTES de calcular o valor."""
+        with self._lock:
+            return self._geracao(chave)
+
+    def _geracao(self, chave: Hashable) -> Tuple[int, int]:
+        return self._limpezas, self._geracoes.get(chave, 0)
+
+    def remover(self, chave: Hashable) -> None:
+        with self._lock:
+            self._entradas.pop(chave, None)
+            self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._geracoes.clear()
+            self._limpezas += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entradas": len(self._entradas)}
@@ -2,11 +2,21 @@
 # Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
 # sob os termos da GNU General Public License como publicada pela Free Software Foundation,
 # na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+import logging
 import os
-from typing import Any, Optional, Tuple
+import sys
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
 
 import psycopg2
 import toml
+from psycopg2 import extensions, extras, pool
+
+from src.utils.metricas import METRICAS_SQL
+from src.utils.migracoes import VERSAO_ATUAL, aplicar_migracoes
 
 # Caminhos base do projeto e secrets
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -34,15 +44,98 @@ def load_db_config():
 # Config carregada uma vez
 DB_CONFIG = load_db_config()
 
+# Parâmetros do pool (opcionais no secrets.toml, seção [database])
+POOL_MIN = int(DB_CONFIG.get("pool_min", 1))
+POOL_MAX = int(DB_CONFIG.get("pool_max", 10))
+POOL_TIMEOUT = float(DB_CONFIG.get("pool_timeout", 10))
+POOL_HEALTH_CHECK = bool(DB_CONFIG.get("pool_health_check", True))
+
+# Comandos acima deste tempo vão para o log de consultas lentas (0 desliga o log)
+SLOW_QUERY_MS = float(DB_CONFIG.get("slow_query_ms", 200))
+logger_consultas_lentas = logging.getLogger("unython.sql.lentas")
+
+# Linhas buscadas por ida ao servidor em stream_query (cursor nomeado)
+STREAM_ITERSIZE = int(DB_CONFIG.get("stream_itersize", 2000))
+
+
+def _rotulo_chamador(profundidade: int = 2) -> str:
+    """
+    Rótulo padrão de um comando SQL: o método que chamou execute_query/execute_values/copy_from
+    (ex.: 'VendaService._gravar_venda'; funções soltas ficam 'modulo.funcao').
+    """
+    code = sys._getframe(profundidade).f_code
+    nome = getattr(code, "co_qualname", code.co_name)
+    if "." in nome:
+        return nome
+    modulo = sys._getframe(profundidade).f_globals.get("__name__", "")
+    return f"{modulo.rsplit('.', 1)[-1]}.{nome}"
+
+
+# Nomes únicos para os cursores nomeados de stream_query (únicos por conexão já bastaria)
+_SEQ_CURSORES = itertools.count(1)
+
+
+# Classes SQLSTATE em que repetir o mesmo comando mais tarde pode dar certo: 08 conexão,
+# 40 deadlock/serialização, 53 recursos esgotados, 57 intervenção do operador (shutdown, cancel)
+CLASSES_SQLSTATE_TRANSITORIAS = ("08", "40", "53", "57")
+
+
+def erro_sql_transitorio(erro: Optional[BaseException]) -> bool:
+    """True se `erro` é uma falha do banco que não depende dos dados enviados (vale tentar de novo)."""
+    if not isinstance(erro, psycopg2.Error):
+        return False
+    if erro.pgcode is None:
+        # Sem SQLSTATE: a conexão caiu ou foi fechada antes de o servidor responder
+        return isinstance(erro, (psycopg2.OperationalError, psycopg2.InterfaceError))
+    return erro.pgcode[:2] in CLASSES_SQLSTATE_TRANSITORIAS
+
+
+class _Medicao:
+    __slots__ = ("rotulo", "erro")
+
+    def __init__(self, rotulo: str):
+        self.rotulo = rotulo
+        self.erro = False
+
+
+def _registrar_medicao(query: str, rotulo: str, duracao: float, linhas: int, erro: bool) -> None:
+    """Envia a medição para METRICAS_SQL e, acima de SLOW_QUERY_MS, para o log de consultas lentas."""
+    METRICAS_SQL.registrar(rotulo, duracao, linhas, erro)
+    if SLOW_QUERY_MS > 0 and duracao * 1000 >= SLOW_QUERY_MS:
+        sql = " ".join(query.split())
+        logger_consultas_lentas.warning(
+            "Consulta lenta [%s] %.1f ms, %d linha(s): %s", rotulo, duracao * 1000, max(linhas, 0), sql[:300]
+        )
+
 
 class DatabaseManager:
     """
     Controla a conexão e as operações básicas de persistência no PostgreSQL.
+
+    Pode operar com conexão dedicada (`connect`/`disconnect`, usada por scripts e testes)
+    ou emprestada do pool do processo (`acquire`/`release`, usada pela API).
     """
 
+    # Pool compartilhado por todas as instâncias do processo
+    _pool: Optional[pool.ThreadedConnectionPool] = None
+    _pool_lock = threading.Lock()
+    _pool_slots: Optional[threading.BoundedSemaphore] = None
+    _pool_stats: Dict[str, float] = {
+        "checkouts": 0,
+        "devolucoes": 0,
+        "descartadas": 0,
+        "timeouts": 0,
+        "em_uso": 0,
+        "espera_total_ms": 0.0,
+    }
+
     def __init__(self):
         self.conn = None
         self.cursor = None
+        self._pooled = False
+        self._savepoints: List[str] = []
+        # Último erro SQL engolido por execute_query/execute_values/copy_from (que só devolvem False)
+        self.ultimo_erro_sql: Optional[psycopg2.Error] = None
 
         self.DB_HOST = DB_CONFIG.get("host")
         self.DB_NAME = DB_CONFIG.get("dbname")
@@ -66,6 +159,187 @@ class DatabaseManager:
             print(f"ERRO FATAL: Falha ao conectar ao PostgreSQL. Verifique o secrets.toml. Erro: {e}")
             raise
 
+    # -----------------------------------------------------------
+    # Pool de conexões (processo inteiro)
+    # -----------------------------------------------------------
+
+    @classmethod
+    def _get_pool(cls) -> pool.ThreadedConnectionPool:
+        """Cria o pool na primeira utilização (lazy) e o reaproveita depois."""
+        if cls._pool is None:
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._pool = pool.ThreadedConnectionPool(
+                        POOL_MIN,
+                        POOL_MAX,
+                        host=DB_CONFIG.get("host"),
+                        database=DB_CONFIG.get("dbname"),
+                        user=DB_CONFIG.get("user"),
+                        password=DB_CONFIG.get("password"),
+                        port=DB_CONFIG.get("port"),
+                    )
+                    cls._pool_slots = threading.BoundedSemaphore(POOL_MAX)
+                    print(f"Pool PostgreSQL criado (min={POOL_MIN}, max={POOL_MAX}).")
+        return cls._pool
+
+    @staticmethod
+    def _conexao_saudavel(conn) -> bool:
+        """Health check no checkout: conexão aberta e respondendo a um SELECT 1."""
+        if conn.closed:
+            return False
+        if not POOL_HEALTH_CHECK:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def acquire(self):
+        """
+        Empresta uma conexão do pool do processo.
+        Bloqueia até `pool_timeout` segundos se todas estiverem em uso.
+        """
+        db_pool = self._get_pool()
+        inicio = time.perf_counter()
+        if not self._pool_slots.acquire(timeout=POOL_TIMEOUT):
+            with self._pool_lock:
+                self._pool_stats["timeouts"] += 1
+            raise ConnectionError(f"Pool PostgreSQL esgotado (max={POOL_MAX}) após {POOL_TIMEOUT}s de espera.")
+
+        try:
+            conn = db_pool.getconn()
+            while not self._conexao_saudavel(conn):
+                # Conexão quebrada (ex.: restart do Postgres): descarta e pede outra
+                db_pool.putconn(conn, close=True)
+                with self._pool_lock:
+                    self._pool_stats["descartadas"] += 1
+                conn = db_pool.getconn()
+        except Exception:
+            self._pool_slots.release()
+            raise
+
+        with self._pool_lock:
+            self._pool_stats["checkouts"] += 1
+            self._pool_stats["em_uso"] += 1
+            self._pool_stats["espera_total_ms"] += (time.perf_counter() - inicio) * 1000
+
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self._pooled = True
+
+    def release(self):
+        """Devolve a conexão ao pool, descartando qualquer transação pendente."""
+        if not self._pooled or self.conn is None:
+            return
+        conn = self.conn
+        descartar = conn.closed != 0
+        try:
+            if not descartar and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            descartar = True
+        finally:
+            self._get_pool().putconn(conn, close=descartar)
+            self._pool_slots.release()
+            with self._pool_lock:
+                self._pool_stats["devolucoes"] += 1
+                self._pool_stats["em_uso"] -= 1
+                if descartar:
+                    self._pool_stats["descartadas"] += 1
+            self.conn = None
+            self.cursor = None
+            self._pooled = False
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, Any]:
+        """Retorna um retrato do pool (tamanhos configurados, uso atual e contadores)."""
+        with cls._pool_lock:
+            stats = dict(cls._pool_stats)
+            db_pool = cls._pool
+            abertas = len(db_pool._used) + len(db_pool._pool) if db_pool else 0
+            ociosas = len(db_pool._pool) if db_pool else 0
+        stats.update(
+            {
+                "inicializado": db_pool is not None,
+                "min": POOL_MIN,
+                "max": POOL_MAX,
+                "abertas": abertas,
+                "ociosas": ociosas,
+                "espera_media_ms": round(stats["espera_total_ms"] / stats["checkouts"], 3) if stats["checkouts"] else 0.0,
+            }
+        )
+        return stats
+
+    @classmethod
+    def close_pool(cls):
+        """Fecha todas as conexões do pool (shutdown da API)."""
+        with cls._pool_lock:
+            if cls._pool is not None:
+                cls._pool.closeall()
+                cls._pool = None
+                cls._pool_slots = None
+                print("Pool PostgreSQL encerrado.")
+
+    # -----------------------------------------------------------
+    # Savepoints (subtransações)
+    # -----------------------------------------------------------
+
+    @contextmanager
+    def savepoint(self, nome: str) -> Iterator[None]:
+        """
+        Abre um SAVEPOINT dentro da transação corrente. Se o bloco falhar, só o trabalho feito
+        depois do savepoint é desfeito e a transação externa continua utilizável.
+        Enquanto houver savepoint aberto, erros SQL em execute_query voltam ao savepoint
+        em vez de desfazer a transação inteira.
+        """
+        self.cursor.execute(f"SAVEPOINT {nome}")
+        self._savepoints.append(nome)
+        try:
+            yield
+        except Exception:
+            # Se a transação inteira já foi desfeita (_rollback sem savepoint), não há para onde voltar
+            if self._savepoints and self._savepoints[-1] == nome:
+                self._savepoints.pop()
+                try:
+                    self.cursor.execute(f"ROLLBACK TO SAVEPOINT {nome}")
+                except psycopg2.Error:
+                    self.conn.rollback()
+            raise
+        else:
+            self._savepoints.pop()
+            self.cursor.execute(f"RELEASE SAVEPOINT {nome}")
+
+    def _rollback(self):
+        """Desfaz até o savepoint mais interno (se houver) ou a transação inteira."""
+        if self._savepoints:
+            try:
+                self.cursor.execute(f"ROLLBACK TO SAVEPOINT {self._savepoints[-1]}")
+                return
+            except psycopg2.Error:
+                self._savepoints.clear()
+        self.conn.rollback()
+
+    @contextmanager
+    def _medir(self, query: str, rotulo: str) -> Iterator[_Medicao]:
+        """
+        Mede um comando: latência, linhas (cursor.rowcount) e erro vão para METRICAS_SQL sob `rotulo`;
+        acima de SLOW_QUERY_MS, o comando (sem parâmetros) é registrado no log de consultas lentas.
+        """
+        medicao = _Medicao(rotulo)
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        except BaseException:
+            medicao.erro = True
+            raise
+        finally:
+            duracao = time.perf_counter() - inicio
+            linhas = self.cursor.rowcount if self.cursor is not None and not self.cursor.closed else 0
+            _registrar_medicao(query, rotulo, duracao, linhas, medicao.erro)
+
     def execute_query(
         self,
         query: str,
@@ -74,13 +348,28 @@ class DatabaseManager:
         fetch_all: bool = False,
         commit: bool = False,
         return_rowcount: bool = False,
+        rotulo: Optional[str] = None,
     ) -> Any:
         """
         Executa comandos SQL com suporte a fetch, retorno de ID (via RETURNING) e rowcount.
+        `rotulo` identifica o comando nas métricas (padrão: o método chamador).
         """
         if not self.conn:
             raise ConnectionError("A conexão com o PostgreSQL não foi estabelecida.")
 
+        with self._medir(query, rotulo or _rotulo_chamador()) as medicao:
+            return self._execute_query(query, params, fetch_one, fetch_all, commit, return_rowcount, medicao)
+
+    def _execute_query(
+        self,
+        query: str,
+        params: Optional[Tuple[Any, ...]],
+        fetch_one: bool,
+        fetch_all: bool,
+        commit: bool,
+        return_rowcount: bool,
+        medicao: _Medicao,
+    ) -> Any:
         try:
             is_dml = query.strip().upper().startswith(("INSERT", "UPDATE", "DELETE"))
             last_id = None
@@ -91,7 +380,9 @@ class DatabaseManager:
                 self.cursor.execute(query)
 
             if is_dml and self.cursor.description:
-                last_id = self.cursor.fetchone()[0]
+                # RETURNING pode não devolver linha (ex.: ON CONFLICT ... WHERE falso)
+                returned = self.cursor.fetchone()
+                last_id = returned[0] if returned else None
             rowcount = self.cursor.rowcount
 
             if commit:
@@ -116,246 +407,145 @@ class DatabaseManager:
             return True
 
         except psycopg2.Error as e:
-            print(f"Erro SQL (Postgres): {e}")
-            self.conn.rollback()
+            medicao.erro = True
+            print(f"Erro SQL (Postgres) [{medicao.rotulo}]: {e}")
+            self.ultimo_erro_sql = e
+            self._rollback()
             return False
         except Exception as e:
             if self.conn:
-                self.conn.rollback()
+                self._rollback()
             raise Exception(f"Erro inesperado durante a execução da query: {e}")
 
-    def create_tables(self):
-        """
-        Cria todas as tabelas, adaptando a sintaxe para PostgreSQL.
-        """
-        usuarios_table_query = """
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id SERIAL PRIMARY KEY,
-            nome VARCHAR(255) NOT NULL,
-            email VARCHAR(255) UNIQUE,
-            funcao VARCHAR(100),
-            require_password_change BOOLEAN DEFAULT FALSE,
-            role VARCHAR(50) DEFAULT 'Vendedor',
-            status VARCHAR(50) DEFAULT 'Ativo',
-            hashed_password VARCHAR(128)
-        );
-        """
-
-        pessoas_table_query = """
-        CREATE TABLE IF NOT EXISTS pessoas (
-            id SERIAL PRIMARY KEY,
-            nome VARCHAR(255) NOT NULL,
-            telefone VARCHAR(50),
-            data_cadastro DATE NOT NULL DEFAULT NOW()
-        );
-        """
-
-        eventos_tabel_query = """
-        CREATE TABLE IF NOT EXISTS eventos (
-            id SERIAL PRIMARY KEY,
-            nome VARCHAR(255) NOT NULL,
-            data_evento DATE NOT NULL,
-            tipo VARCHAR(100),
-            status VARCHAR(50) DEFAULT 'Aberto'
-        );
+    def execute_values(
+        self,
+        query: str,
+        rows: List[Tuple[Any, ...]],
+        template: Optional[str] = None,
+        fetch: bool = False,
+        commit: bool = False,
+        rotulo: Optional[str] = None,
+    ) -> Any:
         """
-
-        agendamentos_table_query = """
-        CREATE TABLE IF NOT EXISTS agendamentos (
-            id SERIAL PRIMARY KEY,
-            id_pessoa INTEGER NOT NULL,
-            id_facilitador INTEGER,
-            data_hora TIMESTAMP WITHOUT TIME ZONE NOT NULL,
-            tipo_servico VARCHAR(100),
-            status VARCHAR(50) DEFAULT 'Agendado',
-            id_evento INTEGER NOT NULL,
-            compareceu VARCHAR(50) DEFAULT 'Pendente',
-            FOREIGN KEY (id_pessoa) REFERENCES pessoas(id),
-            FOREIGN KEY (id_facilitador) REFERENCES usuarios(id),
-            FOREIGN KEY (id_evento) REFERENCES eventos(id)
-        );
+        Executa um comando multi-linha (`VALUES %s`) via psycopg2.extras.execute_values
+        em um único round trip. Com fetch=True retorna as linhas do RETURNING; senão, o rowcount.
         """
-
-        categorias_table_query = """
-        CREATE TABLE IF NOT EXISTS categorias (
-            id SERIAL PRIMARY KEY,
-            nome VARCHAR(100) NOT NULL UNIQUE,
-            descricao TEXT,
-            status VARCHAR(50) DEFAULT 'Ativo'
-        );
+        if not self.conn:
+            raise ConnectionError("A conexão com o PostgreSQL não foi estabelecida.")
+        if not rows:
+            return [] if fetch else 0
+
+        with self._medir(query, rotulo or _rotulo_chamador()) as medicao:
+            try:
+                # page_size = len(rows): todas as linhas em um único comando
+                result = extras.execute_values(self.cursor, query, rows, template=template, page_size=len(rows), fetch=fetch)
+                rowcount = self.cursor.rowcount
+                if commit:
+                    self.conn.commit()
+                return result if fetch else rowcount
+
+            except psycopg2.Error as e:
+                medicao.erro = True
+                print(f"Erro SQL (Postgres) [{medicao.rotulo}]: {e}")
+                self.ultimo_erro_sql = e
+                self._rollback()
+                return False
+            except Exception as e:
+                if self.conn:
+                    self._rollback()
+                raise Exception(f"Erro inesperado durante a execução em lote: {e}")
+
+    def copy_from(self, query: str, arquivo: IO, commit: bool = False, rotulo: Optional[str] = None) -> Any:
         """
-
-        itens_table_query = """
-        CREATE TABLE IF NOT EXISTS itens (
-            id SERIAL PRIMARY KEY,
-            nome VARCHAR(255) NOT NULL UNIQUE,
-            valor_compra NUMERIC(10, 2) NOT NULL,
-            valor_venda NUMERIC(10, 2) NOT NULL,
-            status VARCHAR(50) DEFAULT 'Ativo',
-            id_categoria INTEGER,
-            FOREIGN KEY (id_categoria) REFERENCES categorias(id)
-        );
+        Executa um `COPY ... FROM STDIN` lendo `arquivo` em blocos (o arquivo nunca é carregado
+        inteiro na memória). Retorna o nº de linhas copiadas, ou False em caso de erro SQL.
         """
+        if not self.conn:
+            raise ConnectionError("A conexão com o PostgreSQL não foi estabelecida.")
 
-        estoque_table_query = """
-        CREATE TABLE IF NOT EXISTS estoque (
-            id SERIAL PRIMARY KEY,
-            id_item INTEGER NOT NULL,
-            quantidade INTEGER NOT NULL,
-            tipo_movimento VARCHAR(50) NOT NULL,
-            data_movimento DATE NOT NULL DEFAULT NOW(),
-            origem_recurso VARCHAR(100) DEFAULT 'Doacao',
-            id_usuario INTEGER,
-            id_evento INTEGER,
-            FOREIGN KEY (id_item) REFERENCES itens(id),
-            FOREIGN KEY (id_usuario) REFERENCES usuarios(id),
-            FOREIGN KEY (id_evento) REFERENCES eventos(id)
-        );
-        """
+        with self._medir(query, rotulo or _rotulo_chamador()) as medicao:
+            try:
+                self.cursor.copy_expert(query, arquivo)
+                rowcount = self.cursor.rowcount
+                if commit:
+                    self.conn.commit()
+                return rowcount
 
-        vendas_table_query = """
-        CREATE TABLE IF NOT EXISTS vendas (
-            id SERIAL PRIMARY KEY,
-            id_pessoa INTEGER,
-            data_venda DATE NOT NULL DEFAULT NOW(),
-            id_evento INTEGER NOT NULL,
-            responsavel VARCHAR(255),
-            id_movimento_caixa INTEGER NOT NULL,
-            FOREIGN KEY (id_pessoa) REFERENCES usuarios(id),
-            FOREIGN KEY (id_evento) REFERENCES eventos(id),
-            FOREIGN KEY (id_movimento_caixa) REFERENCES movimentos_caixa(id)
-        );
-        """
+            except psycopg2.Error as e:
+                medicao.erro = True
+                print(f"Erro SQL (Postgres) [{medicao.rotulo}]: {e}")
+                self.ultimo_erro_sql = e
+                self._rollback()
+                return False
 
-        itens_venda_table_query = """
-        CREATE TABLE IF NOT EXISTS itens_venda (
-            id SERIAL PRIMARY KEY,
-            id_venda INTEGER NOT NULL,
-            id_item INTEGER NOT NULL,
-            quantidade INTEGER NOT NULL,
-            valor_unitario NUMERIC(10, 2) NOT NULL,
-            FOREIGN KEY (id_venda) REFERENCES vendas(id),
-            FOREIGN KEY (id_item) REFERENCES itens(id)
-        );
+    def stream_query(
+        self,
+        query: str,
+        params: Optional[Tuple[Any, ...]] = None,
+        itersize: Optional[int] = None,
+        rotulo: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
         """
-
-        movimentos_financeiros_table_query = """
-        CREATE TABLE IF NOT EXISTS movimentos_financeiros (
-            id SERIAL PRIMARY KEY,
-            data_registro TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
-            id_usuario INTEGER NOT NULL,
-            tipo_movimento VARCHAR(50) NOT NULL CHECK(tipo_movimento IN ('Receita', 'Despesa')),
-            valor NUMERIC(10, 2) NOT NULL,
-            descricao TEXT,
-            categoria VARCHAR(100),
-            id_evento INTEGER,
-            status VARCHAR(50) NOT NULL DEFAULT 'Ativo',
-            FOREIGN KEY (id_usuario) REFERENCES usuarios(id),
-            FOREIGN KEY (id_evento) REFERENCES eventos(id)
-        );
+        Gerador de linhas (dict coluna -> valor) lidas por um cursor nomeado (server-side):
+        o servidor envia `itersize` linhas por vez, então a memória não cresce com o resultado.
+        Para listagens/exportações grandes; em erro SQL levanta a exceção (não há retorno False).
+        Se a conexão estava ociosa, a transação de leitura é encerrada ao fim do gerador;
+        dentro de uma transação do chamador, ela é mantida.
         """
+        if not self.conn:
+            raise ConnectionError("A conexão com o PostgreSQL não foi estabelecida.")
 
-        caixas_table_query = """
-        CREATE TABLE IF NOT EXISTS caixas (
-            id SERIAL PRIMARY KEY,
-            nome VARCHAR(100) UNIQUE NOT NULL,
-            descricao VARCHAR(255),
-            status VARCHAR(50) DEFAULT 'Ativo'
-        );
-        """
+        rotulo = rotulo or _rotulo_chamador()
+        ociosa = self.conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+        cursor = self.conn.cursor(name=f"stream_{next(_SEQ_CURSORES)}")
+        cursor.itersize = itersize or STREAM_ITERSIZE
+        # Métricas: só o tempo gasto no banco (execute + fetches), não o do consumidor
+        gasto, linhas, erro = 0.0, 0, False
+        try:
+            inicio = time.perf_counter()
+            cursor.execute(query, params)
+            # O DECLARE não traz description; a primeira busca traz
+            bloco = cursor.fetchmany(cursor.itersize)
+            gasto += time.perf_counter() - inicio
+            columns = [desc[0] for desc in cursor.description]
+            while bloco:
+                linhas += len(bloco)
+                for row in bloco:
+                    yield dict(zip(columns, row))
+                inicio = time.perf_counter()
+                bloco = cursor.fetchmany(cursor.itersize)
+                gasto += time.perf_counter() - inicio
+        except psycopg2.Error as e:
+            erro = True
+            print(f"Erro SQL (Postgres) [{rotulo}]: {e}")
+            raise
+        finally:
+            if not cursor.closed:
+                try:
+                    cursor.close()
+                except psycopg2.Error:
+                    pass
+            if erro:
+                self._rollback()
+            elif ociosa:
+                self.conn.commit()
+            _registrar_medicao(query, rotulo, gasto, linhas, erro)
 
-        movimentos_caixa_table_query = """
-        CREATE TABLE IF NOT EXISTS movimentos_caixa (
-            id SERIAL PRIMARY KEY,
-            id_caixa INT NOT NULL,
-            id_usuario_abertura INT NOT NULL,
-            id_evento INT,
-            valor_abertura NUMERIC(10, 2) NOT NULL DEFAULT 0.00,
-            status VARCHAR(50) NOT NULL DEFAULT 'Aberto',
-            data_abertura TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            data_fechamento TIMESTAMP WITHOUT TIME ZONE,
-            FOREIGN KEY (id_caixa) REFERENCES caixas(id),
-            FOREIGN KEY (id_usuario_abertura) REFERENCES usuarios(id),
-            FOREIGN KEY (id_evento) REFERENCES eventos(id)
-        );
+    def create_tables(self) -> List[int]:
         """
-
-        indexes_query = """
-        CREATE INDEX IF NOT EXISTS idx_mov_caixa_caixa_id ON movimentos_caixa (id_caixa);
-        CREATE INDEX IF NOT EXISTS idx_mov_caixa_status ON movimentos_caixa (status);
+        Leva o esquema à versão atual aplicando as migrações pendentes (ver src/utils/migracoes.py).
+        Com o banco em dia não executa DDL. Retorna as versões aplicadas nesta chamada.
         """
-
-        queries = [
-            usuarios_table_query,
-            pessoas_table_query,
-            eventos_tabel_query,
-            agendamentos_table_query,
-            itens_table_query,
-            estoque_table_query,
-            vendas_table_query,
-            itens_venda_table_query,
-            movimentos_financeiros_table_query,
-            caixas_table_query,
-            movimentos_caixa_table_query,
-            indexes_query,
-        ]
-
-        for query in queries:
-            self.execute_query(query, commit=True)
-
-        # Ajuste para bases já existentes: adiciona coluna se não existir
-        self.execute_query(
-            "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS require_password_change BOOLEAN DEFAULT FALSE;",
-            commit=True,
-        )
-        # Ajuste FK de vendas.id_pessoa -> usuarios.id
-        self.execute_query(
-            """
-            DO $$
-            DECLARE
-                exists_fk BOOLEAN;
-            BEGIN
-                SELECT EXISTS (
-                    SELECT 1 FROM pg_constraint
-                    WHERE conname = 'vendas_id_pessoa_fkey'
-                ) INTO exists_fk;
-
-                IF exists_fk THEN
-                    ALTER TABLE vendas DROP CONSTRAINT vendas_id_pessoa_fkey;
-                END IF;
-
-                PERFORM 1 FROM pg_constraint WHERE conname = 'vendas_id_pessoa_fkey';
-                IF NOT FOUND THEN
-                    EXECUTE 'ALTER TABLE vendas ADD CONSTRAINT vendas_id_pessoa_fkey FOREIGN KEY (id_pessoa) REFERENCES usuarios(id)';
-                END IF;
-            END$$;
-            """,
-            commit=True,
-        )
-        self.execute_query(
-            "ALTER TABLE movimentos_caixa ADD COLUMN IF NOT EXISTS id_evento INT NULL;",
-            commit=True,
-        )
-        self.execute_query(
-            """
-            DO $$
-            BEGIN
-                IF NOT EXISTS (
-                    SELECT 1 FROM pg_constraint WHERE conname = 'fk_movimento_evento'
-                ) THEN
-                    ALTER TABLE movimentos_caixa
-                        ADD CONSTRAINT fk_movimento_evento
-                        FOREIGN KEY (id_evento) REFERENCES eventos(id);
-                END IF;
-            END$$;
-            """,
-            commit=True,
-        )
-
-        print("Estruturas de dados criadas ou verificadas no PostgreSQL.")
+        aplicadas = aplicar_migracoes(self)
+        if aplicadas:
+            print(f"Esquema do PostgreSQL migrado para a versão {VERSAO_ATUAL} ({len(aplicadas)} migração(ões) aplicada(s)).")
+        return aplicadas
 
     def disconnect(self):
-        """Fecha a conexão."""
+        """Fecha a conexão (ou a devolve ao pool, se foi emprestada)."""
+        if self._pooled:
+            self.release()
+            return
         if self.conn:
             self.conn.close()
             print("Conexão ao DB PostgreSQL fechada.")
@@ -1,59 +1,104 @@
 # src/utils/dependencies.py
 
-from typing import Annotated, Generator, Set
+from typing import Annotated, Callable, Generator, Iterable, Iterator, Optional, Set, TypeVar
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from ..utils.database_manager import DatabaseManager # Importação relativa corrigida
-from src.modules.usuario import UsuarioService
-from src.utils.models import Usuario
+from src.modules.usuario import USUARIOS_CACHE, UsuarioService
+from src.utils.models import Usuario, UsuarioToken
+from src.utils.security import decodificar_token_acesso
+
+T = TypeVar("T")
 
 
 # --- DATABASE DEPENDENCIES ---
 # Configuração de Database
 def get_db() -> Generator[DatabaseManager, None, None]:
     """
-    Função geradora que cria uma conexão de banco de dados 
-    e garante que ela seja fechada após a requisição.
+    Função geradora que empresta uma conexão do pool do processo
+    e garante que ela seja devolvida após a requisição.
     """
     db = DatabaseManager()
+    db.acquire()
     try:
-        db.connect()
         yield db
     finally:
-        db.disconnect()
+        db.release()
         
 # Alias para uso nos endpoints
 DBDependency = Annotated[DatabaseManager, Depends(get_db)]
 
 
+def executar_com_conexao(funcao: Callable[[DatabaseManager], T]) -> T:
+    """
+    Empresta uma conexão do pool apenas durante `funcao(db)`. Para endpoints async que
+    alternam banco e trabalho demorado fora dele (ex.: bcrypt): a conexão não fica presa
+    enquanto a requisição aguarda. Chamar via run_in_threadpool.
+    """
+    db = DatabaseManager()
+    db.acquire()
+    try:
+        return funcao(db)
+    finally:
+        db.release()
+
+
+def transmitir_com_conexao(funcao: Callable[[DatabaseManager], Iterable[T]]) -> Iterator[T]:
+    """
+    Versão de executar_com_conexao para StreamingResponse: a conexão é emprestada quando o
+    corpo começa a ser enviado e devolvida ao fim (ou quando o cliente desconecta), em vez de
+    depender da ordem de saída das dependências com yield.
+    """
+    db = DatabaseManager()
+    db.acquire()
+    try:
+        yield from funcao(db)
+    finally:
+        db.release()
+
+
 # --- AUTHENTICATION DEPENDENCIES ---
 
 # Define o esquema OAuth2 (onde a API esperará o token)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: DBDependency) -> Usuario:
+_CREDENCIAIS_INVALIDAS = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Token inválido ou expirado.",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def _buscar_usuario_cacheado(user_id: int) -> Optional[Usuario]:
+    """Usuário do cache de usuários; só uma falta de cache empresta conexão do pool."""
+    encontrado, usuario = USUARIOS_CACHE.obter(user_id)
+    if encontrado:
+        return usuario
+    return executar_com_conexao(lambda db: UsuarioService(db).buscar_usuario_por_id_cacheado(user_id))
+
+
+def get_token_principal(token: Annotated[str, Depends(oauth2_scheme)]) -> UsuarioToken:
     """
-    Função de dependência que (simuladamente) decodifica o token 
-    e retorna o objeto Usuario completo.
+    Valida o token assinado (assinatura, expiração) e devolve id/nome/role contidos nele.
+    Revogação: a versão do token precisa ser a token_version atual do usuário, lida do cache
+    de usuários (só uma falta de cache vai ao banco). Outro processo que revogue o token é
+    percebido aqui em até USUARIOS_CACHE.ttl_segundos.
     """
-    # NOTE: Para fins de teste, vamos DECODIFICAR o token para obter o ID do usuário.
-    # No seu caso, o token é 'access-token-para-usuario-1'. Vamos extrair o '1'.
-    
-    try:
-        user_id_str = token.split('-')[-1] # Ex: '1'
-        user_id = int(user_id_str)
-    except Exception:
-         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido ou expirado.",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    claims = decodificar_token_acesso(token)
+    if claims is None:
+        raise _CREDENCIAIS_INVALIDAS
+    usuario = _buscar_usuario_cacheado(claims["sub"])
+    if usuario is None or usuario.token_version != claims["ver"]:
+        raise _CREDENCIAIS_INVALIDAS
+    return UsuarioToken(id=claims["sub"], role=claims["role"], nome=claims.get("nome", ""))
 
-    # Busca o usuário no DB pelo ID
-    usuario_service = UsuarioService(db)
-    # NOTE: Você precisará de um método buscar_usuario_por_id no UsuarioService!
-    user = usuario_service.buscar_usuario_por_id(user_id)
-    
+
+def get_current_user(principal: Annotated[UsuarioToken, Depends(get_token_principal)]) -> Usuario:
+    """
+    Usuário completo do token, para endpoints que precisam de mais que id/role.
+    Vem do cache de usuários; só uma falta de cache empresta conexão do pool.
+    """
+    user = _buscar_usuario_cacheado(principal.id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,13 +109,13 @@ def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: DBDepend
 
 
 def require_role(allowed_roles: Set[str]):
-    """Cria uma dependência que checa se o usuário tem a função necessária."""
+    """Cria uma dependência que checa a role do token (válido e não revogado, ver get_token_principal)."""
     
-    def role_checker(current_user: Annotated[Usuario, Depends(get_current_user)]):
+    def role_checker(current_user: Annotated[UsuarioToken, Depends(get_token_principal)]):
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Acesso negado. Requer função: {', '.join(allowed_roles)}"
             )
         return current_user
-    return role_checker
\ No newline at end of file
+    return role_checker
@@ -0,0 +1,101 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+# src/utils/metricas.py
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Limites (em segundos) dos buckets do histograma de latência das consultas
+BUCKETS_SEGUNDOS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricasConsultas:
+    """
+    Agregados por rótulo de comando SQL (ex.: 'VendaService._gravar_venda'), thread-safe e em memória:
+    histograma de latência, nº de execuções, linhas afetadas/retornadas e erros.
+    Valores são do processo (cada worker da API tem os seus), como é usual para o Prometheus.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS_SEGUNDOS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._por_rotulo: Dict[str, Dict[str, Any]] = {}
+
+    def registrar(self, rotulo: str, duracao_s: float, linhas: int, erro: bool) -> None:
+        with self._lock:
+            m = self._por_rotulo.get(rotulo)
+            if m is None:
+                m = {"contagens": [0] * (len(self.buckets) + 1), "soma": 0.0, "total": 0, "linhas": 0, "erros": 0}
+                self._por_rotulo[rotulo] = m
+            m["contagens"][bisect_left(self.buckets, duracao_s)] += 1
+            m["soma"] += duracao_s
+            m["total"] += 1
+            m["linhas"] += max(linhas, 0)
+            m["erros"] += int(erro)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Cópia dos agregados: {rotulo: {total, erros, linhas, soma, contagens}}."""
+        with self._lock:
+            return {r: {**m, "contagens": list(m["contagens"])} for r, m in self._por_rotulo.items()}
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._por_rotulo.clear()
+
+    def exportar_prometheus(self) -> List[str]:
+        """Linhas no formato texto do Prometheus (histograma cumulativo + contadores)."""
+        dados = self.snapshot()
+        linhas = [
+            "# HELP unython_db_query_duration_seconds Latência dos comandos SQL por rótulo.",
+            "# TYPE unython_db_query_duration_seconds histogram",
+        ]
+        for rotulo, m in sorted(dados.items()):
+            rot = _escapar(rotulo)
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, m["contagens"]):
+                acumulado += contagem
+                linhas.append(f'unython_db_query_duration_seconds_bucket{{statement="{rot}",le="{limite}"}} {acumulado}')
+            linhas.append(f'unython_db_query_duration_seconds_bucket{{statement="{rot}",le="+Inf"}} {m["total"]}')
+            linhas.append(f'unython_db_query_duration_seconds_sum{{statement="{rot}"}} {m["soma"]:.6f}')
+            linhas.append(f'unython_db_query_duration_seconds_count{{statement="{rot}"}} {m["total"]}')
+
+        linhas += _contadores(
+            "unython_db_query_rows_total", "Linhas retornadas/afetadas pelos comandos SQL por rótulo.",
+            ((r, m["linhas"]) for r, m in sorted(dados.items())),
+        )
+        linhas += _contadores(
+            "unython_db_query_errors_total", "Comandos SQL que falharam, por rótulo.",
+            ((r, m["erros"]) for r, m in sorted(dados.items())),
+        )
+        return linhas
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _contadores(nome: str, ajuda: str, valores: Iterable[Tuple[str, int]]) -> List[str]:
+    linhas = [f"# HELP {nome} {ajuda}", f"# TYPE {nome} counter"]
+    linhas += [f'{nome}{{statement="{_escapar(r)}"}} {v}' for r, v in valores]
+    return linhas
+
+
+def exportar_valores(prefixo: str, valores: Dict[str, Any], contadores: Iterable[str] = ()) -> List[str]:
+    """Métricas simples sem rótulo (ex.: estatísticas do pool): gauge, ou counter para as chaves em `contadores`."""
+    contadores = set(contadores)
+    linhas = []
+    for chave, valor in sorted(valores.items()):
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            continue
+        if chave in contadores:
+            nome, tipo = f"{prefixo}_{chave}_total", "counter"
+        else:
+            nome, tipo = f"{prefixo}_{chave}", "gauge"
+        linhas += [f"# TYPE {nome} {tipo}", f"{nome} {valor}"]
+    return linhas
+
+
+# Instância do processo, alimentada pelo DatabaseManager
+METRICAS_SQL = MetricasConsultas()
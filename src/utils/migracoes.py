@@ -0,0 +1,471 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+# src/utils/migracoes.py
+"""
+Migrações versionadas do esquema PostgreSQL.
+
+Cada migração roda uma única vez, em transação própria, e é registrada em `schema_migrations`.
+A aplicação é serializada por um advisory lock: vários workers subindo juntos não aplicam a mesma
+migração duas vezes, e quem chega depois só confirma a versão. Com o banco em dia, o boot faz
+apenas a leitura de schema_migrations (nenhum DDL, nenhum lock de tabela).
+
+Para alterar o esquema, acrescente uma Migracao no fim de MIGRACOES (nunca edite uma já publicada,
+nem a descrição: o banco guarda a descrição do momento em que a aplicou). Uma migração por assunto,
+com a descrição dizendo tudo o que ela muda.
+Os comandos são idempotentes (IF NOT EXISTS / ON CONFLICT) para que bancos criados antes deste
+controle, pelo antigo create_tables, possam ser adotados sem erro.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+# Chave do pg_advisory_lock das migrações (constante arbitrária, única para o Unython)
+CHAVE_LOCK_MIGRACOES = 7_214_530_021
+
+
+@dataclass(frozen=True)
+class Migracao:
+    versao: int
+    descricao: str
+    sql: str
+
+
+MIGRACOES: List[Migracao] = [
+    Migracao(
+        1,
+        "Esquema inicial (cadastros, catálogo, estoque, caixas e vendas)",
+        """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(255) NOT NULL,
+            email VARCHAR(255) UNIQUE,
+            funcao VARCHAR(100),
+            require_password_change BOOLEAN DEFAULT FALSE,
+            role VARCHAR(50) DEFAULT 'Vendedor',
+            status VARCHAR(50) DEFAULT 'Ativo',
+            hashed_password VARCHAR(128)
+        );
+
+        CREATE TABLE IF NOT EXISTS pessoas (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(255) NOT NULL,
+            telefone VARCHAR(50),
+            data_cadastro DATE NOT NULL DEFAULT NOW()
+        );
+
+        CREATE TABLE IF NOT EXISTS eventos (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(255) NOT NULL,
+            data_evento DATE NOT NULL,
+            tipo VARCHAR(100),
+            status VARCHAR(50) DEFAULT 'Aberto'
+        );
+
+        CREATE TABLE IF NOT EXISTS agendamentos (
+            id SERIAL PRIMARY KEY,
+            id_pessoa INTEGER NOT NULL,
+            id_facilitador INTEGER,
+            data_hora TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            tipo_servico VARCHAR(100),
+            status VARCHAR(50) DEFAULT 'Agendado',
+            id_evento INTEGER NOT NULL,
+            compareceu VARCHAR(50) DEFAULT 'Pendente',
+            FOREIGN KEY (id_pessoa) REFERENCES pessoas(id),
+            FOREIGN KEY (id_facilitador) REFERENCES usuarios(id),
+            FOREIGN KEY (id_evento) REFERENCES eventos(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS categorias (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(100) NOT NULL UNIQUE,
+            descricao TEXT,
+            status VARCHAR(50) DEFAULT 'Ativo'
+        );
+
+        CREATE TABLE IF NOT EXISTS itens (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(255) NOT NULL UNIQUE,
+            valor_compra NUMERIC(10, 2) NOT NULL,
+            valor_venda NUMERIC(10, 2) NOT NULL,
+            status VARCHAR(50) DEFAULT 'Ativo',
+            id_categoria INTEGER,
+            FOREIGN KEY (id_categoria) REFERENCES categorias(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS estoque (
+            id SERIAL PRIMARY KEY,
+            id_item INTEGER NOT NULL,
+            quantidade INTEGER NOT NULL,
+            tipo_movimento VARCHAR(50) NOT NULL,
+            data_movimento DATE NOT NULL DEFAULT NOW(),
+            origem_recurso VARCHAR(100) DEFAULT 'Doacao',
+            id_usuario INTEGER,
+            id_evento INTEGER,
+            FOREIGN KEY (id_item) REFERENCES itens(id),
+            FOREIGN KEY (id_usuario) REFERENCES usuarios(id),
+            FOREIGN KEY (id_evento) REFERENCES eventos(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS caixas (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(100) UNIQUE NOT NULL,
+            descricao VARCHAR(255),
+            status VARCHAR(50) DEFAULT 'Ativo'
+        );
+
+        CREATE TABLE IF NOT EXISTS movimentos_caixa (
+            id SERIAL PRIMARY KEY,
+            id_caixa INT NOT NULL,
+            id_usuario_abertura INT NOT NULL,
+            id_evento INT,
+            valor_abertura NUMERIC(10, 2) NOT NULL DEFAULT 0.00,
+            status VARCHAR(50) NOT NULL DEFAULT 'Aberto',
+            data_abertura TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            data_fechamento TIMESTAMP WITHOUT TIME ZONE,
+            FOREIGN KEY (id_caixa) REFERENCES caixas(id),
+            FOREIGN KEY (id_usuario_abertura) REFERENCES usuarios(id),
+            FOREIGN KEY (id_evento) REFERENCES eventos(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS vendas (
+            id SERIAL PRIMARY KEY,
+            id_pessoa INTEGER,
+            data_venda DATE NOT NULL DEFAULT NOW(),
+            id_evento INTEGER NOT NULL,
+            responsavel VARCHAR(255),
+            id_movimento_caixa INTEGER NOT NULL,
+            FOREIGN KEY (id_pessoa) REFERENCES usuarios(id),
+            FOREIGN KEY (id_evento) REFERENCES eventos(id),
+            FOREIGN KEY (id_movimento_caixa) REFERENCES movimentos_caixa(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS itens_venda (
+            id SERIAL PRIMARY KEY,
+            id_venda INTEGER NOT NULL,
+            id_item INTEGER NOT NULL,
+            quantidade INTEGER NOT NULL,
+            valor_unitario NUMERIC(10, 2) NOT NULL,
+            FOREIGN KEY (id_venda) REFERENCES vendas(id),
+            FOREIGN KEY (id_item) REFERENCES itens(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS movimentos_financeiros (
+            id SERIAL PRIMARY KEY,
+            data_registro TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+            id_usuario INTEGER NOT NULL,
+            tipo_movimento VARCHAR(50) NOT NULL CHECK(tipo_movimento IN ('Receita', 'Despesa')),
+            valor NUMERIC(10, 2) NOT NULL,
+            descricao TEXT,
+            categoria VARCHAR(100),
+            id_evento INTEGER,
+            status VARCHAR(50) NOT NULL DEFAULT 'Ativo',
+            FOREIGN KEY (id_usuario) REFERENCES usuarios(id),
+            FOREIGN KEY (id_evento) REFERENCES eventos(id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_mov_caixa_caixa_id ON movimentos_caixa (id_caixa);
+        CREATE INDEX IF NOT EXISTS idx_mov_caixa_status ON movimentos_caixa (status);
+
+        -- Bancos antigos: colunas e FKs que entraram depois da primeira versão das tabelas
+        ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS require_password_change BOOLEAN DEFAULT FALSE;
+        ALTER TABLE movimentos_caixa ADD COLUMN IF NOT EXISTS id_evento INT NULL;
+
+        -- vendas.id_pessoa passou a referenciar usuarios.id (em bancos antigos apontava para pessoas)
+        ALTER TABLE vendas DROP CONSTRAINT IF EXISTS vendas_id_pessoa_fkey;
+        ALTER TABLE vendas ADD CONSTRAINT vendas_id_pessoa_fkey FOREIGN KEY (id_pessoa) REFERENCES usuarios(id);
+
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conname = 'fk_movimento_evento'
+            ) THEN
+                ALTER TABLE movimentos_caixa
+                    ADD CONSTRAINT fk_movimento_evento
+                    FOREIGN KEY (id_evento) REFERENCES eventos(id);
+            END IF;
+        END$$;
+        """,
+    ),
+    Migracao(
+        2,
+        "Projeção saldo_estoque",
+        """
+        CREATE TABLE IF NOT EXISTS saldo_estoque (
+            id_item INTEGER PRIMARY KEY,
+            saldo INTEGER NOT NULL DEFAULT 0,
+            atualizado_em TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+            FOREIGN KEY (id_item) REFERENCES itens(id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_estoque_item ON estoque (id_item);
+
+        -- Popula itens que ainda não têm saldo materializado
+        INSERT INTO saldo_estoque (id_item, saldo)
+        SELECT id_item, SUM(CASE WHEN tipo_movimento = 'Entrada' THEN quantidade ELSE -quantidade END)
+        FROM estoque
+        GROUP BY id_item
+        ON CONFLICT (id_item) DO NOTHING;
+        """,
+    ),
+    Migracao(
+        3,
+        "Idempotency-Key de POST /vendas",
+        """
+        CREATE TABLE IF NOT EXISTS idempotencia_vendas (
+            chave VARCHAR(255) PRIMARY KEY,
+            hash_requisicao VARCHAR(64) NOT NULL,
+            id_venda INTEGER NOT NULL,
+            criado_em TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+            expira_em TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            FOREIGN KEY (id_venda) REFERENCES vendas(id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_idempotencia_vendas_expira ON idempotencia_vendas (expira_em);
+        """,
+    ),
+    # v4 já publicada (não editar, nem a descrição): além dos índices (filtro, id) da paginação por
+    # cursor, cria os totais do cabeçalho (valor_total, custo_total, qtd_itens), vendas.status e
+    # itens_venda.custo_unitario, que a v5 já lê. Por isso não pode ser dividida em versões posteriores.
+    Migracao(
+        4,
+        "Paginação por cursor e totais desnormalizados de vendas",
+        """
+        CREATE INDEX IF NOT EXISTS idx_vendas_evento_id ON vendas (id_evento, id);
+        CREATE INDEX IF NOT EXISTS idx_vendas_mov_caixa_id ON vendas (id_movimento_caixa, id);
+        CREATE INDEX IF NOT EXISTS idx_vendas_data_id ON vendas (data_venda, id);
+        CREATE INDEX IF NOT EXISTS idx_vendas_responsavel_id ON vendas (responsavel, id);
+
+        -- Totais desnormalizados da venda (valor, custo e nº de unidades no cabeçalho)
+        ALTER TABLE vendas ADD COLUMN IF NOT EXISTS valor_total NUMERIC(12, 2) NOT NULL DEFAULT 0;
+        ALTER TABLE vendas ADD COLUMN IF NOT EXISTS custo_total NUMERIC(12, 2) NOT NULL DEFAULT 0;
+        ALTER TABLE vendas ADD COLUMN IF NOT EXISTS qtd_itens INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE vendas ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'Ativa';
+        ALTER TABLE itens_venda ADD COLUMN IF NOT EXISTS custo_unitario NUMERIC(10, 2);
+
+        -- O custo histórico não foi guardado; usa o valor_compra atual do catálogo.
+        UPDATE itens_venda iv SET custo_unitario = i.valor_compra
+        FROM itens i WHERE i.id = iv.id_item AND iv.custo_unitario IS NULL;
+
+        -- Backfill: toda venda tem ao menos uma unidade, então qtd_itens = 0 marca cabeçalho não preenchido.
+        UPDATE vendas v
+        SET valor_total = t.valor_total, custo_total = t.custo_total, qtd_itens = t.qtd_itens
+        FROM (
+            SELECT iv.id_venda,
+                   SUM(iv.quantidade * iv.valor_unitario) AS valor_total,
+                   SUM(iv.quantidade * i.valor_compra) AS custo_total,
+                   SUM(iv.quantidade) AS qtd_itens
+            FROM itens_venda iv
+            JOIN itens i ON i.id = iv.id_item
+            GROUP BY iv.id_venda
+        ) t
+        WHERE v.id = t.id_venda AND v.qtd_itens = 0;
+        """,
+    ),
+    Migracao(
+        5,
+        "Rollup vendas_diarias",
+        """
+        CREATE TABLE IF NOT EXISTS vendas_diarias (
+            dia DATE NOT NULL,
+            id_evento INTEGER NOT NULL,
+            id_caixa INTEGER NOT NULL,
+            id_item INTEGER NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            valor_total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+            custo_total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, id_evento, id_caixa, id_item),
+            FOREIGN KEY (id_evento) REFERENCES eventos(id),
+            FOREIGN KEY (id_caixa) REFERENCES caixas(id),
+            FOREIGN KEY (id_item) REFERENCES itens(id)
+        );
+
+        -- Popula as chaves que ainda não existem (vendas ativas)
+        INSERT INTO vendas_diarias (dia, id_evento, id_caixa, id_item, quantidade, valor_total, custo_total)
+        SELECT v.data_venda, v.id_evento, mc.id_caixa, iv.id_item,
+               SUM(iv.quantidade), SUM(iv.quantidade * iv.valor_unitario), SUM(iv.quantidade * iv.custo_unitario)
+        FROM vendas v
+        JOIN movimentos_caixa mc ON mc.id = v.id_movimento_caixa
+        JOIN itens_venda iv ON iv.id_venda = v.id
+        WHERE v.status = 'Ativa'
+        GROUP BY v.data_venda, v.id_evento, mc.id_caixa, iv.id_item
+        ON CONFLICT (dia, id_evento, id_caixa, id_item) DO NOTHING;
+        """,
+    ),
+    Migracao(
+        6,
+        "Versão do catálogo (ETag de /catalogo/grupos)",
+        """
+        -- Contadores de versão por conjunto de dados (ex.: 'catalogo'), usados como ETag pela API
+        CREATE TABLE IF NOT EXISTS versoes (
+            nome VARCHAR(50) PRIMARY KEY,
+            versao BIGINT NOT NULL DEFAULT 0,
+            atualizado_em TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
+        );
+
+        -- Qualquer escrita em itens/categorias (inclusive TRUNCATE e importações por outros
+        -- processos) incrementa 'catalogo' na mesma transação da alteração.
+        CREATE OR REPLACE FUNCTION incrementar_versao_catalogo() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO versoes (nome, versao) VALUES ('catalogo', 1)
+            ON CONFLICT (nome) DO UPDATE SET versao = versoes.versao + 1, atualizado_em = NOW();
+            RETURN NULL;
+        END$$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_versao_catalogo ON itens;
+        CREATE TRIGGER trg_versao_catalogo AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON itens
+            FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_catalogo();
+        DROP TRIGGER IF EXISTS trg_versao_catalogo ON categorias;
+        CREATE TRIGGER trg_versao_catalogo AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON categorias
+            FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_catalogo();
+        """,
+    ),
+    Migracao(
+        7,
+        "Índices das consultas frequentes (inclusive parciais por status)",
+        """
+        -- Linhas de venda: cancelamento/rollup (por venda) e checagem antes de excluir item (por item)
+        CREATE INDEX IF NOT EXISTS idx_itens_venda_venda ON itens_venda (id_venda);
+        CREATE INDEX IF NOT EXISTS idx_itens_venda_item ON itens_venda (id_item);
+
+        -- buscar_agendamentos(status=...) ORDER BY data_hora e relatório de pendentes
+        CREATE INDEX IF NOT EXISTS idx_agendamentos_status_data ON agendamentos (status, data_hora);
+
+        -- Saldo/despesas do fluxo de caixa: só lançamentos ativos; INCLUDE permite index-only scan
+        CREATE INDEX IF NOT EXISTS idx_mov_fin_tipo_ativos ON movimentos_financeiros (tipo_movimento, categoria)
+            INCLUDE (valor) WHERE status = 'Ativo';
+        CREATE INDEX IF NOT EXISTS idx_mov_fin_data_ativos ON movimentos_financeiros (data_registro)
+            WHERE status = 'Ativo';
+
+        -- Parciais para os poucos registros "abertos"/"ativos" que o PDV consulta a cada tela
+        CREATE INDEX IF NOT EXISTS idx_eventos_abertos ON eventos (data_evento) WHERE status = 'Aberto';
+        CREATE INDEX IF NOT EXISTS idx_mov_caixa_abertos ON movimentos_caixa (id_caixa, data_abertura)
+            WHERE status = 'Aberto';
+        CREATE INDEX IF NOT EXISTS idx_caixas_ativos ON caixas (nome) WHERE status = 'Ativo';
+        CREATE INDEX IF NOT EXISTS idx_itens_categoria_ativos ON itens (id_categoria, nome) WHERE status = 'Ativo';
+
+        -- Substituído pelo parcial idx_mov_caixa_abertos (status sozinho é pouco seletivo)
+        DROP INDEX IF EXISTS idx_mov_caixa_status;
+        """,
+    ),
+    Migracao(
+        8,
+        "Versão dos tokens por usuário (revogação entre processos)",
+        """
+        -- Incrementada a cada troca de role/senha/status; tokens com versão anterior são recusados
+        ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
+        """,
+    ),
+    Migracao(
+        9,
+        "Versão 'dados' das tabelas lidas pelos relatórios (cache de relatórios entre processos)",
+        """
+        INSERT INTO versoes (nome, versao) VALUES ('dados', 0) ON CONFLICT (nome) DO NOTHING;
+
+        -- Incrementa 'dados' uma vez por transação, no commit (trigger adiada): o lock na linha de
+        -- versoes dura só o fim do commit e a nova versão fica visível junto com os dados.
+        CREATE OR REPLACE FUNCTION incrementar_versao_dados() RETURNS trigger AS $$
+        BEGIN
+            IF current_setting('unython.versao_dados_incrementada', true) IS DISTINCT FROM 'sim' THEN
+                PERFORM set_config('unython.versao_dados_incrementada', 'sim', true);
+                INSERT INTO versoes (nome, versao) VALUES ('dados', 1)
+                ON CONFLICT (nome) DO UPDATE SET versao = versoes.versao + 1, atualizado_em = NOW();
+            END IF;
+            RETURN NULL;
+        END$$ LANGUAGE plpgsql;
+
+        DO $$
+        DECLARE
+            tabela TEXT;
+        BEGIN
+            FOREACH tabela IN ARRAY ARRAY['vendas_diarias', 'saldo_estoque', 'movimentos_financeiros', 'itens'] LOOP
+                EXECUTE format('DROP TRIGGER IF EXISTS trg_versao_dados ON %I', tabela);
+                EXECUTE format(
+                    'CREATE CONSTRAINT TRIGGER trg_versao_dados AFTER INSERT OR UPDATE OR DELETE ON %I '
+                    'DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_versao_dados()',
+                    tabela
+                );
+                EXECUTE format('DROP TRIGGER IF EXISTS trg_versao_dados_truncate ON %I', tabela);
+                EXECUTE format(
+                    'CREATE TRIGGER trg_versao_dados_truncate AFTER TRUNCATE ON %I '
+                    'FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_dados()',
+                    tabela
+                );
+            END LOOP;
+        END$$;
+        """,
+    ),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1].versao
+
+_TABELA_MIGRACOES_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    versao INTEGER PRIMARY KEY,
+    descricao VARCHAR(255) NOT NULL,
+    aplicada_em TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
+)
+"""
+
+
+def _executar(db, query: str, params: Any = None, **kwargs: Any) -> Any:
+    """execute_query que levanta exceção em erro SQL: migração com falha interrompe o boot."""
+    result = db.execute_query(query, params, **kwargs)
+    if result is False:
+        raise RuntimeError(f"Falha ao executar '{kwargs.get('rotulo')}'. Veja o erro SQL acima.")
+    return result
+
+
+def migracoes_aplicadas(db) -> Dict[int, Dict[str, Any]]:
+    """{versao: {descricao, aplicada_em}} do que já está registrado (vazio se a tabela não existe)."""
+    _, (existe,) = _executar(
+        db, "SELECT to_regclass('schema_migrations') IS NOT NULL", fetch_one=True, rotulo="migracoes.verificar_tabela"
+    )
+    if not existe:
+        return {}
+    _, rows = _executar(
+        db,
+        "SELECT versao, descricao, aplicada_em FROM schema_migrations ORDER BY versao",
+        fetch_all=True,
+        rotulo="migracoes.listar",
+    )
+    return {versao: {"descricao": descricao, "aplicada_em": aplicada_em} for versao, descricao, aplicada_em in rows}
+
+
+def migracoes_pendentes(db) -> List[Migracao]:
+    aplicadas = migracoes_aplicadas(db)
+    return [m for m in MIGRACOES if m.versao not in aplicadas]
+
+
+def aplicar_migracoes(db) -> List[int]:
+    """
+    Aplica as migrações pendentes, em ordem, e retorna as versões aplicadas por este processo.
+    Caminho rápido: se nada estiver pendente, não há lock nem DDL. Caso contrário, a lista é
+    relida sob o advisory lock (outro worker pode ter acabado de aplicar) e cada migração roda
+    em transação própria junto com o seu registro em schema_migrations.
+    """
+    if not migracoes_pendentes(db):
+        db.conn.commit()  # encerra a transação de leitura (não segura locks até a próxima query)
+        return []
+
+    _executar(db, "SELECT pg_advisory_lock(%s)", (CHAVE_LOCK_MIGRACOES,), fetch_one=True, rotulo="migracoes.lock")
+    aplicadas: List[int] = []
+    try:
+        _executar(db, _TABELA_MIGRACOES_SQL, commit=True, rotulo="migracoes.criar_tabela")
+        for migracao in migracoes_pendentes(db):
+            rotulo = f"migracoes.aplicar_v{migracao.versao:03d}"
+            _executar(db, migracao.sql, rotulo=rotulo)
+            _executar(
+                db,
+                "INSERT INTO schema_migrations (versao, descricao) VALUES (%s, %s)",
+                (migracao.versao, migracao.descricao),
+                commit=True,
+                rotulo="migracoes.registrar",
+            )
+            aplicadas.append(migracao.versao)
+            print(f"[migracoes] v{migracao.versao:03d} aplicada: {migracao.descricao}")
+    finally:
+        db.conn.rollback()  # sem efeito se tudo foi confirmado; desfaz a migração que falhou
+        db.execute_query(
+            "SELECT pg_advisory_unlock(%s)", (CHAVE_LOCK_MIGRACOES,), fetch_one=True, rotulo="migracoes.unlock"
+        )
+        db.conn.commit()
+    return aplicadas
@@ -27,6 +27,15 @@ class Usuario:
     role: str = "Vendedor"
     status: str = "Ativo"
     id: Optional[int] = None
+    token_version: int = 0
+
+
+@dataclass
+class UsuarioToken:
+    # Identidade contida no token de acesso assinado (revogação checada via token_version do usuário)
+    id: int
+    role: str
+    nome: str = ""
 
 
 @dataclass
@@ -90,6 +99,7 @@ class ItemVenda:
     quantidade: int
     valor_unitario: Decimal  # Preço no momento da venda
     id: Optional[int] = None
+    custo_unitario: Optional[Decimal] = None  # valor_compra no momento da venda
 
 
 @dataclass
@@ -100,6 +110,11 @@ class Venda:
     id_movimento_caixa: int  # Campo obrigatório
     data_venda: date = field(default_factory=lambda: datetime.now().date())
     id: Optional[int] = None
+    # Totais desnormalizados, preenchidos por VendaService ao gravar a venda
+    valor_total: Decimal = Decimal("0.00")
+    custo_total: Decimal = Decimal("0.00")
+    qtd_itens: int = 0
+    status: str = "Ativa"  # Ativa | Cancelada
 
 
 @dataclass
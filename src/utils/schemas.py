@@ -35,6 +35,16 @@ class VendaCreate(BaseModel):
         populate_by_name = True
 
 
+class VendaLoteItem(VendaCreate):
+    """Venda enfileirada offline no PDV; a chave é a mesma gerada no checkout original."""
+    idempotency_key: str = Field(..., min_length=1, max_length=255, alias="idempotencyKey")
+
+
+class VendaLoteRequest(BaseModel):
+    """Lote de vendas para sincronização (POST /vendas/lote)."""
+    vendas: List[VendaLoteItem] = Field(..., min_length=1, max_length=500)
+
+
 class AgendamentoUpdateStatus(BaseModel):
     compareceu: Literal['Sim', 'Nao']
 
@@ -52,6 +62,7 @@ class VendaResponse(BaseModel):
     id_pessoa: Optional[int] = Field(None, alias="pessoaId")
     responsavel: str
     id_evento: int = Field(..., alias="eventoId")
+    id_movimento_caixa: Optional[int] = Field(None, alias="movimentoCaixaId")
     data_venda: date
 
     class Config:
@@ -59,6 +70,12 @@ class VendaResponse(BaseModel):
         populate_by_name = True
 
 
+class VendaPaginaResponse(BaseModel):
+    """Página de GET /vendas/. Passe `proximo_cursor` como `cursor` para a página seguinte."""
+    itens: List[VendaResponse]
+    proximo_cursor: Optional[int] = None
+
+
 class InventarioResponse(BaseModel):
     nome: str
     saldo_atual: int
@@ -1,7 +1,21 @@
 # src/utils/security.py
 
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
-from typing import Optional
+from typing import Any, Dict, Optional
+
+import toml
+
+from src.utils.database_manager import SECRETS_PATH
 
 # Define o algoritmo de hashing (bcrypt é o padrão moderno e seguro)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -35,4 +49,118 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return pwd_context.verify(plain_password, hashed_password)
     except ValueError:
         # Retorna False se o hash for inválido (ex: hash antigo ou corrompido)
-        return False
\ No newline at end of file
+        return False
+
+
+# --- HASHING FORA DO EVENT LOOP ---
+# bcrypt leva dezenas de ms por chamada e libera o GIL: rodar em threads dedicadas mantém o
+# event loop livre. O pool é limitado para que uma rajada de logins não ocupe todas as CPUs
+# nem o threadpool padrão do FastAPI (usado pelos endpoints síncronos).
+HASH_WORKERS = int(os.environ.get("UNYTHON_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password executado no pool de hashing (para uso em endpoints async)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password executado no pool de hashing (para uso em endpoints async)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+
+# --- TOKENS DE ACESSO ASSINADOS (JWT HS256) ---
+# O token carrega id, nome, role e a versão de token do usuário (usuarios.token_version) e expira sozinho.
+# Revogação: trocar role/senha/status incrementa token_version no banco; get_token_principal compara
+# a versão do token com a do usuário (via cache de usuários), em qualquer processo da API.
+# Configuração opcional no secrets.toml, seção [auth]: secret_key e token_ttl_minutes.
+
+def _load_auth_config() -> Dict[str, Any]:
+    try:
+        return toml.load(SECRETS_PATH).get("auth", {})
+    except Exception:
+        return {}
+
+
+AUTH_CONFIG = _load_auth_config()
+TOKEN_TTL_SECONDS = int(float(AUTH_CONFIG.get("token_ttl_minutes", 480)) * 60)
+SECRET_KEY_MIN_BYTES = 32
+SECRET_KEYS_DE_EXEMPLO = {"change_me"}
+
+logger_seguranca = logging.getLogger("unython.seguranca")
+
+
+def _chave_assinatura(configurada: Optional[str]) -> bytes:
+    """
+    Chave HMAC dos tokens. Uma chave ausente, de exemplo ou curta demais daria para adivinhar
+    (e forjar tokens): nesse caso usa uma chave aleatória do processo, com aviso. Os tokens
+    então somem ao reiniciar e não valem entre workers.
+    """
+    chave = str(configurada or "").encode("utf-8")
+    if chave.decode("utf-8") in SECRET_KEYS_DE_EXEMPLO or len(chave) < SECRET_KEY_MIN_BYTES:
+        logger_seguranca.warning(
+            "[auth] secret_key ausente, de exemplo ou com menos de %d bytes no secrets.toml; "
+            "usando chave temporária do processo (tokens não valem entre workers nem após reiniciar).",
+            SECRET_KEY_MIN_BYTES,
+        )
+        return secrets.token_bytes(SECRET_KEY_MIN_BYTES)
+    return chave
+
+
+_SECRET_KEY = _chave_assinatura(AUTH_CONFIG.get("secret_key"))
+
+
+def _b64url(dados: bytes) -> str:
+    return base64.urlsafe_b64encode(dados).rstrip(b"=").decode("ascii")
+
+
+def _b64url_decode(texto: str) -> bytes:
+    return base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def _assinar(mensagem: bytes) -> str:
+    return _b64url(hmac.new(_SECRET_KEY, mensagem, hashlib.sha256).digest())
+
+
+def criar_token_acesso(
+    user_id: int, role: str, nome: str, ttl_segundos: Optional[int] = None, versao: int = 0
+) -> str:
+    """Emite um JWT HS256 com sub (id), role, nome, ver (token_version do usuário), iat e exp."""
+    agora = int(time.time())
+    cabecalho = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode("utf-8"))
+    claims = {
+        "sub": str(user_id),
+        "role": role,
+        "nome": nome,
+        "ver": versao,
+        "iat": agora,
+        "exp": agora + (ttl_segundos if ttl_segundos is not None else TOKEN_TTL_SECONDS),
+    }
+    corpo = _b64url(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    assinatura = _assinar(f"{cabecalho}.{corpo}".encode("ascii"))
+    return f"{cabecalho}.{corpo}.{assinatura}"
+
+
+def decodificar_token_acesso(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Valida assinatura e expiração. Retorna as claims (sub e ver como int) ou None.
+    A revogação (ver diferente de usuarios.token_version) é checada por get_token_principal.
+    """
+    try:
+        cabecalho, corpo, assinatura = token.split(".")
+        if not hmac.compare_digest(assinatura, _assinar(f"{cabecalho}.{corpo}".encode("ascii"))):
+            return None
+        if json.loads(_b64url_decode(cabecalho)).get("alg") != "HS256":
+            return None
+        claims = json.loads(_b64url_decode(corpo))
+        claims["sub"] = int(claims["sub"])
+        claims["ver"] = int(claims.get("ver", -1))
+        if int(claims["exp"]) <= time.time():
+            return None
+        return claims
+    except Exception:
+        return None
+
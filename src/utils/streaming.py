@@ -0,0 +1,162 @@
+# Unython - (C) 2025 siegrfried@gmail.com
+# Este programa e software livre: voce pode redistribui-lo e/ou modifica-lo
+# sob os termos da GNU General Public License como publicada pela Free Software Foundation,
+# na versao 3 da Licenca, ou (a seu criterio) qualquer versao posterior.
+# src/utils/streaming.py
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+# Tamanho aproximado de cada pedaço enviado ao cliente (evita um write por linha)
+TAMANHO_BLOCO = 64 * 1024
+
+
+def _padrao_json(valor: Any) -> Any:
+    """Tipos que o json não serializa: mesmo resultado do jsonable_encoder, sem percorrer o objeto todo."""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return jsonable_encoder(valor)
+
+
+def _json(obj: Any) -> str:
+    return json.dumps(obj, default=_padrao_json, ensure_ascii=False, separators=(",", ":"))
+
+
+def agrupar_blocos(pedacos: Iterable[str], tamanho: int = TAMANHO_BLOCO) -> Iterator[bytes]:
+    """Junta textos pequenos em blocos de ~`tamanho` bytes (UTF-8) para o corpo da resposta."""
+    buffer, acumulado = [], 0
+    for pedaco in pedacos:
+        buffer.append(pedaco)
+        acumulado += len(pedaco)
+        if acumulado >= tamanho:
+            yield "".join(buffer).encode("utf-8")
+            buffer, acumulado = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def json_array_em_fluxo(linhas: Iterable[Any]) -> Iterator[bytes]:
+    """Corpo de uma lista JSON gerado linha a linha (dataclasses, dicts, datas e Decimal via jsonable_encoder)."""
+
+    def pedacos() -> Iterator[str]:
+        yield "["
+        for i, linha in enumerate(linhas):
+            yield ("," if i else "") + _json(linha)
+        yield "]"
+
+    return agrupar_blocos(pedacos())
+
+
+def ndjson_em_fluxo(linhas: Iterable[Any]) -> Iterator[bytes]:
+    """NDJSON: um objeto JSON por linha."""
+    return agrupar_blocos(_json(linha) + "\n" for linha in linhas)
+
+
+def csv_em_fluxo(colunas: Sequence[str], linhas: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """CSV (separador vírgula, ponto decimal, datas ISO) com cabeçalho, gerado linha a linha."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    def pedacos() -> Iterator[str]:
+        for valores in _com_cabecalho(colunas, linhas):
+            writer.writerow(valores)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    return agrupar_blocos(pedacos())
+
+
+def _com_cabecalho(colunas: Sequence[str], linhas: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    yield list(colunas)
+    for linha in linhas:
+        yield [_valor_csv(linha.get(c)) for c in colunas]
+
+
+def _valor_csv(valor: Any) -> Any:
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return "" if valor is None else valor
+
+
+class _ColetorBytes:
+    """Arquivo de escrita em memória que é esvaziado a cada bloco enviado (destino do ParquetWriter)."""
+
+    closed = False
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicao = 0
+
+    def write(self, dados) -> int:
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def parquet_em_fluxo(
+    colunas: Sequence[Tuple[str, str]], linhas: Iterable[Dict[str, Any]], linhas_por_grupo: int = 10_000
+) -> Iterator[bytes]:
+    """
+    Parquet escrito em row groups de `linhas_por_grupo` linhas; cada grupo é enviado assim que
+    fica pronto, então a memória é limitada ao grupo corrente. `colunas` = [(nome, tipo)], com
+    tipo em 'int', 'texto', 'data', 'timestamp', 'decimal'. Requer o pacote opcional pyarrow
+    (ValueError se ausente, antes de qualquer byte ser gerado).
+    """
+    try:
+        import pyarrow as pa  # dependência opcional, só para Parquet
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Exportação em Parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+
+    tipos = {
+        "int": pa.int64(),
+        "texto": pa.string(),
+        "data": pa.date32(),
+        "timestamp": pa.timestamp("us"),
+        "decimal": pa.decimal128(14, 2),
+    }
+    schema = pa.schema([(nome, tipos[tipo]) for nome, tipo in colunas])
+    nomes = [nome for nome, _ in colunas]
+
+    def blocos() -> Iterator[bytes]:
+        destino = _ColetorBytes()
+        with pq.ParquetWriter(destino, schema, compression="snappy") as writer:
+            grupo: Dict[str, List[Any]] = {nome: [] for nome in nomes}
+            tamanho = 0
+            for linha in linhas:
+                for nome in nomes:
+                    grupo[nome].append(linha.get(nome))
+                tamanho += 1
+                if tamanho >= linhas_por_grupo:
+                    writer.write_table(pa.table(grupo, schema=schema))
+                    grupo = {nome: [] for nome in nomes}
+                    tamanho = 0
+                    yield destino.drenar()
+            if tamanho:
+                writer.write_table(pa.table(grupo, schema=schema))
+        yield destino.drenar()
+
+    return blocos()
@@ -34,9 +34,12 @@ def cleanup_db(db_manager):
     cursor.execute(
         """
         TRUNCATE TABLE
+            idempotencia_vendas,
             itens_venda,
             vendas,
             estoque,
+            saldo_estoque,
+            vendas_diarias,
             movimentos_financeiros,
             agendamentos,
             eventos,
@@ -54,9 +57,12 @@ def cleanup_db(db_manager):
     cursor.execute(
         """
         TRUNCATE TABLE
+            idempotencia_vendas,
             itens_venda,
             vendas,
             estoque,
+            saldo_estoque,
+            vendas_diarias,
             movimentos_financeiros,
             agendamentos,
             eventos,
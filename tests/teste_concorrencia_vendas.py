@@ -0,0 +1,186 @@
+import threading
+from decimal import Decimal
+
+import pytest
+
+from src.modules.caixas import CaixaService
+from src.modules.estoque import EstoqueService
+from src.modules.evento import EventoService
+from src.modules.item import ItemService
+from src.modules.usuario import UsuarioService
+from src.modules.venda import LoteVendasIndisponivelError, VendaLote, VendaService
+from src.utils.database_manager import DatabaseManager
+from src.utils.models import Caixa, Evento, Item, ItemVenda, Usuario, UsuarioToken, Venda
+from src.utils.schemas import VendaLoteRequest
+
+
+@pytest.fixture
+def pdv(db_manager):
+    """Evento, vendedor, dois itens e um movimento de caixa aberto."""
+    id_evento = EventoService(db_manager).registrar_evento(Evento(nome="Feira Stress", data_evento="2025-01-01", tipo="Venda"))
+    id_usuario = UsuarioService(db_manager).registrar_usuario(
+        Usuario(nome="Vendedor", email="vendedor@unython.local", funcao="Vendedor"), "senha123"
+    )
+    item_srv = ItemService(db_manager)
+    id_a = item_srv.registrar_item(Item(nome="Item A", valor_compra=Decimal("1.00"), valor_venda=Decimal("2.00")))
+    id_b = item_srv.registrar_item(Item(nome="Item B", valor_compra=Decimal("1.00"), valor_venda=Decimal("2.00")))
+    caixa_srv = CaixaService(db_manager)
+    id_caixa = caixa_srv.registrar_caixa(Caixa(nome="Caixa Stress"))
+    id_mov = caixa_srv.abrir_movimento(id_caixa, id_usuario, Decimal("0.00"), id_evento)
+    return {"id_evento": id_evento, "id_usuario": id_usuario, "id_a": id_a, "id_b": id_b, "id_mov": id_mov}
+
+
+def _vender_em_paralelo(pdv, carrinhos):
+    """Dispara uma venda por carrinho, cada uma em sua própria conexão, todas ao mesmo tempo."""
+    largada = threading.Barrier(len(carrinhos))
+    resultados = []
+    lock = threading.Lock()
+
+    def vender(carrinho):
+        db = DatabaseManager()
+        db.connect()
+        try:
+            estoque_srv = EstoqueService(db)
+            venda_srv = VendaService(db, estoque_srv, CaixaService(db))
+            cabecalho = Venda(
+                id_pessoa=None,
+                responsavel=str(pdv["id_usuario"]),
+                id_evento=pdv["id_evento"],
+                id_movimento_caixa=pdv["id_mov"],
+            )
+            itens = [ItemVenda(id_venda=0, id_item=i, quantidade=q, valor_unitario=Decimal("2.00")) for i, q in carrinho]
+            largada.wait()
+            id_venda = venda_srv.registrar_venda_completa(cabecalho, itens)
+            with lock:
+                resultados.append((id_venda, venda_srv.ultimo_erro))
+        finally:
+            db.disconnect()
+
+    threads = [threading.Thread(target=vender, args=(c,)) for c in carrinhos]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=60)
+    return resultados
+
+
+def test_estoque_nunca_fica_negativo_com_vendas_simultaneas(db_manager, pdv):
+    estoque_srv = EstoqueService(db_manager)
+    estoque_srv.entrada_item(pdv["id_a"], 5, "Doacao", pdv["id_usuario"], pdv["id_evento"])
+
+    resultados = _vender_em_paralelo(pdv, [[(pdv["id_a"], 1)]] * 20)
+
+    sucessos = [r for r in resultados if r[0]]
+    falhas = [r for r in resultados if not r[0]]
+    assert len(resultados) == 20
+    assert len(sucessos) == 5, "Exatamente o estoque disponível deveria ser vendido."
+    assert all("Estoque insuficiente" in (erro or "") for _, erro in falhas)
+    assert estoque_srv.calcular_saldo_item(pdv["id_a"]) == 0
+    assert estoque_srv.verificar_saldos() == []
+    _, (qtd_vendas,) = db_manager.execute_query("SELECT COUNT(*) FROM vendas", fetch_one=True)
+    assert qtd_vendas == 5
+
+
+def test_vendas_cruzadas_nao_geram_deadlock(db_manager, pdv):
+    estoque_srv = EstoqueService(db_manager)
+    estoque_srv.entrada_item(pdv["id_a"], 10, "Doacao", pdv["id_usuario"], pdv["id_evento"])
+    estoque_srv.entrada_item(pdv["id_b"], 10, "Doacao", pdv["id_usuario"], pdv["id_evento"])
+
+    # Metade dos carrinhos lista A antes de B e a outra metade B antes de A
+    carrinhos = [[(pdv["id_a"], 1), (pdv["id_b"], 1)], [(pdv["id_b"], 1), (pdv["id_a"], 1)]] * 15
+    resultados = _vender_em_paralelo(pdv, carrinhos)
+
+    erros = [erro for id_venda, erro in resultados if not id_venda]
+    assert len([r for r in resultados if r[0]]) == 10
+    assert not any("deadlock" in (erro or "").lower() for erro in erros)
+    assert estoque_srv.calcular_saldos([pdv["id_a"], pdv["id_b"]]) == {pdv["id_a"]: 0, pdv["id_b"]: 0}
+    assert estoque_srv.verificar_saldos() == []
+
+
+def _venda_lote(pdv, chave, quantidade):
+    cabecalho = Venda(
+        id_pessoa=None,
+        responsavel=str(pdv["id_usuario"]),
+        id_evento=pdv["id_evento"],
+        id_movimento_caixa=pdv["id_mov"],
+    )
+    itens = [ItemVenda(id_venda=0, id_item=pdv["id_a"], quantidade=quantidade, valor_unitario=Decimal("2.00"))]
+    return VendaLote(cabecalho=cabecalho, itens=itens, chave=chave, hash_requisicao=f"hash-{chave}")
+
+
+def test_lote_offline_isola_venda_invalida_e_duplicadas(db_manager, pdv):
+    estoque_srv = EstoqueService(db_manager)
+    estoque_srv.entrada_item(pdv["id_a"], 3, "Doacao", pdv["id_usuario"], pdv["id_evento"])
+    venda_srv = VendaService(db_manager, estoque_srv, CaixaService(db_manager))
+
+    def venda(chave, quantidade):
+        return _venda_lote(pdv, chave, quantidade)
+
+    # A segunda venda estoura o estoque: só ela deve ser desfeita
+    resultados = venda_srv.registrar_vendas_lote([venda("off-1", 1), venda("off-2", 10), venda("off-3", 2)])
+    assert [r["status"] for r in resultados] == ["registrada", "erro", "registrada"]
+    assert "Estoque insuficiente" in resultados[1]["detalhe"]
+    assert estoque_srv.calcular_saldo_item(pdv["id_a"]) == 0
+
+    # Reenvio do mesmo lote (ex.: resposta perdida): nada é gravado de novo
+    reenvio = venda_srv.registrar_vendas_lote([venda("off-1", 1), venda("off-3", 2)])
+    assert [r["status"] for r in reenvio] == ["duplicada", "duplicada"]
+    assert [r["id_venda"] for r in reenvio] == [resultados[0]["id_venda"], resultados[2]["id_venda"]]
+    _, (qtd_vendas,) = db_manager.execute_query("SELECT COUNT(*) FROM vendas", fetch_one=True)
+    assert qtd_vendas == 2
+    assert estoque_srv.verificar_saldos() == []
+
+
+def test_lote_offline_exige_token_e_usa_o_responsavel_dele(db_manager, pdv):
+    from fastapi.testclient import TestClient
+    from app.api_main import app
+    from app.routers.vendas import registrar_vendas_lote
+
+    EstoqueService(db_manager).entrada_item(pdv["id_a"], 2, "Doacao", pdv["id_usuario"], pdv["id_evento"])
+    payload = {"vendas": [{
+        "idempotencyKey": "off-token-1",
+        "responsavelId": pdv["id_usuario"] + 999,  # ignorado: quem responde é o token
+        "eventoId": pdv["id_evento"],
+        "movimentoCaixaId": pdv["id_mov"],
+        "itens": [{"itemId": pdv["id_a"], "quantidade": 1, "valor_unitario": 2.0}],
+    }]}
+    assert TestClient(app).post("/vendas/lote", json=payload).status_code == 401
+
+    resposta = registrar_vendas_lote(
+        VendaLoteRequest.model_validate(payload), db_manager, UsuarioToken(id=pdv["id_usuario"], role="Vendedor")
+    )
+    assert resposta["registradas"] == 1
+    _, (responsavel,) = db_manager.execute_query(
+        "SELECT responsavel FROM vendas WHERE id = %s", (resposta["resultados"][0]["id_venda"],), fetch_one=True
+    )
+    assert responsavel == str(pdv["id_usuario"])
+
+
+def test_lote_offline_falha_transitoria_nao_vira_erro(db_manager, pdv, monkeypatch):
+    estoque_srv = EstoqueService(db_manager)
+    estoque_srv.entrada_item(pdv["id_a"], 5, "Doacao", pdv["id_usuario"], pdv["id_evento"])
+    venda_srv = VendaService(db_manager, estoque_srv, CaixaService(db_manager))
+    buscar_custos = venda_srv.buscar_custos_itens
+    chamadas = []
+
+    def custos_com_deadlock(ids_itens):
+        # A segunda venda do lote sofre um deadlock de verdade (SQLSTATE 40P01) no meio do savepoint
+        chamadas.append(ids_itens)
+        if len(chamadas) == 2:
+            db_manager.execute_query("DO $$ BEGIN RAISE EXCEPTION 'deadlock simulado' USING ERRCODE = 'deadlock_detected'; END $$")
+            raise Exception("Falha ao buscar o custo dos itens da venda.")
+        return buscar_custos(ids_itens)
+
+    monkeypatch.setattr(venda_srv, "buscar_custos_itens", custos_com_deadlock)
+    resultados = venda_srv.registrar_vendas_lote([_venda_lote(pdv, f"tr-{n}", 1) for n in range(3)])
+    assert [r["status"] for r in resultados] == ["registrada", "reenviar", "registrada"]
+
+    # Falha no nível do lote (ex.: lock dos saldos): nada gravado, exceção própria (a API responde 503)
+    def bloqueio_falha(ids_itens):
+        raise Exception("Falha ao bloquear saldos de estoque.")
+
+    monkeypatch.setattr(estoque_srv, "bloquear_saldos", bloqueio_falha)
+    with pytest.raises(LoteVendasIndisponivelError):
+        venda_srv.registrar_vendas_lote([_venda_lote(pdv, "tr-1", 1), _venda_lote(pdv, "tr-9", 1)])
+    _, (qtd_vendas,) = db_manager.execute_query("SELECT COUNT(*) FROM vendas", fetch_one=True)
+    assert qtd_vendas == 2
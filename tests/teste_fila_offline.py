@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# O frontend importa seus módulos como "utils.*"/"modules.*" (raiz = frontend/)
+FRONTEND_DIR = Path(__file__).resolve().parents[1] / "frontend"
+if str(FRONTEND_DIR) not in sys.path:
+    sys.path.insert(0, str(FRONTEND_DIR))
+
+from modules import vendas as pdv_vendas  # noqa: E402
+from utils import fila_offline  # noqa: E402
+
+
+class RespostaFalsa:
+    def __init__(self, status_code, corpo=None):
+        self.status_code = status_code
+        self._corpo = corpo or {}
+        self.text = str(corpo)
+
+    def json(self):
+        return self._corpo
+
+
+class ApiFalsa:
+    """Responde POST /vendas/lote com `responder(lote)` e guarda as chaves de cada envio."""
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.envios = []
+
+    def post(self, path, json=None, **kwargs):
+        self.envios.append([v["idempotencyKey"] for v in json["vendas"]])
+        return self.responder(json["vendas"])
+
+
+@pytest.fixture
+def fila(tmp_path, monkeypatch):
+    monkeypatch.setattr(fila_offline, "FILA_PATH", tmp_path / "fila.db")
+    monkeypatch.setattr(pdv_vendas, "LOTE_SINCRONIZACAO", 2)
+    for n in range(5):
+        fila_offline.enfileirar_venda(f"k{n}", {"eventoId": 1, "responsavelId": 1, "itens": [{"itemId": 1, "quantidade": n + 1}]})
+
+
+def _usar_api(monkeypatch, responder):
+    api = ApiFalsa(responder)
+    monkeypatch.setattr(pdv_vendas, "get_api_client", lambda: api)
+    return api
+
+
+def test_lote_desfeito_mantem_vendas_pendentes(fila, monkeypatch):
+    api = _usar_api(monkeypatch, lambda vendas: RespostaFalsa(503, {"detail": "Lote desfeito: conexão perdida"}))
+
+    assert pdv_vendas.sincronizar_fila_offline("token") is False
+    assert api.envios == [["k0", "k1"]]
+    assert fila_offline.contar_vendas("pendente") == 5
+    assert fila_offline.contar_vendas("erro") == 0
+
+
+def test_sincronizacao_separa_reenvio_recusa_e_payload_invalido(fila, monkeypatch):
+    def responder(vendas):
+        chaves = [v["idempotencyKey"] for v in vendas]
+        if "k2" in chaves:
+            # Validação do FastAPI: a venda k2 derruba o lote inteiro com 422
+            indice = chaves.index("k2")
+            return RespostaFalsa(422, {"detail": [{"loc": ["body", "vendas", indice, "itens"], "msg": "inválido"}]})
+        status = {"k0": "registrada", "k1": "reenviar", "k3": "erro", "k4": "duplicada"}
+        return RespostaFalsa(200, {"resultados": [
+            {"idempotency_key": c, "status": status[c], "detalhe": None} for c in chaves
+        ]})
+
+    api = _usar_api(monkeypatch, responder)
+
+    assert pdv_vendas.sincronizar_fila_offline("token") is True
+    assert api.envios == [["k0", "k1"], ["k2", "k3"], ["k3", "k4"]]
+    assert [p["chave"] for p in fila_offline.listar_pendentes()] == ["k1"]
+    assert fila_offline.contar_vendas("erro") == 2
+
+
+def test_sessao_expirada_nao_marca_erro(fila, monkeypatch):
+    _usar_api(monkeypatch, lambda vendas: RespostaFalsa(401, {"detail": "Token expirado"}))
+
+    assert pdv_vendas.sincronizar_fila_offline("token") is False
+    assert fila_offline.contar_vendas("pendente") == 5
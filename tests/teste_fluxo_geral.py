@@ -1,20 +1,37 @@
-from datetime import datetime
+import io
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
 import pytest
+from fastapi import HTTPException
 
 from src.modules.agendamento import AgendamentoService
 from src.modules.caixas import CaixaService
-from src.modules.categoria import CategoriaService
+from src.modules.categoria import CATALOGO_CACHE, CategoriaService
 from src.modules.estoque import EstoqueService
 from src.modules.evento import EventoService
+from src.modules.exportacao import ExportacaoService
 from src.modules.fluxo_caixa import FluxoDeCaixaService
+from src.modules import idempotencia
+from src.modules.idempotencia import IdempotenciaService
+from src.modules.importacao import ImportacaoCatalogoService
 from src.modules.item import ItemService
+from src.modules.massa_dados import MassaDadosService, ParametrosMassa
+from src.modules.pdv import PdvService
 from src.modules.pessoa import PessoaService
-from src.modules.relatorio import RelatorioService
-from src.modules.usuario import UsuarioService
+from src.modules.relatorio import RelatorioCacheado, RelatorioService
+from src.modules.usuario import USUARIOS_CACHE, UsuarioService
 from src.modules.venda import VendaService
+from src.utils.cache import CacheTTL, VersaoCompartilhada, versao_dados
 from src.utils.config import get_alias
+from src.utils import database_manager
+from src.utils.database_manager import DatabaseManager
+from src.utils.dependencies import get_token_principal
+from src.utils.metricas import METRICAS_SQL
+from src.utils.migracoes import MIGRACOES, VERSAO_ATUAL, migracoes_aplicadas, migracoes_pendentes
 from src.utils.models import (
     Agendamento,
     Caixa,
@@ -27,7 +44,8 @@ from src.utils.models import (
     Usuario,
     Venda,
 )
-from src.utils.security import verify_password
+from src.utils.streaming import csv_em_fluxo, ndjson_em_fluxo, parquet_em_fluxo
+from src.utils.security import _chave_assinatura, criar_token_acesso, decodificar_token_acesso, verify_password
 
 
 @pytest.fixture
@@ -249,3 +267,706 @@ def test_usuario_require_password_change(db_manager):
     fetched2 = usuario_srv.buscar_usuario_por_id(uid)
     assert fetched2 and not fetched2.require_password_change
     assert usuario_srv.verificar_credenciais(usuario.email, "new456")
+
+
+def test_pool_reaproveita_conexoes():
+    db1 = DatabaseManager()
+    db1.acquire()
+    conn_original = db1.conn
+    db1.execute_query("SELECT 1", fetch_one=True)
+    db1.release()
+    assert db1.conn is None
+
+    db2 = DatabaseManager()
+    db2.acquire()
+    assert db2.conn is conn_original, "Conexão deveria ter sido reaproveitada do pool."
+    stats = DatabaseManager.pool_stats()
+    assert stats["em_uso"] == 1 and stats["checkouts"] >= 2
+    db2.release()
+    DatabaseManager.close_pool()
+
+
+def test_saldo_estoque_projecao_e_reconstrucao(db_manager, seed_basico, catalogo):
+    estoque_srv = EstoqueService(db_manager)
+    estoque_srv.entrada_item(catalogo["id_coca"], 10, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+    estoque_srv.saida_item(catalogo["id_coca"], 3, seed_basico["id_facilitador"], seed_basico["id_evento"])
+    assert estoque_srv.calcular_saldo_item(catalogo["id_coca"]) == 7
+    assert estoque_srv.calcular_saldo_item(catalogo["id_vela"]) == 0
+    assert estoque_srv.verificar_saldos() == []
+
+    # Corrompe a projeção: o verificador acusa e a reconstrução corrige
+    db_manager.execute_query("UPDATE saldo_estoque SET saldo = 999", commit=True)
+    divergencias = estoque_srv.verificar_saldos()
+    assert [d["id_item"] for d in divergencias] == [catalogo["id_coca"]]
+    assert estoque_srv.reconstruir_saldos() == 1
+    assert estoque_srv.verificar_saldos() == []
+    assert estoque_srv.calcular_saldo_item(catalogo["id_coca"]) == 7
+
+
+def test_saldos_em_lote_e_inventario(db_manager, seed_basico, catalogo):
+    estoque_srv = EstoqueService(db_manager)
+    relatorio_srv = RelatorioService(db_manager)
+    estoque_srv.entrada_item(catalogo["id_coca"], 4, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+    estoque_srv.entrada_item(catalogo["id_vela"], 2, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+
+    assert estoque_srv.calcular_saldos() == {catalogo["id_coca"]: 4, catalogo["id_vela"]: 2}
+    assert estoque_srv.calcular_saldos([catalogo["id_vela"], 9999]) == {catalogo["id_vela"]: 2, 9999: 0}
+
+    inventario = {linha["id"]: linha for linha in relatorio_srv.gerar_inventario_total()}
+    assert inventario[catalogo["id_coca"]]["saldo_atual"] == 4
+    assert inventario[catalogo["id_coca"]]["custo_total_estoque"] == Decimal("6.00")
+    assert inventario[catalogo["id_vela"]]["custo_total_estoque"] == Decimal("10.00")
+
+
+def test_venda_multilinha_em_lote(db_manager, seed_basico, catalogo):
+    estoque_srv = EstoqueService(db_manager)
+    caixa_srv = CaixaService(db_manager)
+    venda_srv = VendaService(db_manager, estoque_srv, caixa_srv)
+    for id_item in (catalogo["id_coca"], catalogo["id_vela"]):
+        estoque_srv.entrada_item(id_item, 10, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+    id_caixa = caixa_srv.registrar_caixa(Caixa(nome="Caixa Lote"))
+    id_mov = caixa_srv.abrir_movimento(id_caixa, seed_basico["id_facilitador"], Decimal("0.00"))
+
+    venda = Venda(
+        id_pessoa=None,
+        responsavel=str(seed_basico["id_facilitador"]),
+        id_evento=seed_basico["id_evento"],
+        id_movimento_caixa=id_mov,
+    )
+    itens = [
+        ItemVenda(id_venda=0, id_item=catalogo["id_coca"], quantidade=2, valor_unitario=Decimal("2.50")),
+        ItemVenda(id_venda=0, id_item=catalogo["id_vela"], quantidade=1, valor_unitario=Decimal("10.00")),
+        ItemVenda(id_venda=0, id_item=catalogo["id_coca"], quantidade=3, valor_unitario=Decimal("2.50")),
+    ]
+    id_venda = venda_srv.registrar_venda_completa(venda, itens)
+    assert id_venda
+    assert all(iv.id for iv in itens), "IDs das linhas deveriam ser preenchidos pelo RETURNING."
+
+    _, (linhas,) = db_manager.execute_query("SELECT COUNT(*) FROM itens_venda WHERE id_venda = %s", (id_venda,), fetch_one=True)
+    assert linhas == 3
+    assert estoque_srv.calcular_saldos() == {catalogo["id_coca"]: 5, catalogo["id_vela"]: 9}
+    assert estoque_srv.verificar_saldos() == []
+
+    totais_query = "SELECT valor_total, custo_total, qtd_itens FROM vendas WHERE id = %s"
+    _, totais = db_manager.execute_query(totais_query, (id_venda,), fetch_one=True)
+    assert totais == (Decimal("22.50"), Decimal("12.50"), 6)
+    assert _relatorio_totais(db_manager) == (Decimal("22.50"), Decimal("10.00"))
+
+    # Backfill de cabeçalhos antigos (sem totais) a partir das linhas
+    db_manager.execute_query("UPDATE vendas SET valor_total = 0, custo_total = 0, qtd_itens = 0", commit=True)
+    (migracao_totais,) = [m for m in MIGRACOES if m.versao == 4]
+    db_manager.execute_query(migracao_totais.sql, commit=True)
+    _, totais = db_manager.execute_query(totais_query, (id_venda,), fetch_one=True)
+    assert totais == (Decimal("22.50"), Decimal("12.50"), 6)
+
+
+def _relatorio_totais(db_manager):
+    relatorio_srv = RelatorioService(db_manager)
+    (faturamento,) = relatorio_srv.gerar_faturamento_mensal()
+    (lucro,) = relatorio_srv.gerar_lucro_bruto_mensal()
+    return faturamento["faturamento_total"], lucro["lucro_bruto_total"]
+
+
+def test_venda_idempotente_nao_duplica(db_manager, seed_basico, catalogo):
+    estoque_srv = EstoqueService(db_manager)
+    caixa_srv = CaixaService(db_manager)
+    venda_srv = VendaService(db_manager, estoque_srv, caixa_srv)
+    idem_srv = IdempotenciaService(db_manager)
+    estoque_srv.entrada_item(catalogo["id_coca"], 10, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+    id_caixa = caixa_srv.registrar_caixa(Caixa(nome="Caixa Retry"))
+    id_mov = caixa_srv.abrir_movimento(id_caixa, seed_basico["id_facilitador"], Decimal("0.00"))
+
+    def tentar():
+        venda = Venda(
+            id_pessoa=None,
+            responsavel=str(seed_basico["id_facilitador"]),
+            id_evento=seed_basico["id_evento"],
+            id_movimento_caixa=id_mov,
+        )
+        itens = [ItemVenda(id_venda=0, id_item=catalogo["id_coca"], quantidade=2, valor_unitario=Decimal("2.50"))]
+        return venda_srv.registrar_venda_completa(venda, itens, chave_idempotencia="tablet-1-venda-42", hash_requisicao="h1")
+
+    id_venda = tentar()
+    assert id_venda
+    assert tentar() is None, "Retry com a mesma chave não pode registrar outra venda."
+    assert idem_srv.buscar("tablet-1-venda-42") == {"chave": "tablet-1-venda-42", "hash_requisicao": "h1", "id_venda": id_venda}
+    assert estoque_srv.calcular_saldo_item(catalogo["id_coca"]) == 8
+
+    # Chave expirada: sai da busca, é limpa e pode ser reaproveitada
+    db_manager.execute_query("UPDATE idempotencia_vendas SET expira_em = NOW() - INTERVAL '1 minute'", commit=True)
+    assert idem_srv.buscar("tablet-1-venda-42") is None
+    assert idem_srv.limpar_expiradas() == 1
+
+
+def test_chaves_expiradas_limpas_durante_o_uso(db_manager, seed_basico, catalogo, monkeypatch):
+    estoque_srv = EstoqueService(db_manager)
+    caixa_srv = CaixaService(db_manager)
+    venda_srv = VendaService(db_manager, estoque_srv, caixa_srv)
+    estoque_srv.entrada_item(catalogo["id_coca"], 10, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+    id_mov = caixa_srv.abrir_movimento(caixa_srv.registrar_caixa(Caixa(nome="Caixa Limpeza")), seed_basico["id_facilitador"], Decimal("0.00"))
+
+    def vender(chave):
+        venda = Venda(
+            id_pessoa=None,
+            responsavel=str(seed_basico["id_facilitador"]),
+            id_evento=seed_basico["id_evento"],
+            id_movimento_caixa=id_mov,
+        )
+        itens = [ItemVenda(id_venda=0, id_item=catalogo["id_coca"], quantidade=1, valor_unitario=Decimal("2.50"))]
+        assert venda_srv.registrar_venda_completa(venda, itens, chave_idempotencia=chave, hash_requisicao=chave)
+
+    def expirar_todas():
+        db_manager.execute_query("UPDATE idempotencia_vendas SET expira_em = NOW() - INTERVAL '1 minute'", commit=True)
+
+    def total_chaves():
+        _, (total,) = db_manager.execute_query("SELECT COUNT(*) FROM idempotencia_vendas", fetch_one=True)
+        return total
+
+    monkeypatch.setattr(idempotencia, "_proxima_limpeza", 0.0)
+    vender("uso-1")  # primeira venda com chave do processo: limpa (nada expirado ainda)
+    expirar_todas()
+    vender("uso-2")  # dentro do intervalo: não limpa de novo
+    assert total_chaves() == 2
+
+    # Passado o intervalo, a próxima venda com chave leva a expirada junto
+    monkeypatch.setattr(idempotencia, "_proxima_limpeza", 0.0)
+    expirar_todas()
+    vender("uso-3")
+    assert total_chaves() == 1
+
+
+def test_listagem_vendas_paginada_por_cursor(db_manager, seed_basico, catalogo):
+    estoque_srv = EstoqueService(db_manager)
+    caixa_srv = CaixaService(db_manager)
+    venda_srv = VendaService(db_manager, estoque_srv, caixa_srv)
+    estoque_srv.entrada_item(catalogo["id_coca"], 10, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+    movimentos = [
+        caixa_srv.abrir_movimento(caixa_srv.registrar_caixa(Caixa(nome=f"Caixa {n}")), seed_basico["id_facilitador"], Decimal("0.00"))
+        for n in (1, 2)
+    ]
+
+    ids = []
+    for i in range(5):
+        venda = Venda(
+            id_pessoa=None,
+            responsavel=str(seed_basico["id_facilitador"]),
+            id_evento=seed_basico["id_evento"],
+            id_movimento_caixa=movimentos[i % 2],
+        )
+        itens = [ItemVenda(id_venda=0, id_item=catalogo["id_coca"], quantidade=1, valor_unitario=Decimal("2.50"))]
+        ids.append(venda_srv.registrar_venda_completa(venda, itens))
+
+    pagina1 = venda_srv.buscar_vendas(limite=2)
+    pagina2 = venda_srv.buscar_vendas(limite=2, cursor=pagina1[-1].id)
+    pagina3 = venda_srv.buscar_vendas(limite=2, cursor=pagina2[-1].id)
+    assert [v.id for v in pagina1 + pagina2 + pagina3] == sorted(ids, reverse=True)
+
+    do_caixa1 = venda_srv.buscar_vendas(id_movimento_caixa=movimentos[0], id_evento=seed_basico["id_evento"])
+    assert [v.id for v in do_caixa1] == [ids[4], ids[2], ids[0]]
+    hoje = datetime.now().date()
+    assert len(venda_srv.buscar_vendas(data_inicio=hoje, data_fim=hoje, responsavel=str(seed_basico["id_facilitador"]))) == 5
+    assert venda_srv.buscar_vendas(responsavel="ninguem") == []
+
+    # Com filtro de data o keyset é (data_venda, id): a venda mais nova, movida para ontem, vem por último
+    db_manager.execute_query("UPDATE vendas SET data_venda = data_venda - 1 WHERE id = %s", (ids[4],), commit=True)
+    paginas, cursor = [], None
+    while True:
+        pagina = venda_srv.buscar_vendas(limite=2, cursor=cursor, data_inicio=hoje - timedelta(days=1), data_fim=hoje)
+        if not pagina:
+            break
+        paginas.append([v.id for v in pagina])
+        cursor = pagina[-1].id
+    assert paginas == [[ids[3], ids[2]], [ids[1], ids[0]], [ids[4]]]
+
+
+def test_rollup_vendas_diarias_e_cancelamento(db_manager, seed_basico, catalogo):
+    estoque_srv = EstoqueService(db_manager)
+    caixa_srv = CaixaService(db_manager)
+    venda_srv = VendaService(db_manager, estoque_srv, caixa_srv)
+    relatorio_srv = RelatorioService(db_manager)
+    for id_item in (catalogo["id_coca"], catalogo["id_vela"]):
+        estoque_srv.entrada_item(id_item, 10, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+    id_mov = caixa_srv.abrir_movimento(caixa_srv.registrar_caixa(Caixa(nome="Caixa Rollup")), seed_basico["id_facilitador"], Decimal("0.00"))
+
+    def vender(*linhas):
+        venda = Venda(
+            id_pessoa=None,
+            responsavel=str(seed_basico["id_facilitador"]),
+            id_evento=seed_basico["id_evento"],
+            id_movimento_caixa=id_mov,
+        )
+        itens = [ItemVenda(id_venda=0, id_item=i, quantidade=q, valor_unitario=v) for i, q, v in linhas]
+        return venda_srv.registrar_venda_completa(venda, itens)
+
+    vender((catalogo["id_coca"], 4, Decimal("2.50")))
+    id_cancelada = vender((catalogo["id_coca"], 1, Decimal("2.50")), (catalogo["id_vela"], 2, Decimal("10.00")))
+
+    top = relatorio_srv.gerar_top_itens()
+    assert [(t["id_item"], t["quantidade"]) for t in top] == [(catalogo["id_coca"], 5), (catalogo["id_vela"], 2)]
+
+    assert venda_srv.cancelar_venda(id_cancelada, seed_basico["id_facilitador"])
+    assert not venda_srv.cancelar_venda(id_cancelada, seed_basico["id_facilitador"])
+    assert "já está cancelada" in venda_srv.ultimo_erro
+    assert estoque_srv.calcular_saldos() == {catalogo["id_coca"]: 6, catalogo["id_vela"]: 10}
+
+    (faturamento,) = relatorio_srv.gerar_faturamento_mensal()
+    (lucro,) = relatorio_srv.gerar_lucro_bruto_mensal()
+    assert faturamento["faturamento_total"] == Decimal("10.00")
+    assert lucro["lucro_bruto_total"] == Decimal("4.00")
+    assert [(t["id_item"], t["quantidade"]) for t in relatorio_srv.gerar_top_itens()] == [(catalogo["id_coca"], 4)]
+
+    # A reconstrução a partir das vendas ativas chega ao mesmo rollup mantido incrementalmente
+    consulta = "SELECT dia, id_evento, id_caixa, id_item, quantidade, valor_total, custo_total FROM vendas_diarias WHERE quantidade <> 0 ORDER BY id_item"
+    _, incremental = db_manager.execute_query(consulta, fetch_all=True)
+    assert venda_srv.reconstruir_vendas_diarias() == 1
+    _, reconstruido = db_manager.execute_query(consulta, fetch_all=True)
+    assert reconstruido == incremental
+
+
+def test_cache_de_relatorios_invalidado_por_escritas(db_manager, seed_basico, catalogo):
+    estoque_srv = EstoqueService(db_manager)
+    fluxo_srv = FluxoDeCaixaService(db_manager)
+    relatorios = RelatorioCacheado(RelatorioService(db_manager), cache=CacheTTL(max_entradas=2, ttl_segundos=60))
+
+    def despesa(valor):
+        fluxo_srv.registrar_movimento(
+            MovimentoFinanceiro(
+                id_usuario=seed_basico["id_facilitador"],
+                tipo_movimento="Despesa",
+                valor=Decimal(valor),
+                descricao="Material",
+                categoria="Material",
+                id_evento=seed_basico["id_evento"],
+            )
+        )
+
+    despesa("10.00")
+    assert relatorios.gerar_despesas_por_categoria()[0]["total_gasto"] == Decimal("10.00")
+    assert relatorios.gerar_despesas_por_categoria()[0]["total_gasto"] == Decimal("10.00")
+    assert relatorios.cache.stats()["hits"] == 1
+
+    # Escrita confirmada incrementa a versão: a próxima leitura vai ao banco
+    despesa("5.00")
+    assert relatorios.gerar_despesas_por_categoria()[0]["total_gasto"] == Decimal("15.00")
+
+    estoque_srv.entrada_item(catalogo["id_coca"], 3, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+    inventario = {i["id"]: i["saldo_atual"] for i in relatorios.gerar_inventario_total()}
+    assert inventario[catalogo["id_coca"]] == 3
+    estoque_srv.entrada_item(catalogo["id_coca"], 2, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+    inventario = {i["id"]: i["saldo_atual"] for i in relatorios.gerar_inventario_total()}
+    assert inventario[catalogo["id_coca"]] == 5
+
+    # Limite de entradas: a menos usada recentemente é descartada
+    relatorios.calcular_saldo_fluxo_caixa()
+    relatorios.gerar_top_itens(5)
+    assert relatorios.cache.stats()["entradas"] == 2
+    assert relatorios.cache.stats()["evictions"] >= 1
+
+
+def test_relatorio_em_cache_nao_empresta_conexao(db_manager, seed_basico):
+    emprestimos = []
+
+    def executar(funcao):
+        emprestimos.append(funcao)
+        return funcao(db_manager)
+
+    relatorios = RelatorioCacheado(cache=CacheTTL(max_entradas=8, ttl_segundos=60), executar=executar)
+    saldo = relatorios.calcular_saldo_fluxo_caixa()
+    assert relatorios.calcular_saldo_fluxo_caixa() == saldo
+    assert len(emprestimos) == 1, "Acerto de cache não deve emprestar conexão do pool."
+    relatorios.gerar_detalhe_agendamentos_pendentes()
+    assert len(emprestimos) == 2, "Relatório fora do cache usa conexão a cada chamada."
+
+
+def test_cache_de_relatorios_percebe_escrita_de_outro_processo(db_manager, seed_basico):
+    relatorios = RelatorioCacheado(
+        RelatorioService(db_manager),
+        cache=CacheTTL(max_entradas=8, ttl_segundos=60),
+        versao_banco=VersaoCompartilhada(intervalo_segundos=0),
+    )
+    saldo = relatorios.calcular_saldo_fluxo_caixa()
+
+    # Outro worker (ou o psql) grava direto no banco: o contador deste processo não muda,
+    # mas o trigger incrementa a versão 'dados' no commit
+    versao_local = versao_dados()
+    db_manager.execute_query(
+        "INSERT INTO movimentos_financeiros (id_usuario, tipo_movimento, valor) VALUES (%s, 'Receita', 7.00)",
+        (seed_basico["id_facilitador"],),
+        commit=True,
+    )
+    assert versao_dados() == versao_local
+    assert relatorios.calcular_saldo_fluxo_caixa() == saldo + Decimal("7.00")
+    assert relatorios.calcular_saldo_fluxo_caixa() == saldo + Decimal("7.00")
+    assert relatorios.cache.stats()["hits"] == 1
+
+
+def test_escrita_de_item_com_falha_nao_invalida_caches(db_manager, catalogo):
+    item_srv = ItemService(db_manager)
+    coca = item_srv.buscar_item_por_id(catalogo["id_coca"])
+    versao = versao_dados()
+
+    # Nome já usado pela vela: UNIQUE recusa o UPDATE e nada é confirmado
+    vela = item_srv.buscar_item_por_id(catalogo["id_vela"])
+    assert not item_srv.editar_item(coca.id, vela.nome, coca.valor_compra, coca.valor_venda, coca.status, coca.id_categoria)
+    assert versao_dados() == versao
+
+    assert item_srv.inativar_item(coca.id)
+    assert versao_dados() == versao + 1
+
+
+def test_token_assinado_e_cache_de_usuario(db_manager, seed_basico):
+    usuario_srv = UsuarioService(db_manager)
+    id_usuario = seed_basico["id_facilitador"]
+
+    token = criar_token_acesso(id_usuario, "Administrador", "Washu")
+    claims = decodificar_token_acesso(token)
+    assert (claims["sub"], claims["role"], claims["nome"]) == (id_usuario, "Administrador", "Washu")
+    cabecalho, corpo, assinatura = token.split(".")
+    assert decodificar_token_acesso(f"{cabecalho}.{corpo}.{assinatura[::-1]}") is None
+    assert decodificar_token_acesso(criar_token_acesso(id_usuario, "Administrador", "Washu", ttl_segundos=-1)) is None
+    assert decodificar_token_acesso(f"access-token-para-usuario-{id_usuario}") is None
+
+    assert usuario_srv.buscar_usuario_por_id_cacheado(id_usuario).role == "Administrador"
+    assert USUARIOS_CACHE.obter(id_usuario)[0]
+    usuario_srv.atualizar_role_status(id_usuario, "Vendedor")
+    assert not USUARIOS_CACHE.obter(id_usuario)[0], "Alterar role deve invalidar o cache."
+    assert usuario_srv.buscar_usuario_por_id_cacheado(id_usuario).role == "Vendedor"
+
+
+def test_chave_de_assinatura_fraca_e_recusada(caplog):
+    forte = "x" * 48
+    assert _chave_assinatura(forte) == forte.encode("utf-8")
+    for fraca in (None, "", "change_me", "curta-demais"):
+        caplog.clear()
+        with caplog.at_level("WARNING", logger="unython.seguranca"):
+            chave = _chave_assinatura(fraca)
+        assert len(chave) == 32 and chave != str(fraca or "").encode("utf-8")
+        assert "secret_key" in caplog.text
+
+
+def test_revogacao_de_token_por_versao_do_usuario(db_manager, seed_basico):
+    usuario_srv = UsuarioService(db_manager)
+    id_usuario = seed_basico["id_facilitador"]
+    usuario = usuario_srv.buscar_usuario_por_id(id_usuario)
+    token = criar_token_acesso(id_usuario, usuario.role, usuario.nome, versao=usuario.token_version)
+    assert get_token_principal(token).id == id_usuario
+
+    # Revogação no mesmo segundo da emissão (mesmo iat) também vale
+    usuario_srv.atualizar_role_status(id_usuario, "Vendedor")
+    with pytest.raises(HTTPException) as exc:
+        get_token_principal(token)
+    assert exc.value.status_code == 401
+
+    # Outro processo: a revogação vem do banco, não de estado local (simulado esvaziando o cache)
+    novo = usuario_srv.buscar_usuario_por_id(id_usuario)
+    token_novo = criar_token_acesso(id_usuario, novo.role, novo.nome, versao=novo.token_version)
+    assert get_token_principal(token_novo).role == "Vendedor"
+    db_manager.execute_query(
+        "UPDATE usuarios SET token_version = token_version + 1 WHERE id = %s", (id_usuario,), commit=True
+    )
+    USUARIOS_CACHE.limpar()
+    with pytest.raises(HTTPException):
+        get_token_principal(token_novo)
+
+
+def test_revogacao_durante_falta_de_cache_nao_guarda_linha_antiga(db_manager, seed_basico, monkeypatch):
+    usuario_srv = UsuarioService(db_manager)
+    id_usuario = seed_basico["id_facilitador"]
+    usuario = usuario_srv.buscar_usuario_por_id(id_usuario)
+    token = criar_token_acesso(id_usuario, usuario.role, usuario.nome, versao=usuario.token_version)
+    USUARIOS_CACHE.limpar()
+
+    # Falta de cache: a linha antiga é lida e, antes de ser guardada, o usuário é rebaixado
+    buscar_original = UsuarioService.buscar_usuario_por_id
+
+    def buscar_e_revogar(self, user_id):
+        linha = buscar_original(self, user_id)
+        UsuarioService(db_manager).atualizar_role_status(user_id, "Vendedor")
+        return linha
+
+    monkeypatch.setattr(UsuarioService, "buscar_usuario_por_id", buscar_e_revogar)
+    assert usuario_srv.buscar_usuario_por_id_cacheado(id_usuario).token_version == usuario.token_version
+    monkeypatch.undo()
+
+    assert not USUARIOS_CACHE.obter(id_usuario)[0], "Linha lida antes da invalidação não pode ir ao cache."
+    with pytest.raises(HTTPException):
+        get_token_principal(token)
+
+
+def test_upserts_nativos_e_em_lote(db_manager, catalogo):
+    item_srv = ItemService(db_manager)
+    cat_srv = CategoriaService(db_manager)
+    caixa_srv = CaixaService(db_manager)
+
+    # Mesmo nome: mesmo ID e valores atualizados
+    id_coca = item_srv.registrar_item(Item(nome="Coca Cola Lata", valor_compra=Decimal("1.80"), valor_venda=Decimal("3.00")))
+    assert id_coca == catalogo["id_coca"]
+    assert item_srv.buscar_item_por_id(id_coca).valor_venda == Decimal("3.00")
+    id_caixa = caixa_srv.registrar_caixa(Caixa(nome="Caixa Upsert"))
+    assert caixa_srv.registrar_caixa(Caixa(nome="Caixa Upsert", descricao="ignorada")) == id_caixa
+
+    categorias = cat_srv.registrar_categorias([Categoria(nome="Bebidas", descricao="nova"), Categoria(nome="Ervas")])
+    assert set(categorias) == {"Bebidas", "Ervas"}
+    ids = item_srv.registrar_itens([
+        Item(nome="Arruda", valor_compra=Decimal("1.00"), valor_venda=Decimal("2.00"), id_categoria=categorias["Ervas"]),
+        Item(nome="Vela 7 Dias", valor_compra=Decimal("5.00"), valor_venda=Decimal("12.00")),
+        Item(nome="Arruda", valor_compra=Decimal("1.00"), valor_venda=Decimal("2.50"), id_categoria=categorias["Ervas"]),
+    ])
+    assert ids["Vela 7 Dias"] == catalogo["id_vela"]
+    assert item_srv.buscar_item_por_id(ids["Arruda"]).valor_venda == Decimal("2.50"), "Última ocorrência no lote vence."
+    _, (total_itens,) = db_manager.execute_query("SELECT COUNT(*) FROM itens", fetch_one=True)
+    assert total_itens == 3
+
+
+def test_importacao_catalogo_via_copy(db_manager, catalogo):
+    service = ImportacaoCatalogoService(db_manager)
+    csv_texto = (
+        "nome;categoria;valor_compra;valor_venda;status\n"
+        "Coca Cola Lata;Bebidas;1,80;3,50;Ativo\n"
+        "Arruda;Ervas;1.00;2.00;\n"
+        ";Ervas;1.00;2.00;Ativo\n"
+        "Guiné;Ervas;abc;2.00;Ativo\n"
+        "Alecrim;Ervas;1.00;2.00;Vendido\n"
+        "Arruda;Ervas;1.00;2.50;Ativo\n"
+    )
+
+    simulado = service.importar_csv(io.BytesIO(csv_texto.encode("utf-8-sig")), simular=True)
+    assert (simulado["inseridos"], simulado["atualizados"], simulado["erros_total"]) == (1, 1, 4)
+    _, (total_itens,) = db_manager.execute_query("SELECT COUNT(*) FROM itens", fetch_one=True)
+    assert total_itens == 2, "Simulação não pode gravar nada."
+
+    resultado = service.importar(io.BytesIO(csv_texto.encode("utf-8")), "itens.csv")
+    assert resultado["total_linhas"] == 6
+    assert (resultado["inseridos"], resultado["atualizados"], resultado["categorias_criadas"]) == (1, 1, 1)
+    assert [(e["linha"], e["erro"]) for e in resultado["erros"]] == [
+        (3, "nome repetido no arquivo; vale a linha 7"),
+        (4, "nome obrigatório"),
+        (5, "valor_compra inválido"),
+        (6, "status deve ser Ativo ou Inativo"),
+    ]
+    item_srv = ItemService(db_manager)
+    assert item_srv.buscar_item_por_id(catalogo["id_coca"]).valor_venda == Decimal("3.50")
+    _, (valor_arruda, categoria) = db_manager.execute_query(
+        "SELECT i.valor_venda, c.nome FROM itens i JOIN categorias c ON c.id = i.id_categoria WHERE i.nome = 'Arruda'",
+        fetch_one=True,
+    )
+    assert (valor_arruda, categoria) == (Decimal("2.50"), "Ervas")
+
+    with pytest.raises(ValueError):
+        service.importar_csv(io.StringIO("nome,preco\nX,1.00\n"))
+
+    # Volume: 10 mil itens em uma única passada
+    linhas = ["categoria,nome,valor_compra,valor_venda"]
+    linhas += [f"Lote {i % 20},Item Importado {i},1.00,{2 + i % 7}.90" for i in range(10_000)]
+    inicio = time.perf_counter()
+    resultado = service.importar_csv(io.StringIO("\n".join(linhas) + "\n"))
+    duracao = time.perf_counter() - inicio
+    assert (resultado["inseridos"], resultado["erros_total"], resultado["categorias_criadas"]) == (10_000, 0, 20)
+    assert duracao < 10, f"Importação de 10 mil itens levou {duracao:.1f}s"
+
+
+def test_catalogo_versionado_para_etag(db_manager, catalogo):
+    cat_srv = CategoriaService(db_manager)
+    item_srv = ItemService(db_manager)
+
+    versao, grupos = cat_srv.buscar_itens_por_categoria_versionado()
+    assert [i["nome"] for i in grupos["Bebidas"]] == ["Coca Cola Lata"]
+    assert cat_srv.buscar_itens_por_categoria_versionado() == (versao, grupos)
+    assert CATALOGO_CACHE.obter(versao)[0], "Catálogo da versão atual deve ficar em memória."
+
+    # Qualquer escrita em itens/categorias muda a versão (trigger), inclusive SQL fora dos services
+    item_srv.inativar_item(catalogo["id_coca"])
+    versao_2, grupos_2 = cat_srv.buscar_itens_por_categoria_versionado()
+    assert versao_2 > versao and "Bebidas" not in grupos_2
+    db_manager.execute_query("UPDATE categorias SET descricao = 'x' WHERE nome = 'Esotericos'", commit=True)
+    assert cat_srv.versao_catalogo() > versao_2
+
+    # Leitura sem commit não altera a versão
+    versao_3 = cat_srv.versao_catalogo()
+    cat_srv.buscar_todas_categorias()
+    assert cat_srv.versao_catalogo() == versao_3
+
+
+def test_estado_pdv_em_uma_consulta(db_manager, seed_basico, catalogo):
+    caixa_srv = CaixaService(db_manager)
+    EstoqueService(db_manager).entrada_item(
+        id_item=catalogo["id_coca"], quantidade=12, origem_recurso="Doacao",
+        id_usuario=seed_basico["id_facilitador"], id_evento=seed_basico["id_evento"],
+    )
+    id_caixa_b = caixa_srv.registrar_caixa(Caixa(nome="Caixa B"))
+    id_caixa_a = caixa_srv.registrar_caixa(Caixa(nome="Caixa A"))
+    id_mov = caixa_srv.abrir_movimento(id_caixa_b, seed_basico["id_facilitador"], Decimal("50.00"), seed_basico["id_evento"])
+    pdv = PdvService(db_manager)
+
+    # Sem caixa informado: primeiro caixa ativo por nome (Caixa A, sem movimento aberto)
+    estado = pdv.buscar_estado()
+    assert estado["evento"]["id"] == seed_basico["id_evento"]
+    assert [c["nome"] for c in estado["caixas"]] == ["Caixa A", "Caixa B"]
+    assert (estado["caixa_id"], estado["movimento"]) == (id_caixa_a, None)
+    assert estado["estoque"] == {str(catalogo["id_coca"]): 12}
+    assert [i["nome"] for i in estado["catalogo"]["grupos"]["Bebidas"]] == ["Coca Cola Lata"]
+
+    estado = pdv.buscar_estado(id_caixa_b, versao_catalogo=estado["catalogo"]["versao"])
+    assert (estado["movimento"]["id"], estado["movimento"]["id_evento"]) == (id_mov, seed_basico["id_evento"])
+    assert estado["catalogo"]["grupos"] is None, "Catálogo na versão do cliente não deve ser reenviado."
+
+
+def test_metricas_por_comando_e_log_de_consultas_lentas(db_manager, catalogo, monkeypatch, caplog):
+    METRICAS_SQL.limpar()
+    item_srv = ItemService(db_manager)
+    item_srv.buscar_todos_itens()
+    item_srv.buscar_todos_itens()
+    assert db_manager.execute_query("SELECT * FROM tabela_inexistente", rotulo="teste.erro") is False
+
+    metricas = METRICAS_SQL.snapshot()
+    busca = metricas["ItemService.buscar_todos_itens"]
+    assert (busca["total"], busca["linhas"], busca["erros"]) == (2, 4, 0)
+    assert sum(busca["contagens"]) == 2
+    assert metricas["teste.erro"]["erros"] == 1
+
+    texto = "\n".join(METRICAS_SQL.exportar_prometheus())
+    assert 'unython_db_query_duration_seconds_count{statement="ItemService.buscar_todos_itens"} 2' in texto
+    assert 'unython_db_query_errors_total{statement="teste.erro"} 1' in texto
+
+    monkeypatch.setattr(database_manager, "SLOW_QUERY_MS", 0.000001)
+    with caplog.at_level("WARNING", logger="unython.sql.lentas"):
+        db_manager.execute_query("SELECT pg_sleep(0.01)", fetch_one=True, rotulo="teste.lenta")
+    assert "Consulta lenta [teste.lenta]" in caplog.text
+
+
+def test_migracoes_aplicadas_uma_vez_sob_lock(db_manager):
+    # Banco em dia: nenhuma migração pendente e nenhum DDL executado
+    assert [m.versao for m in MIGRACOES] == list(range(1, VERSAO_ATUAL + 1))
+    assert migracoes_pendentes(db_manager) == []
+    # Migração publicada não muda: o registro guarda a descrição com que foi aplicada
+    registradas = migracoes_aplicadas(db_manager)
+    assert {m.versao: m.descricao for m in MIGRACOES} == {v: r["descricao"] for v, r in registradas.items()}
+    METRICAS_SQL.limpar()
+    assert db_manager.create_tables() == []
+    assert not [r for r in METRICAS_SQL.snapshot() if r.startswith("migracoes.aplicar")]
+
+    # Versão removida do registro: dois "workers" sobem juntos e só um a reaplica
+    db_manager.execute_query("DELETE FROM schema_migrations WHERE versao = %s", (VERSAO_ATUAL,), commit=True)
+    largada = threading.Barrier(2)
+    resultados = []
+
+    def subir():
+        dbm = DatabaseManager()
+        dbm.connect()
+        try:
+            largada.wait()
+            resultados.append(dbm.create_tables())
+        finally:
+            dbm.disconnect()
+
+    threads = [threading.Thread(target=subir) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(resultados) == [[], [VERSAO_ATUAL]]
+    assert sorted(migracoes_aplicadas(db_manager)) == [m.versao for m in MIGRACOES]
+
+
+def test_stream_query_em_blocos_por_cursor_nomeado(db_manager, seed_basico, catalogo):
+    estoque_srv = EstoqueService(db_manager)
+    for n in range(1, 8):
+        estoque_srv.entrada_item(catalogo["id_coca"], n, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+
+    METRICAS_SQL.limpar()
+    linhas = db_manager.stream_query(
+        "SELECT id, quantidade FROM estoque ORDER BY id", itersize=3, rotulo="teste.stream"
+    )
+    assert next(linhas) == {"id": 1, "quantidade": 1}
+    # O resultado fica no servidor (cursor nomeado) enquanto o gerador é consumido
+    _, (abertos,) = db_manager.execute_query("SELECT COUNT(*) FROM pg_cursors", fetch_one=True)
+    assert abertos == 1
+    assert [r["quantidade"] for r in linhas] == [2, 3, 4, 5, 6, 7]
+    assert METRICAS_SQL.snapshot()["teste.stream"]["linhas"] == 7
+    _, (abertos,) = db_manager.execute_query("SELECT COUNT(*) FROM pg_cursors", fetch_one=True)
+    assert abertos == 0
+    db_manager.conn.commit()
+
+    # Interrompido no meio: cursor fechado e transação de leitura encerrada
+    parcial = db_manager.stream_query("SELECT id FROM estoque", itersize=2)
+    next(parcial)
+    parcial.close()
+    assert db_manager.conn.get_transaction_status() == 0  # TRANSACTION_STATUS_IDLE
+
+    assert [m.quantidade for m in estoque_srv.iterar_movimentos(itersize=2)] == list(range(1, 8))
+    assert [u.email for u in UsuarioService(db_manager).iterar_usuarios()] == ["washu@unython.com"]
+    venda_srv = VendaService(db_manager, estoque_srv, CaixaService(db_manager))
+    assert list(venda_srv.iterar_vendas(id_evento=seed_basico["id_evento"])) == venda_srv.buscar_vendas(limite=10)
+
+
+def test_exportacao_em_fluxo_csv_ndjson_parquet(db_manager, seed_basico, catalogo):
+    estoque_srv = EstoqueService(db_manager)
+    caixa_srv = CaixaService(db_manager)
+    venda_srv = VendaService(db_manager, estoque_srv, caixa_srv)
+    estoque_srv.entrada_item(catalogo["id_coca"], 10, "Doacao", seed_basico["id_facilitador"], seed_basico["id_evento"])
+    id_mov = caixa_srv.abrir_movimento(
+        caixa_srv.registrar_caixa(Caixa(nome="Caixa Export")), seed_basico["id_facilitador"], Decimal("0.00"), seed_basico["id_evento"]
+    )
+    for quantidade in (1, 2, 3):
+        venda = Venda(id_pessoa=None, responsavel=str(seed_basico["id_facilitador"]), id_evento=seed_basico["id_evento"], id_movimento_caixa=id_mov)
+        itens = [ItemVenda(id_venda=0, id_item=catalogo["id_coca"], quantidade=quantidade, valor_unitario=Decimal("2.50"))]
+        assert venda_srv.registrar_venda_completa(venda, itens)
+
+    service = ExportacaoService(db_manager)
+    colunas = [nome for nome, _ in service.colunas("vendas")]
+    corpo = b"".join(csv_em_fluxo(colunas, service.iterar("vendas", id_evento=seed_basico["id_evento"], itersize=2)))
+    linhas = corpo.decode("utf-8").splitlines()
+    assert linhas[0].split(",") == colunas
+    assert len(linhas) == 4
+    assert linhas[3].split(",")[colunas.index("valor_total")] == "7.50"
+
+    hoje = datetime.now().date()
+    assert list(service.iterar("vendas", data_inicio=hoje, data_fim=hoje)) != []
+    assert list(service.iterar("vendas", id_evento=seed_basico["id_evento"] + 1)) == []
+    with pytest.raises(ValueError):
+        service.iterar("vendas", data_inicio=hoje, data_fim=date.min)
+
+    ndjson = b"".join(ndjson_em_fluxo(service.iterar("estoque"))).decode("utf-8").splitlines()
+    assert [json.loads(linha)["tipo_movimento"] for linha in ndjson] == ["Entrada", "Saida", "Saida", "Saida"]
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    corpo = b"".join(parquet_em_fluxo(service.colunas("vendas"), service.iterar("vendas"), linhas_por_grupo=2))
+    tabela = pq.read_table(io.BytesIO(corpo))
+    assert tabela.num_rows == 3
+    assert sum(tabela.column("valor_total").to_pylist()) == Decimal("15.00")
+
+
+
+def test_massa_dados_deterministica_via_copy(db_manager):
+    parametros = ParametrosMassa(semente=7, eventos=6, itens=50, categorias=5, pessoas=40, vendas_por_evento=30)
+    service = MassaDadosService(db_manager)
+
+    def resumo():
+        _, row = db_manager.execute_query(
+            """
+            SELECT (SELECT COUNT(*) FROM vendas), (SELECT SUM(valor_total) FROM vendas),
+                   (SELECT SUM(quantidade * id_item) FROM itens_venda), (SELECT MIN(saldo) FROM saldo_estoque),
+                   (SELECT COUNT(*) FROM eventos WHERE status = 'Aberto')
+            """,
+            fetch_one=True,
+        )
+        return row
+
+    totais = service.gerar(parametros)
+    assert totais["eventos"] == 6 and totais["itens"] == 50 and totais["usuarios"] == parametros.vendedores
+    assert totais["itens_venda"] >= totais["vendas"] > 0
+    assert totais["estoque"] > totais["itens_venda"]
+    assert EstoqueService(db_manager).verificar_saldos() == []
+    primeiro = resumo()
+    assert primeiro[3] >= 0 and primeiro[4] == 1
+
+    # Sequências ajustadas: inserts normais continuam depois dos ids gerados
+    assert ItemService(db_manager).registrar_item(Item(nome="Pós-massa", valor_compra=Decimal("1"), valor_venda=Decimal("2"))) == 51
+
+    with pytest.raises(ValueError):
+        service.gerar(parametros)
+    service.gerar(parametros, limpar=True)
+    assert resumo() == primeiro
+    service.gerar(ParametrosMassa(semente=8, eventos=6, itens=50, categorias=5, pessoas=40, vendas_por_evento=30), limpar=True)
+    assert resumo() != primeiro
@@ -0,0 +1,165 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from src.modules.agendamento import AgendamentoService
+from src.modules.caixas import CaixaService
+from src.modules.estoque import EstoqueService
+from src.modules.item import ItemService
+from src.modules.pdv import PdvService
+from src.modules.relatorio import RelatorioService
+from src.modules.venda import VendaService
+
+TIPOS_INDICE = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+@pytest.fixture
+def volume(db_manager):
+    """
+    Volume suficiente para o planner preferir índice onde ele de fato ajuda: 200 eventos (1 aberto),
+    500 itens, 20 caixas com 50 movimentos cada (1 aberto por caixa), 20k vendas com 3 linhas,
+    50k movimentos de estoque, 5k agendamentos e 20k lançamentos financeiros (10% inativos).
+    """
+    hoje = date.today()
+    db_manager.execute_query(
+        """
+        INSERT INTO usuarios (nome, email, role) VALUES ('Operador', 'operador@unython.com', 'Administrador');
+        INSERT INTO pessoas (nome) SELECT 'Pessoa ' || g FROM generate_series(1, 1000) g;
+        INSERT INTO eventos (nome, data_evento, status)
+            SELECT 'Feira ' || g, %(hoje)s::date - g * 7, CASE WHEN g = 1 THEN 'Aberto' ELSE 'Fechado' END
+            FROM generate_series(1, 200) g;
+        INSERT INTO categorias (nome) SELECT 'Categoria ' || g FROM generate_series(1, 20) g;
+        INSERT INTO itens (nome, valor_compra, valor_venda, id_categoria, status)
+            SELECT 'Item ' || g, 1 + g %% 10, 2 + g %% 10, 1 + g %% 20, CASE WHEN g %% 10 = 0 THEN 'Inativo' ELSE 'Ativo' END
+            FROM generate_series(1, 500) g;
+        INSERT INTO caixas (nome) SELECT 'Caixa ' || g FROM generate_series(1, 20) g;
+        INSERT INTO movimentos_caixa (id_caixa, id_usuario_abertura, id_evento, status, data_abertura)
+            SELECT 1 + g %% 20, 1, 1 + g / 5 %% 200, CASE WHEN g > 980 THEN 'Aberto' ELSE 'Fechado' END,
+                   %(hoje)s::date - (1000 - g)
+            FROM generate_series(1, 1000) g;
+        INSERT INTO vendas (id_evento, id_movimento_caixa, responsavel, data_venda, qtd_itens)
+            SELECT 1 + g %% 200, 1 + g %% 1000, '1', %(hoje)s::date - g %% 1400, 3
+            FROM generate_series(1, 20000) g;
+        INSERT INTO itens_venda (id_venda, id_item, quantidade, valor_unitario, custo_unitario)
+            SELECT v.id, 1 + (v.id * 7 + n) %% 500, 1, 2, 1 FROM vendas v, generate_series(1, 3) n;
+        INSERT INTO estoque (id_item, quantidade, tipo_movimento, id_evento, data_movimento)
+            SELECT 1 + g %% 500, 1, CASE WHEN g %% 3 = 0 THEN 'Entrada' ELSE 'Saida' END, 1 + g %% 200,
+                   %(hoje)s::date - g %% 1400
+            FROM generate_series(1, 50000) g;
+        INSERT INTO agendamentos (id_pessoa, id_facilitador, data_hora, tipo_servico, status, id_evento)
+            SELECT 1 + g %% 1000, 1, %(hoje)s::date - g %% 1400,
+                   'Atendimento', (ARRAY['Agendado', 'Concluido', 'Cancelado', 'Faltou'])[1 + g %% 4], 1 + g %% 200
+            FROM generate_series(1, 5000) g;
+        INSERT INTO movimentos_financeiros (id_usuario, tipo_movimento, valor, descricao, categoria, status, data_registro)
+            SELECT 1, CASE WHEN g %% 4 = 0 THEN 'Despesa' ELSE 'Receita' END, 10 + g %% 90,
+                   repeat('lançamento ', 5), 'Categoria ' || g %% 12,
+                   CASE WHEN g %% 10 = 0 THEN 'Cancelado' ELSE 'Ativo' END, %(hoje)s::date - g %% 1400
+            FROM generate_series(1, 20000) g;
+        """,
+        {"hoje": hoje},
+        commit=True,
+    )
+    # VACUUM (fora de transação) atualiza estatísticas e o visibility map, como o autovacuum faria
+    db_manager.conn.autocommit = True
+    try:
+        db_manager.cursor.execute(
+            "VACUUM ANALYZE eventos, itens, caixas, movimentos_caixa, vendas, itens_venda, estoque, agendamentos, movimentos_financeiros"
+        )
+    finally:
+        db_manager.conn.autocommit = False
+    return {"hoje": hoje}
+
+
+@pytest.fixture
+def capturar(db_manager, monkeypatch):
+    """Executa `funcao()` registrando os SELECTs que os services enviam via execute_query."""
+    original = db_manager.execute_query
+
+    def executar(funcao):
+        consultas = []
+
+        def espiao(query, params=None, *args, **kwargs):
+            if query.lstrip().upper().startswith(("SELECT", "WITH")):
+                consultas.append((query, params))
+            return original(query, params, *args, **kwargs)
+
+        monkeypatch.setattr(db_manager, "execute_query", espiao)
+        try:
+            funcao()
+        finally:
+            monkeypatch.setattr(db_manager, "execute_query", original)
+        return consultas
+
+    return executar
+
+
+def _nos_do_plano(db_manager, query, params):
+    """Nós do plano (EXPLAIN sem ANALYZE: a consulta não é executada)."""
+    db_manager.cursor.execute("EXPLAIN (FORMAT JSON) " + query.rstrip().rstrip(";"), params)
+    (plano,) = db_manager.cursor.fetchone()
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    db_manager.conn.rollback()
+
+    nos, pendentes = [], [plano[0]["Plan"]]
+    while pendentes:
+        no = pendentes.pop()
+        nos.append(no)
+        pendentes.extend(no.get("Plans", []))
+    return nos
+
+
+def _indices_usados(db_manager, query, params):
+    """Nomes dos índices que aparecem no plano."""
+    return {no["Index Name"] for no in _nos_do_plano(db_manager, query, params) if no["Node Type"] in TIPOS_INDICE}
+
+
+def _assert_usa_indice(db_manager, consultas, indice):
+    assert consultas, "Nenhuma consulta capturada."
+    usados = set().union(*(_indices_usados(db_manager, q, p) for q, p in consultas))
+    assert indice in usados, f"{indice} não usado; índices no plano: {sorted(usados) or 'nenhum (seq scan)'}"
+
+
+def test_consultas_de_venda_e_estoque_usam_indices(db_manager, volume, capturar):
+    estoque_srv = EstoqueService(db_manager)
+    caixa_srv = CaixaService(db_manager)
+    venda_srv = VendaService(db_manager, estoque_srv, caixa_srv)
+    hoje = volume["hoje"]
+
+    casos = [
+        (lambda: estoque_srv.buscar_movimentos_por_item(42), "idx_estoque_item"),
+        (lambda: ItemService(db_manager).deletar_item(42), "idx_itens_venda_item"),
+        (lambda: venda_srv.buscar_vendas(limite=50, id_evento=7), "idx_vendas_evento_id"),
+        (lambda: venda_srv.buscar_vendas(limite=50, data_inicio=hoje - timedelta(days=2), data_fim=hoje), "idx_vendas_data_id"),
+        (lambda: venda_srv.cancelar_venda(123, 1), "idx_itens_venda_venda"),
+    ]
+    for funcao, indice in casos:
+        consultas = capturar(funcao)
+        if indice == "idx_itens_venda_venda":
+            consultas = [(q, p) for q, p in consultas if "FROM itens_venda WHERE id_venda" in q]
+        _assert_usa_indice(db_manager, consultas, indice)
+
+    # Página funda de um período: keyset (data_venda, id) sai na ordem do índice, sem Sort
+    ultimo_id = venda_srv.buscar_vendas(limite=500, data_inicio=hoje - timedelta(days=400), data_fim=hoje)[-1].id
+    consultas = capturar(
+        lambda: venda_srv.buscar_vendas(limite=50, cursor=ultimo_id, data_inicio=hoje - timedelta(days=400), data_fim=hoje)
+    )
+    nos = [no for q, p in consultas for no in _nos_do_plano(db_manager, q, p)]
+    assert any(no["Node Type"] == "Index Scan" and no["Index Name"] == "idx_vendas_data_id" for no in nos)
+    assert not any(no["Node Type"] in ("Sort", "Incremental Sort") for no in nos)
+
+
+def test_consultas_por_status_usam_indices_parciais(db_manager, volume, capturar):
+    # eventos/idx_eventos_abertos fica de fora: com algumas centenas de feiras a tabela ocupa
+    # 2 páginas e o seq scan com LIMIT 1 é de fato mais barato (o índice passa a valer com o histórico).
+    casos = [
+        (lambda: CaixaService(db_manager).buscar_movimento_ativo(3), "idx_mov_caixa_abertos"),
+        (lambda: PdvService(db_manager).buscar_estado(3), "idx_mov_caixa_abertos"),
+        (lambda: AgendamentoService(db_manager).buscar_agendamentos(status="Faltou"), "idx_agendamentos_status_data"),
+        (lambda: RelatorioService(db_manager).gerar_detalhe_agendamentos_pendentes(), "idx_agendamentos_status_data"),
+        (lambda: RelatorioService(db_manager).calcular_saldo_fluxo_caixa(), "idx_mov_fin_tipo_ativos"),
+        (lambda: RelatorioService(db_manager).gerar_despesas_por_categoria(), "idx_mov_fin_tipo_ativos"),
+    ]
+    for funcao, indice in casos:
+        _assert_usa_indice(db_manager, capturar(funcao), indice)